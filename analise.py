@@ -1,38 +1,39 @@
-import sqlite3
-
 import pandas as pd
 
-conn = sqlite3.connect("bets.db")
-df = pd.read_sql_query("SELECT * FROM bets", conn)
-conn.close()
-
-# Filtrar apenas apostas com selection contendo "Under"
-df = df[df["selection"].str.contains("Under", na=False)]
-
-# Excluir liga "TT Cup"
-df = df[~df["league_name"].str.contains("TT Cup", na=False)]
+from analytics import BetAnalytics, summarize
 
-# Filtrar para as ligas Czech Liga Pro e Setka Cup
-df = df[df["league_name"].isin(["Czech Liga Pro", "Setka Cup"])]
+# Apostas Under nas ligas Czech Liga Pro e Setka Cup (sem TT Cup),
+# excluindo handicap <= 75.5
+BASE = (
+    "instr(b.selection, 'Under') > 0"
+    " AND b.league_name IN ('Czech Liga Pro', 'Setka Cup')"
+    " AND b.handicap > 75.5"
+)
 
-# Excluir jogos com handicap menor ou igual a 75.5
-df = df[df["handicap"] > 75.5]
+# Duas consultas agrupadas por liga e handicap: df sem filtro de ROI e
+# df_roi_min acumulado por ROI mínimo (roi_min); as análises abaixo só
+# somam essas linhas
+analytics = BetAnalytics()
+df = analytics.report(by=("league_name", "handicap"), where=BASE)
+df_roi_min = analytics.threshold_report(
+    by=("league_name", "handicap"),
+    thresholds=[0, 10, 20, 30, 35, 40, 45, 50, 60, 70, 80, 90, 100],
+    where=BASE,
+)
+analytics.close()
 
 
-def analisar(df_filtrado, nome):
-    if len(df_filtrado) == 0:
+def analisar(linhas, nome):
+    r = summarize(linhas)
+    if r is None:
         return None
 
-    win_rate = (df_filtrado["result"] == 1).sum() / len(df_filtrado) * 100
-    lucro = df_filtrado["profit"].sum()
-    roi = (lucro / len(df_filtrado)) * 100
-
     return {
         "filtro": nome,
-        "volume": len(df_filtrado),
-        "win_rate": win_rate,
-        "lucro": lucro,
-        "roi": roi,
+        "volume": r["volume"],
+        "win_rate": r["win_rate"],
+        "lucro": r["profit"],
+        "roi": r["roi"],
     }
 
 
@@ -61,8 +62,8 @@ print("=" * 130)
 combinacoes = []
 for handicap in [76.5, 77.5, 78.5]:
     for roi_min in [30, 35, 40, 45, 50]:
-        df_filtrado = df[
-            (df["handicap"] >= handicap) & (df["estimated_roi"] >= roi_min)
+        df_filtrado = df_roi_min[
+            (df_roi_min["handicap"] >= handicap) & (df_roi_min["roi_min"] == roi_min)
         ]
         nome = f"H>={handicap} + ROI>={roi_min}%"
         r = analisar(df_filtrado, nome)
@@ -81,7 +82,7 @@ print("=" * 130)
 
 roi_vals = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
 for roi_min in roi_vals:
-    df_roi = df[(df["handicap"] == 77.5) & (df["estimated_roi"] >= roi_min)]
+    df_roi = df_roi_min[(df_roi_min["handicap"] == 77.5) & (df_roi_min["roi_min"] == roi_min)]
     r = analisar(df_roi, f"H == 77.5 + ROI>={roi_min}%")
     if r:
         print(
@@ -102,8 +103,8 @@ handicap_lines = [76.5, 77.5, 78.5]
 for handicap in handicap_lines:
     print(f"\nHandicap == {handicap}")
     for roi_min in roi_vals:
-        df_filtrado = df[
-            (df["handicap"] == handicap) & (df["estimated_roi"] >= roi_min)
+        df_filtrado = df_roi_min[
+            (df_roi_min["handicap"] == handicap) & (df_roi_min["roi_min"] == roi_min)
         ]
         r = analisar(df_filtrado, f"H == {handicap} + ROI>={roi_min}%")
         if r:
@@ -172,7 +173,7 @@ print("=" * 130)
 for liga in ["Czech Liga Pro", "Setka Cup"]:
     print(f"\n{liga}:")
     for roi_min in [20, 30, 40, 50]:
-        df_filtrado = df[(df["league_name"] == liga) & (df["estimated_roi"] >= roi_min)]
+        df_filtrado = df_roi_min[(df_roi_min["league_name"] == liga) & (df_roi_min["roi_min"] == roi_min)]
         r = analisar(df_filtrado, f"  ROI >= {roi_min}%")
         if r and r["volume"] >= 30:
             print(
@@ -0,0 +1,293 @@
+"""Camada de análise sobre bets.db, table_tennis_results.db e tm_data.db.
+
+Os três bancos ficam acessíveis numa única conexão, com nomes qualificados
+iguais em qualquer backend: bets.bets, results.events, results.event_scores,
+tm.events. Os relatórios (volume, win rate, lucro e ROI por liga, tipo de
+aposta, handicap, faixa de ROI e mês) são uma única consulta agrupada cada;
+os scripts de análise só combinam as poucas linhas agregadas.
+
+Com DuckDB e pyarrow, bets.bets é lida da exportação Parquet incremental
+(parquet_export.py, atualizada na primeira consulta): o DuckDB lê só as
+colunas usadas e poda partições e row groups pelos filtros. Backends, em
+ordem de preferência:
+  - DuckDB com a extensão sqlite: ATTACH dos arquivos (somente leitura);
+  - DuckDB sem a extensão (ex.: sem rede para baixá-la): as tabelas que não
+    vêm do Parquet são importadas na primeira consulta;
+  - sem DuckDB: sqlite3 em memória com ATTACH dos arquivos.
+
+    python analytics.py --by league_name month --where "b.result IS NOT NULL"
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+
+import pandas as pd
+
+from parquet_export import DEFAULT_EXPORT_DIR, ParquetExporter
+from strategy import load_strategy, sql_literal
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger("analytics")
+
+# Faixas de ROI estimado (%): cada aposta cai na maior faixa <= estimated_roi
+ROI_BUCKETS = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+# Dimensões dos relatórios -> expressão sobre bets b (nome = coluna de saída)
+DIMENSIONS = {
+    "league_name": "b.league_name",
+    "bet_type": "b.bet_type",
+    "handicap": "b.handicap",
+    "month": "substr(CAST(b.event_time AS VARCHAR), 1, 7)",
+}
+
+# CAST: SUM de inteiros vira HUGEINT no DuckDB
+METRICS_SQL = """
+    COUNT(*) AS volume,
+    CAST(COUNT(b.result) AS BIGINT) AS settled,
+    CAST(SUM(CASE WHEN b.result = 1 THEN 1 ELSE 0 END) AS BIGINT) AS wins,
+    CAST(SUM(CASE WHEN b.result = 0 THEN 1 ELSE 0 END) AS BIGINT) AS losses,
+    COALESCE(SUM(b.profit), 0) AS profit
+"""
+
+
+def roi_bucket_sql(buckets=ROI_BUCKETS, column="b.estimated_roi"):
+    """CASE que põe cada aposta na maior faixa <= ROI estimado (NULL abaixo da menor)"""
+    cases = " ".join(
+        f"WHEN {column} >= {sql_literal(edge)} THEN {sql_literal(edge)}"
+        for edge in sorted(buckets, reverse=True)
+    )
+    return f"CASE {cases} END"
+
+
+def _where_sql(where):
+    """Aceita SQL (sobre bets b) ou um StrategyFilter"""
+    if where is None:
+        return ""
+    if hasattr(where, "sql"):
+        where = where.sql("b")
+    return f"WHERE {where}"
+
+
+def _positions(count, suffix=""):
+    # NULLS LAST explícito: SQLite e DuckDB ordenam nulos em lados opostos
+    return ", ".join(f"{i + 1}{suffix}" for i in range(count))
+
+
+def _rates(frame):
+    volume = frame["volume"].where(frame["volume"] > 0)
+    frame["win_rate"] = frame["wins"] / volume * 100
+    frame["roi"] = frame["profit"] / volume * 100
+    return frame
+
+
+def summarize(frame):
+    """Soma linhas agregadas (volume, wins, losses, profit) e recalcula as taxas;
+    None se não houver apostas"""
+    volume = int(frame["volume"].sum())
+    if volume == 0:
+        return None
+    wins = int(frame["wins"].sum())
+    profit = float(frame["profit"].sum())
+    return {
+        "volume": volume,
+        "wins": wins,
+        "losses": int(frame["losses"].sum()),
+        "win_rate": wins / volume * 100,
+        "profit": profit,
+        "roi": profit / volume * 100,
+    }
+
+
+class BetAnalytics:
+    def __init__(
+        self,
+        bets_db_path="bets.db",
+        results_db_path="table_tennis_results.db",
+        tm_db_path="tm_data.db",
+        engine=None,
+        export_dir=DEFAULT_EXPORT_DIR,
+    ):
+        """engine: "duckdb", "sqlite" ou None (DuckDB se instalado)"""
+        self.databases = {
+            "bets": bets_db_path,
+            "results": results_db_path,
+            "tm": tm_db_path,
+        }
+        self.export_dir = export_dir
+        self.imported = set()
+
+        if engine is None:
+            engine = "duckdb" if duckdb is not None else "sqlite"
+        if engine == "duckdb" and duckdb is None:
+            raise ImportError("duckdb não instalado (pip install duckdb)")
+
+        # bets.bets vem da exportação Parquet (ver table())
+        self.parquet_bets = engine == "duckdb" and pyarrow is not None
+
+        if engine == "duckdb":
+            self.conn = duckdb.connect()
+            self.backend = "duckdb"
+            try:
+                for name, path in self._existing_databases():
+                    if name == "bets" and self.parquet_bets:
+                        self.conn.execute("CREATE SCHEMA bets")
+                        continue
+                    self.conn.execute(
+                        f"ATTACH {sql_literal(path)} AS {name} (TYPE sqlite, READ_ONLY)"
+                    )
+            except duckdb.Error as e:
+                # Extensão sqlite indisponível: tabelas vêm do Parquet/importação
+                logger.warning("⚠️ Extensão sqlite do DuckDB indisponível, importando tabelas")
+                logger.debug(e)
+                self.conn.close()
+                self.conn = duckdb.connect()
+                self.backend = "duckdb-import"
+                for name, _ in self._existing_databases():
+                    self.conn.execute(f"CREATE SCHEMA {name}")
+        else:
+            self.conn = sqlite3.connect(":memory:", uri=True)
+            self.backend = "sqlite"
+            for name, path in self._existing_databases():
+                self.conn.execute(
+                    f"ATTACH DATABASE ? AS {name}",
+                    (f"file:{os.path.abspath(path)}?mode=ro",),
+                )
+        logger.info(f"📊 Backend de análise: {self.backend}")
+
+    def _existing_databases(self):
+        for name, path in self.databases.items():
+            if path and os.path.exists(path):
+                yield name, path
+            else:
+                logger.info(f"ℹ️ {path} não encontrado, {name}.* indisponível")
+
+    def table(self, database, table):
+        """Nome qualificado da tabela (importando-a antes, se preciso)"""
+        name = f"{database}.{table}"
+        if name in self.imported:
+            return name
+
+        if name == "bets.bets" and self.parquet_bets:
+            # Exportação incremental: só as partições alteradas são regravadas
+            ParquetExporter(
+                self.databases["bets"], self.databases["results"], self.export_dir
+            ).export_dataset("bets")
+            pattern = os.path.join(self.export_dir, "bets", "**", "*.parquet")
+            self.conn.execute(
+                f"""
+                CREATE VIEW {name} AS
+                SELECT * EXCLUDE (month)
+                FROM read_parquet({sql_literal(pattern)}, hive_partitioning = true,
+                                  hive_types_autocast = false)
+                """
+            )
+        elif self.backend == "duckdb-import":
+            source = sqlite3.connect(self.databases[database])
+            frame = pd.read_sql_query(f"SELECT * FROM {table}", source)
+            source.close()
+            self.conn.register("_import", frame)
+            self.conn.execute(f"CREATE TABLE {name} AS SELECT * FROM _import")
+            self.conn.unregister("_import")
+        else:
+            return name
+        self.imported.add(name)
+        return name
+
+    def query(self, sql, params=()):
+        """Executa SQL arbitrário e devolve um DataFrame"""
+        if self.backend == "sqlite":
+            return pd.read_sql_query(sql, self.conn, params=params)
+        return self.conn.execute(sql, list(params)).df()
+
+    def report(self, by=("league_name",), where=None, params=(), roi_buckets=ROI_BUCKETS):
+        """Volume, wins, losses, lucro, win rate e ROI agrupados por `by`
+        (chaves de DIMENSIONS ou "roi_bucket"), numa única consulta"""
+        dimensions = {**DIMENSIONS, "roi_bucket": roi_bucket_sql(roi_buckets)}
+        columns = [f"{dimensions[d]} AS {d}" for d in by]
+        group = f"GROUP BY {_positions(len(by))}" if by else ""
+        order = f"ORDER BY {_positions(len(by), ' NULLS LAST')}" if by else ""
+        sql = f"""
+            SELECT {', '.join(columns + [METRICS_SQL])}
+            FROM {self.table('bets', 'bets')} b
+            {_where_sql(where)}
+            {group}
+            {order}
+        """
+        return _rates(self.query(sql, params))
+
+    def threshold_report(self, by=(), thresholds=ROI_BUCKETS, where=None, params=()):
+        """Métricas acumuladas "estimated_roi >= roi_min" para cada limite em
+        `thresholds`, agrupadas por `by`, numa única consulta (grupos sem
+        apostas ficam de fora)"""
+        values = ", ".join(f"({sql_literal(t)})" for t in thresholds)
+        columns = [f"{DIMENSIONS[d]} AS {d}" for d in by] + ["t.roi_min AS roi_min"]
+        sql = f"""
+            WITH thresholds(roi_min) AS (VALUES {values})
+            SELECT {', '.join(columns + [METRICS_SQL])}
+            FROM {self.table('bets', 'bets')} b
+            JOIN thresholds t ON b.estimated_roi >= t.roi_min
+            {_where_sql(where)}
+            GROUP BY {_positions(len(columns))}
+            ORDER BY {_positions(len(columns), ' NULLS LAST')}
+        """
+        return _rates(self.query(sql, params))
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatórios agrupados de apostas")
+    parser.add_argument(
+        "--by",
+        nargs="*",
+        default=["league_name"],
+        choices=sorted([*DIMENSIONS, "roi_bucket"]),
+        help="Dimensões do agrupamento",
+    )
+    parser.add_argument("--where", help="Condição SQL sobre bets b")
+    parser.add_argument("--filter", help="Filtro nomeado de config/strategy.json")
+    parser.add_argument("--min-volume", type=int, default=0)
+    parser.add_argument("--engine", choices=["duckdb", "sqlite"])
+    parser.add_argument("--bets-db", default="bets.db")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    conditions = [c for c in (args.where,) if c]
+    if args.filter:
+        conditions.append(load_strategy().filter(args.filter).sql("b"))
+
+    analytics = BetAnalytics(bets_db_path=args.bets_db, engine=args.engine)
+    report = analytics.report(
+        by=args.by, where=" AND ".join(f"({c})" for c in conditions) or None
+    )
+    analytics.close()
+
+    report = report[report["volume"] >= args.min_volume]
+    print(
+        report.to_string(
+            index=False,
+            formatters={
+                "profit": "{:+.2f}u".format,
+                "win_rate": "{:.1f}%".format,
+                "roi": "{:+.1f}%".format,
+            },
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Backtest da estratégia Over/Under sobre o histórico de odds de tm_data.db.
+
+Cada linha Total com odds vira uma aposta candidata, avaliada como o
+BetProcessor faria no momento do jogo: histórico de games e ELO "as-of" (só
+partidas anteriores ao evento, em table_tennis_results.db) e a mesma decisão
+de analyze_over_under_bet_strategy. As candidatas são montadas uma vez por
+lookback; simulate(params) só aplica os limiares de ROI/ELO e a blacklist, o
+que permite a sweep.py testar muitas combinações. As apostas simuladas podem
+ser gravadas em Parquet ou CSV.
+
+    python backtest.py --start 2024-01-01 --end 2024-07-01 --output bt.parquet
+"""
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db_get_bets import (
+    ELO_DIFF_THRESHOLD_OU,
+    MIN_ROI_BALANCED_OVER,
+    MIN_ROI_BALANCED_UNDER,
+    MIN_ROI_UNBALANCED_OVER,
+    MIN_ROI_UNBALANCED_UNDER,
+    OU_LEAGUE_BLACKLIST,
+)
+from elo_engine import RatingHistory
+from player_registry import PlayerRegistry
+
+logger = logging.getLogger("backtest")
+
+DEFAULT_LOOKBACK = 20
+
+DEFAULT_PARAMS = {
+    "elo_diff_threshold": ELO_DIFF_THRESHOLD_OU,
+    "min_roi_balanced_over": MIN_ROI_BALANCED_OVER,
+    "min_roi_unbalanced_over": MIN_ROI_UNBALANCED_OVER,
+    "min_roi_balanced_under": MIN_ROI_BALANCED_UNDER,
+    "min_roi_unbalanced_under": MIN_ROI_UNBALANCED_UNDER,
+    "ml_balanced_min_odds": 1.50,
+    "blacklist": list(OU_LEAGUE_BLACKLIST),
+}
+
+
+class BacktestEngine:
+    """Reaplica a estratégia O/U do BetProcessor sobre todo o histórico de odds.
+
+    Tudo é calculado de forma vetorizada sobre todas as linhas Total de todos
+    os eventos de tm_data.db com odds:
+      - histórico de games por jogador "as-of" (só partidas antes do jogo),
+        com as mesmas regras de get_games_per_match_list (últimas N partidas,
+        ignorando as sem placar por set);
+      - ELO as-of via RatingHistory;
+      - probabilidades/ROI/decisão iguais a analyze_over_under_bet_strategy.
+
+    build_candidates() faz o trabalho pesado uma vez; simulate(params) apenas
+    aplica os limiares, então varrer parâmetros é barato.
+    """
+
+    def __init__(
+        self,
+        tm_db_path="tm_data.db",
+        results_db_path="table_tennis_results.db",
+    ):
+        self.tm_db_path = tm_db_path
+        self.results_db_path = results_db_path
+        self.fixtures = None
+        self.history = None
+        self.rating_history = None
+        self._candidates = {}
+
+    def load(self, start=None, end=None):
+        """Carrega odds históricas e o histórico de resultados"""
+        conn = sqlite3.connect(self.tm_db_path)
+        query = """
+            SELECT e.id AS event_id, e.time AS event_time, e.league_name,
+                   e.home_team, e.away_team,
+                   o.market_type, o.selection, o.odds, o.handicap_value
+            FROM events e
+            JOIN match_odds o ON o.event_id = e.id
+            WHERE o.market_type IN ('To Win', 'Total')
+        """
+        params = []
+        if start is not None:
+            query += " AND e.time >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND e.time < ?"
+            params.append(int(end))
+        odds = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+
+        odds["event_id"] = odds["event_id"].astype(str)
+        odds["event_time"] = pd.to_numeric(odds["event_time"]).astype(np.int64)
+
+        ml = odds[odds["market_type"] == "To Win"]
+        ml_home = ml[ml["selection"] == "Home"].groupby("event_id")["odds"].first()
+        ml_away = ml[ml["selection"] == "Away"].groupby("event_id")["odds"].first()
+
+        totals = odds[odds["market_type"] == "Total"].copy()
+        totals["handicap"] = pd.to_numeric(
+            totals["handicap_value"]
+            .astype(str)
+            .str.replace("O ", "", regex=False)
+            .str.replace("U ", "", regex=False),
+            errors="coerce",
+        )
+        # Mesmo filtro de analyze_bet_value: "if market != 'Total' or not handicap"
+        has_handicap = totals["handicap_value"].notna() & (
+            totals["handicap_value"].astype(str) != ""
+        )
+        totals = totals[has_handicap & totals["handicap"].notna()]
+        totals["ml_odds_home"] = totals["event_id"].map(ml_home).fillna(0).to_numpy()
+        totals["ml_odds_away"] = totals["event_id"].map(ml_away).fillna(0).to_numpy()
+        self.fixtures = totals.drop(columns=["market_type", "handicap_value"]).reset_index(
+            drop=True
+        )
+
+        # Jogadores pelo id de player_registry, como no BetProcessor
+        registry = PlayerRegistry(self.results_db_path)
+        registry.sync()
+        registry.load()
+        self.fixtures["home_player_id"] = self._resolve_players(
+            registry, self.fixtures["home_team"]
+        )
+        self.fixtures["away_player_id"] = self._resolve_players(
+            registry, self.fixtures["away_team"]
+        )
+
+        conn = sqlite3.connect(self.results_db_path)
+        self.history = pd.read_sql_query(
+            """
+            SELECT e.event_id, e.event_time, e.time_status,
+                   e.home_player_id, e.away_player_id,
+                   COALESCE(s.total_games, 0) AS total_games
+            FROM events e
+            LEFT JOIN (
+                SELECT event_id, SUM(home_score) + SUM(away_score) AS total_games
+                FROM event_scores GROUP BY event_id
+            ) s ON s.event_id = e.event_id
+            """,
+            conn,
+        )
+        conn.close()
+        self.history["event_id"] = self.history["event_id"].astype(str)
+        for column in ("home_player_id", "away_player_id"):
+            self.history[column] = self.history[column].astype("Int64").astype(object)
+        self.history["event_time"] = (
+            pd.to_numeric(self.history["event_time"], errors="coerce")
+            .fillna(0)
+            .astype(np.int64)
+        )
+
+        self.rating_history = RatingHistory.from_results_db(self.results_db_path)
+        self._candidates = {}
+        logger.info(
+            f"Backtest: {self.fixtures['event_id'].nunique()} eventos com odds, "
+            f"{len(self.fixtures)} linhas Total, {len(self.history)} partidas no histórico"
+        )
+        return self
+
+    @staticmethod
+    def _resolve_players(registry, names):
+        """Ids dos jogadores (dtype object); nomes desconhecidos ficam com None"""
+        ids = {name: registry.resolve(name) for name in names.unique()}
+        return pd.Series([ids[name] for name in names], index=names.index, dtype=object)
+
+    def _player_windows(self, lookback):
+        """Índices [início, fim) no timeline ordenado para home e away de cada linha"""
+        hist = self.history
+        fx = self.fixtures
+        # Jogadores sem id na linha de odds não podem casar com o histórico
+        fx_home = fx["home_player_id"].where(
+            fx["home_player_id"].notna(), "?" + fx["home_team"].astype(str)
+        )
+        fx_away = fx["away_player_id"].where(
+            fx["away_player_id"].notna(), "?" + fx["away_team"].astype(str)
+        )
+        players = np.concatenate(
+            [
+                hist["home_player_id"].to_numpy(dtype=object),
+                hist["away_player_id"].to_numpy(dtype=object),
+                fx_home.to_numpy(dtype=object),
+                fx_away.to_numpy(dtype=object),
+            ]
+        )
+        codes, _ = pd.factorize(players, use_na_sentinel=False)
+        codes = codes.astype(np.int64)
+        n_hist, n_fx = len(hist), len(fx)
+
+        times = hist["event_time"].to_numpy()
+        player_ids = codes[: 2 * n_hist]
+        keys = (player_ids << 32) | np.concatenate([times, times])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        totals = np.concatenate([hist["total_games"].to_numpy()] * 2)[order]
+
+        fx_times = fx["event_time"].to_numpy()
+        windows = {}
+        for side, offset in (("home", 2 * n_hist), ("away", 2 * n_hist + n_fx)):
+            ids = codes[offset : offset + n_fx]
+            end = np.searchsorted(keys, (ids << 32) | fx_times, side="left")
+            first = np.searchsorted(keys, ids << 32, side="left")
+            start = np.maximum(first, end - lookback)
+            windows[side] = (start, end)
+        return totals.astype(np.float64), windows
+
+    def build_candidates(self, lookback=DEFAULT_LOOKBACK):
+        """Calcula probabilidades, ROI e ELO as-of para todas as linhas Total"""
+        if lookback in self._candidates:
+            return self._candidates[lookback]
+        if self.fixtures is None:
+            self.load()
+
+        fx = self.fixtures
+        totals, windows = self._player_windows(lookback)
+        played = np.concatenate([[0], np.cumsum(totals > 0)])
+        handicaps = fx["handicap"].to_numpy(dtype=np.float64)
+        is_over = fx["selection"].str.contains("Over", regex=False).to_numpy()
+        is_under = fx["selection"].str.contains("Under", regex=False).to_numpy()
+
+        probs = {}
+        counts = {}
+        for side, (start, end) in windows.items():
+            n_games = played[end] - played[start]
+            hits = np.zeros(len(fx), dtype=np.int64)
+            # Um cumsum por linha distinta: O(linhas * histórico), sem laço por evento
+            for line in np.unique(handicaps):
+                rows = handicaps == line
+                over = np.concatenate([[0], np.cumsum(totals > line)])
+                under = np.concatenate([[0], np.cumsum((totals > 0) & (totals < line))])
+                hits_over = over[end[rows]] - over[start[rows]]
+                hits_under = under[end[rows]] - under[start[rows]]
+                hits[rows] = np.where(is_over[rows], hits_over, hits_under)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                probs[side] = np.where(n_games > 0, hits / n_games, 0.0)
+            counts[side] = n_games
+
+        home_elo = self.rating_history.ratings_at(
+            fx["home_player_id"].tolist(), fx["event_time"].to_numpy()
+        )
+        away_elo = self.rating_history.ratings_at(
+            fx["away_player_id"].tolist(), fx["event_time"].to_numpy()
+        )
+
+        odds = fx["odds"].to_numpy(dtype=np.float64)
+        est_prob = (probs["home"] + probs["away"]) / 2
+        roi = ((est_prob * (odds - 1)) - (1 - est_prob)) * 100
+
+        candidates = fx.copy()
+        candidates["is_over"] = is_over
+        candidates["is_under"] = is_under & ~is_over
+        candidates["home_games_count"] = counts["home"]
+        candidates["away_games_count"] = counts["away"]
+        candidates["home_elo_at_bet"] = home_elo
+        candidates["away_elo_at_bet"] = away_elo
+        candidates["elo_diff"] = np.abs(home_elo - away_elo)
+        candidates["est_prob"] = est_prob
+        candidates["estimated_roi"] = roi
+        candidates["fair_odds"] = np.where(est_prob > 0, 1 / np.where(est_prob > 0, est_prob, 1), 0)
+
+        settled = self.history[
+            (self.history["time_status"] == 3) & (self.history["total_games"] > 0)
+        ].drop_duplicates("event_id").set_index("event_id")["total_games"]
+        actual = candidates["event_id"].map(settled).to_numpy(dtype=np.float64)
+        won = np.where(is_over, actual > handicaps, actual < handicaps)
+        candidates["actual_total"] = actual
+        candidates["result"] = np.where(np.isnan(actual), np.nan, won.astype(np.float64))
+        candidates["profit"] = np.where(
+            np.isnan(actual), np.nan, np.where(won, odds - 1, -1.0)
+        )
+
+        self._candidates[lookback] = candidates
+        return candidates
+
+    def simulate(self, params=None, lookback=DEFAULT_LOOKBACK):
+        """Aplica a regra de decisão e devolve as apostas simuladas aceitas"""
+        p = dict(DEFAULT_PARAMS, **(params or {}))
+        c = self.build_candidates(lookback)
+
+        balanced = (
+            (c["elo_diff"].to_numpy() < p["elo_diff_threshold"])
+            & (c["ml_odds_home"].to_numpy() > p["ml_balanced_min_odds"])
+            & (c["ml_odds_away"].to_numpy() > p["ml_balanced_min_odds"])
+        )
+        is_over = c["is_over"].to_numpy()
+        min_roi = np.where(
+            is_over,
+            np.where(balanced, p["min_roi_balanced_over"], p["min_roi_unbalanced_over"]),
+            np.where(balanced, p["min_roi_balanced_under"], p["min_roi_unbalanced_under"]),
+        )
+        accept = (
+            (is_over | c["is_under"].to_numpy())
+            & (c["home_games_count"].to_numpy() > 0)
+            & (c["away_games_count"].to_numpy() > 0)
+            & ~c["league_name"].isin(p["blacklist"]).to_numpy()
+            & (c["estimated_roi"].to_numpy() >= min_roi)
+        )
+
+        bets = c.loc[accept].copy()
+        bets["min_roi_required"] = min_roi[accept]
+        bets["balanced"] = balanced[accept]
+        bets["bet_type"] = "Total"
+        return bets.reset_index(drop=True)
+
+    @staticmethod
+    def summarize(bets, by=("league_name", "handicap")):
+        """ROI, win rate e volume das apostas simuladas já liquidadas"""
+        settled = bets[bets["result"].notna()]
+        if settled.empty:
+            return pd.DataFrame(columns=[*by, "volume", "win_rate", "profit", "roi"])
+        summary = settled.groupby(list(by)).agg(
+            volume=("profit", "size"),
+            win_rate=("result", "mean"),
+            profit=("profit", "sum"),
+        )
+        summary["win_rate"] *= 100
+        summary["roi"] = summary["profit"] / summary["volume"] * 100
+        return summary.reset_index().sort_values("roi", ascending=False)
+
+
+def save_simulated_bets(bets, path):
+    """Grava as apostas simuladas em Parquet (requer pyarrow) ou CSV"""
+    if path.endswith(".parquet"):
+        try:
+            bets.to_parquet(path, index=False)
+        except ImportError as e:
+            raise ImportError("Exportar Parquet requer pyarrow: pip install pyarrow") from e
+    else:
+        bets.to_csv(path, index=False)
+    logger.info(f"💾 {len(bets)} apostas simuladas salvas em {path}")
+
+
+def parse_date(value):
+    return int(datetime.strptime(value, "%Y-%m-%d").timestamp()) if value else None
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(
+        description="Backtest da estratégia O/U sobre o histórico de odds"
+    )
+    parser.add_argument("--tm-db", default="tm_data.db")
+    parser.add_argument("--results-db", default="table_tennis_results.db")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final exclusiva (YYYY-MM-DD)")
+    parser.add_argument("--lookback", type=int, default=DEFAULT_LOOKBACK)
+    parser.add_argument("--output", help="Arquivo .parquet ou .csv")
+    args = parser.parse_args()
+
+    engine = BacktestEngine(args.tm_db, args.results_db)
+    engine.load(parse_date(args.start), parse_date(args.end))
+    bets = engine.simulate(lookback=args.lookback)
+
+    logger.info(f"✅ {len(bets)} apostas simuladas")
+    print(BacktestEngine.summarize(bets).to_string(index=False))
+
+    if args.output:
+        save_simulated_bets(bets, args.output)
+
+
+if __name__ == "__main__":
+    main()
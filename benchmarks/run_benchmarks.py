@@ -0,0 +1,556 @@
+"""Mede os caminhos críticos do pipeline sobre bancos sintéticos.
+
+Uso:
+    python benchmarks/run_benchmarks.py --scale 10k
+    python benchmarks/run_benchmarks.py --importtime
+    python benchmarks/run_benchmarks.py --scale 100k --baseline benchmarks/baseline.json
+
+Os bancos são gerados por synthetic_data.py (reaproveitados se já existirem)
+e copiados para um diretório temporário antes de cada execução que escreve
+neles. O resultado vai para um JSON; com --baseline, qualquer benchmark mais
+lento que baseline * (1 + tolerância) é reportado e o processo sai com 1.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic_data import generate, parse_scale  # noqa: E402
+
+BENCHMARKS = {}
+
+# Scripts agendados por run_full_bot.py: (módulo, diretório onde está)
+ENTRY_POINTS = {
+    "db_get_bets": ROOT,
+    "db_get_bets_results": ROOT,
+    "send_telegram": ROOT,
+    "get_matches_last30": ROOT,
+    "update_csv": ROOT,
+    "update_matches": os.path.join(ROOT, "scripts"),
+}
+HEAVY_MODULES = ("pandas", "numpy", "numba", "httpx")
+
+
+def benchmark(name):
+    """Registra uma função de benchmark: recebe o contexto e devolve o callable medido"""
+
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+class BenchContext:
+    def __init__(self, data_dir, manifest):
+        self.data_dir = data_dir
+        self.manifest = manifest
+        self.work_dir = tempfile.mkdtemp(prefix="tm_bench_")
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def fresh_copy(self, *names):
+        """Copia bancos para o diretório de trabalho e devolve os caminhos"""
+        paths = []
+        for name in names:
+            target = os.path.join(self.work_dir, name)
+            shutil.copyfile(self.path(name), target)
+            paths.append(target)
+        return paths
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def make_processor(results_db, tm_db=None, bets_db=None):
+    """BetProcessor sem o cálculo de ELO e os caches do construtor"""
+    from db_get_bets import BetProcessor
+
+    if bets_db is None:
+        bets_db = os.path.join(os.path.dirname(results_db), "bets.db")
+    return BetProcessor(
+        tm_db_path=tm_db,
+        bets_db_path=bets_db,
+        results_db_path=results_db,
+        load_models=False,
+    )
+
+
+@benchmark("calculate_all_player_elos")
+def bench_elos(ctx):
+    from player_registry import PlayerRegistry
+
+    (results_db,) = ctx.fresh_copy("table_tennis_results.db")
+    PlayerRegistry(results_db).sync()
+    processor = make_processor(results_db)
+    return processor._calculate_all_player_elos
+
+
+@benchmark("elo_replay_1m")
+def bench_elo_replay(ctx):
+    import numpy as np
+
+    from elo_engine import replay_ratings
+
+    rng = np.random.default_rng(0)
+    n_matches, n_players = 1_000_000, 700
+    home_idx = rng.integers(0, n_players, n_matches)
+    away_idx = rng.integers(0, n_players, n_matches)
+    home_won = rng.integers(0, 2, n_matches).astype(np.float64)
+    # Aquece a compilação do numba (se disponível) fora da medição; o numba
+    # só é usado a partir de NUMBA_MIN_MATCHES partidas
+    replay_ratings(home_idx, away_idx, home_won, n_players)
+
+    return lambda: replay_ratings(home_idx, away_idx, home_won, n_players)
+
+
+@benchmark("get_games_per_match_list")
+def bench_games_list(ctx):
+    import sqlite3
+
+    from player_registry import PlayerRegistry
+    from player_stats import PlayerStatsCache
+
+    (results_db,) = ctx.fresh_copy("table_tennis_results.db")
+    processor = make_processor(results_db)
+    processor.player_registry = PlayerRegistry(results_db)
+    processor.player_registry.sync()
+    processor.player_registry.load()
+    processor.player_stats = PlayerStatsCache(results_db)
+    processor.player_stats.sync()
+    processor.player_stats.load()
+    conn = sqlite3.connect(results_db)
+    players = [
+        row[0]
+        for row in conn.execute(
+            "SELECT home_name FROM events GROUP BY home_name ORDER BY home_name LIMIT 50"
+        )
+    ]
+    conn.close()
+
+    def run():
+        for player in players:
+            processor.get_games_per_match_list(player)
+
+    return run
+
+
+def loaded_processor(ctx, n_events=500):
+    """BetProcessor completo (ELO e caches carregados) e os próximos n_events jogos"""
+    from db_get_bets import BetProcessor
+
+    tm_db, bets_db, results_db = ctx.fresh_copy(
+        "tm_data.db", "bets.db", "table_tennis_results.db"
+    )
+    processor = BetProcessor(
+        tm_db_path=tm_db, bets_db_path=bets_db, results_db_path=results_db
+    )
+    return processor, processor.get_all_upcoming_matches()[:n_events]
+
+
+@benchmark("get_match_odds")
+def bench_get_match_odds(ctx):
+    processor, matches = loaded_processor(ctx)
+    event_ids = [match["event_id"] for match in matches]
+
+    def run():
+        for event_id in event_ids:
+            processor.get_match_odds(event_id)
+
+    return run
+
+
+@benchmark("analyze_bet_value")
+def bench_analyze_bet_value(ctx):
+    processor, matches = loaded_processor(ctx)
+    books = [(match, processor.get_match_odds(match["event_id"])) for match in matches]
+
+    def run():
+        for match, odds in books:
+            processor.analyze_bet_value(match, odds)
+
+    return run
+
+
+@benchmark("player_stats_sync")
+def bench_player_stats_sync(ctx):
+    from player_stats import PlayerStatsCache
+
+    def run():
+        (results_db,) = ctx.fresh_copy("table_tennis_results.db")
+        PlayerStatsCache(results_db).sync()
+
+    return run
+
+
+@benchmark("process_all_matches")
+def bench_process_all_matches(ctx):
+    from db_get_bets import BetProcessor
+
+    def run():
+        tm_db, bets_db, results_db = ctx.fresh_copy(
+            "tm_data.db", "bets.db", "table_tennis_results.db"
+        )
+        processor = BetProcessor(
+            tm_db_path=tm_db,
+            bets_db_path=bets_db,
+            results_db_path=results_db,
+        )
+        processor.process_all_matches()
+
+    return run
+
+
+@benchmark("process_all_matches_parallel")
+def bench_process_all_matches_parallel(ctx):
+    from db_get_bets import BetProcessor
+
+    workers = min(4, os.cpu_count() or 1)
+
+    def run():
+        tm_db, bets_db, results_db = ctx.fresh_copy(
+            "tm_data.db", "bets.db", "table_tennis_results.db"
+        )
+        processor = BetProcessor(
+            tm_db_path=tm_db,
+            bets_db_path=bets_db,
+            results_db_path=results_db,
+        )
+        processor.process_all_matches(workers=max(workers, 2))
+
+    return run
+
+
+@benchmark("save_bets")
+def bench_save_bets(ctx):
+    """~3 mil apostas candidatas: metade já existe sem mudança, um quarto com
+    odds novas e um quarto de apostas novas"""
+    import sqlite3
+
+    skipped = {"id", "result", "profit", "actual_result", "created_at", "updated_at"}
+    conn = sqlite3.connect(ctx.path("bets.db"))
+    conn.row_factory = sqlite3.Row
+    existing = [
+        {k: row[k] for k in row.keys() if k not in skipped}
+        for row in conn.execute("SELECT * FROM bets ORDER BY id LIMIT 2400")
+    ]
+    conn.close()
+    candidates = existing[:1600]
+    for bet in existing[1600:2000]:
+        candidates.append(dict(bet, odds=bet["odds"] + 0.01))
+    for bet in existing[2000:]:
+        candidates.append(dict(bet, event_id=bet["event_id"] + 1_000_000_000))
+
+    def run():
+        (bets_db,) = ctx.fresh_copy("bets.db")
+        processor = make_processor(None, bets_db=bets_db)
+        processor.save_top_bets_by_league([dict(bet) for bet in candidates])
+
+    return run
+
+
+@benchmark("save_odds_batch")
+def bench_save_odds_batch(ctx):
+    from monitor import DatabaseManager
+
+    payloads = []
+    for i in range(2000):
+        odds = [
+            {"name": "To Win", "header": "1", "odds": "1.83"},
+            {"name": "To Win", "header": "2", "odds": "1.95"},
+        ]
+        for line in ("75.5", "76.5", "77.5"):
+            odds.append({"name": "Total", "header": "1", "handicap": line, "odds": "1.85"})
+            odds.append({"name": "Total", "header": "2", "handicap": line, "odds": "1.90"})
+        payloads.append(
+            (str(199_000_000 + i), {"main": {"sp": {"match_lines": {"odds": odds}}}})
+        )
+
+    def run():
+        (tm_db,) = ctx.fresh_copy("tm_data.db")
+        db = DatabaseManager(db_name=tm_db)
+        db.save_odds_batch(payloads)
+        db.close()
+
+    return run
+
+
+@benchmark("settlement")
+def bench_settlement(ctx):
+    import http_fixtures
+    from db_get_bets_results import BetResultsChecker
+
+    os.environ["HTTP_REPLAY_PATH"] = ctx.path("fixtures.jsonl")
+    os.environ.setdefault("BETSAPI_API_KEY", "offline")
+    http_fixtures._replayer = None
+
+    def run():
+        (bets_db,) = ctx.fresh_copy("bets.db")
+        checker = BetResultsChecker(
+            bets_db_path=bets_db,
+            results_db_path=ctx.path("table_tennis_results.db"),
+        )
+        checker.process_results()
+
+    return run
+
+
+@benchmark("telegram_get_new_bets")
+def bench_get_new_bets(ctx):
+    from send_telegram import TelegramBetNotifier
+
+    # O notificador cria o índice da estratégia em bets.db
+    (bets_db,) = ctx.fresh_copy("bets.db")
+    notifier = TelegramBetNotifier(bets_db_path=bets_db, connect_bot=False)
+    return notifier.get_new_bets
+
+
+@benchmark("telegram_profit_summary")
+def bench_profit_summary(ctx):
+    from send_telegram import TelegramBetNotifier
+
+    (bets_db,) = ctx.fresh_copy("bets.db")
+    notifier = TelegramBetNotifier(bets_db_path=bets_db, connect_bot=False)
+    # Primeira chamada materializa o resumo (se for o caso) fora da medição
+    notifier.get_profit_summary()
+    return lambda: notifier.format_profit_message(notifier.get_profit_summary())
+
+
+@benchmark("strategy_filters_v2")
+def bench_strategy_filters_v2(ctx):
+    import sqlite3
+
+    import pandas as pd
+
+    from estrategia import apply_filters_v2
+
+    conn = sqlite3.connect(ctx.path("bets.db"))
+    bets = pd.read_sql_query("SELECT * FROM bets", conn)
+    conn.close()
+    return lambda: apply_filters_v2(bets)
+
+
+@benchmark("analytics_roi_report")
+def bench_analytics_roi_report(ctx):
+    import os
+
+    from analytics import BetAnalytics
+
+    (bets_db,) = ctx.fresh_copy("bets.db")
+    analytics = BetAnalytics(
+        bets_db_path=bets_db,
+        results_db_path=ctx.path("table_tennis_results.db"),
+        tm_db_path=ctx.path("tm_data.db"),
+        export_dir=os.path.join(os.path.dirname(bets_db), "parquet"),
+    )
+    where = "instr(b.selection, 'Under') > 0 AND b.handicap > 75.5"
+
+    def run():
+        # Relatórios de analise.py/test.py: liga x handicap, acumulado por ROI
+        analytics.report(by=("league_name", "handicap"), where=where)
+        analytics.threshold_report(by=("league_name", "handicap"), where=where)
+        analytics.report(by=("month", "roi_bucket"))
+
+    return run
+
+
+@benchmark("backtest_full_history")
+def bench_backtest(ctx):
+    from backtest import BacktestEngine
+
+    def run():
+        engine = BacktestEngine(
+            ctx.path("tm_data.db"), ctx.path("table_tennis_results.db")
+        ).load()
+        engine.simulate()
+
+    return run
+
+
+@benchmark("sweep_grid")
+def bench_sweep(ctx):
+    from backtest import BacktestEngine
+    from sweep import DEFAULT_GRID, SweepIndex, run_sweep
+
+    engine = BacktestEngine(
+        ctx.path("tm_data.db"), ctx.path("table_tennis_results.db")
+    ).load()
+    grid = dict(
+        DEFAULT_GRID, lookback=[10, 20, 50], elo_diff_threshold=[50, 100, 150, 200]
+    )
+    index = SweepIndex.from_backtest(engine, grid)
+    return lambda: run_sweep(index, grid)
+
+
+def import_profile(module, search_dir=ROOT):
+    """Importa o módulo num interpretador novo com python -X importtime.
+
+    Retorna (tempo cumulativo do import em segundos, módulos pesados carregados).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=search_dir,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join([search_dir, ROOT])),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, total, name = line[len("import time:") :].split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total)
+    heavy = [name for name in HEAVY_MODULES if name in cumulative]
+    return cumulative.get(module, 0) / 1e6, heavy
+
+
+def register_import_benchmark(module, search_dir):
+    @benchmark(f"import_{module}")
+    def bench_import(ctx):
+        return lambda: import_profile(module, search_dir)
+
+
+for _module, _search_dir in ENTRY_POINTS.items():
+    register_import_benchmark(_module, _search_dir)
+
+
+def print_import_report():
+    print(f"\n{'entry point':24} {'import':>9}  módulos pesados")
+    for module, search_dir in ENTRY_POINTS.items():
+        seconds, heavy = import_profile(module, search_dir)
+        print(f"{module:24} {seconds:8.3f}s  {', '.join(heavy) or '-'}")
+
+
+def time_callable(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "runs": repeat,
+    }
+
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """Retorna a lista de benchmarks que regrediram em relação ao baseline"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    print(f"\n{'benchmark':32} {'baseline':>10} {'atual':>10} {'Δ':>8}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["min"]
+        now = current["min"]
+        change = (now - before) / before if before else 0
+        flag = "  ⚠️" if change > tolerance else ""
+        print(f"{name:32} {before:10.4f} {now:10.4f} {change:+8.1%}{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m ou um inteiro")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--only", nargs="*", help="Executa apenas estes benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    parser.add_argument("--baseline", default=None, help="JSON para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.20)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help="Só mostra o tempo de import de cada entry point e sai",
+    )
+    args = parser.parse_args()
+
+    if args.importtime:
+        print_import_report()
+        return
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    data_dir = args.data_dir or os.path.join(BENCH_DIR, "data", str(args.scale))
+    manifest_path = os.path.join(data_dir, "manifest.json")
+    if args.regenerate or not os.path.exists(manifest_path):
+        print(f"🏗️  Gerando dados sintéticos ({args.scale}) em {data_dir}...")
+        manifest = generate(parse_scale(args.scale), data_dir)
+    else:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    ctx = BenchContext(data_dir, manifest)
+    results = {}
+    try:
+        for name, factory in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            func = factory(ctx)
+            results[name] = time_callable(func, args.repeat)
+            print(
+                f"⏱️  {name:32} min {results[name]['min']:.4f}s | "
+                f"mediana {results[name]['median']:.4f}s"
+            )
+    finally:
+        ctx.cleanup()
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"bench_{args.scale}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "scale": str(args.scale),
+                    "manifest": manifest,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "timestamp": datetime.now().isoformat(),
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\n💾 Resultados salvos em {output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressões acima de {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão em relação ao baseline")
+
+
+if __name__ == "__main__":
+    main()
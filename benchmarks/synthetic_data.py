@@ -0,0 +1,386 @@
+"""Gera bancos sintéticos (table_tennis_results.db, tm_data.db, bets.db) para benchmarks.
+
+Uso:
+    python benchmarks/synthetic_data.py --scale 100k --out benchmarks/data/100k
+
+As escalas nomeadas são 10k, 100k e 1m eventos finalizados; qualquer inteiro
+também é aceito. Os jogadores vêm de um pool fixo por liga, com força
+individual, e os placares por set seguem as regras do tênis de mesa (11
+pontos, diferença de 2), então totais de games e ELO ficam realistas.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# (league_id, nome, tamanho do pool de jogadores, peso no volume de jogos)
+LEAGUES = [
+    (10047071, "Setka Cup Women", 80, 0.12),
+    (10047098, "Setka Cup", 160, 0.30),
+    (10068516, "Challenger Series TT", 60, 0.08),
+    (10048210, "Czech Liga Pro", 200, 0.30),
+    (10073432, "TT Cup", 150, 0.15),
+    (10073465, "TT Elite Series", 40, 0.05),
+]
+
+FIRST_NAMES = [
+    "Jan", "Petr", "Martin", "Tomas", "Jiri", "Pavel", "Lukas", "David", "Ondrej",
+    "Jakub", "Oleksandr", "Dmytro", "Andrii", "Serhii", "Vitalii", "Yurii", "Ivan",
+    "Maksym", "Bohdan", "Roman", "Anna", "Olena", "Iryna", "Natalia", "Tetiana",
+    "Kateryna", "Marta", "Lenka", "Petra", "Eva",
+]
+LAST_NAMES = [
+    "Novak", "Svoboda", "Dvorak", "Cerny", "Prochazka", "Kucera", "Vesely",
+    "Horak", "Nemec", "Pokorny", "Shevchenko", "Bondarenko", "Kovalenko",
+    "Tkachenko", "Kravchenko", "Oliynyk", "Lysenko", "Melnyk", "Marchenko",
+    "Savchenko", "Rudenko", "Moroz", "Polishchuk", "Hrytsenko", "Zinchenko",
+]
+
+TOTAL_LINES = [74.5, 75.5, 76.5, 77.5, 78.5, 79.5, 80.5]
+
+
+def parse_scale(value):
+    value = str(value).lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def build_player_pools(rng):
+    """Cria o pool de jogadores de cada liga: lista de (id, nome, força)"""
+    pools = {}
+    next_id = 100_000
+    for league_id, league_name, size, _ in LEAGUES:
+        names = set()
+        pool = []
+        while len(pool) < size:
+            name = f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}"
+            if name in names:
+                name = f"{name} {len(pool)}"
+            names.add(name)
+            pool.append((str(next_id), name, rng.gauss(0, 1)))
+            next_id += 1
+        pools[league_id] = pool
+    return pools
+
+
+def simulate_set(rng, p_home):
+    """Simula um set e retorna (home, away)"""
+    home_wins = rng.random() < p_home
+    if rng.random() < 0.18:
+        loser = rng.randint(10, 14)
+        winner = loser + 2
+    else:
+        winner = 11
+        loser = min(9, max(0, int(rng.gauss(6.5, 2.2))))
+    return (winner, loser) if home_wins else (loser, winner)
+
+
+def simulate_match(rng, home_strength, away_strength):
+    """Simula uma partida melhor de 5 sets e retorna a lista de sets"""
+    p_home = 1 / (1 + 10 ** ((away_strength - home_strength) / 2.5))
+    # Comprime a probabilidade por set para não gerar só 3-0
+    p_set = 0.5 + (p_home - 0.5) * 0.6
+    sets = []
+    home_sets = away_sets = 0
+    while home_sets < 3 and away_sets < 3:
+        home, away = simulate_set(rng, p_set)
+        sets.append((home, away))
+        if home > away:
+            home_sets += 1
+        else:
+            away_sets += 1
+    return sets
+
+
+def pick_match(rng, pools, league_weights):
+    league_id, league_name = rng.choices(
+        [(lid, name) for lid, name, _, _ in LEAGUES], weights=league_weights
+    )[0]
+    home, away = rng.sample(pools[league_id], 2)
+    return league_id, league_name, home, away
+
+
+def create_schemas(results_db, tm_db, bets_db):
+    """Cria os schemas usando o código de inicialização do próprio projeto"""
+    from db_get_bets import BetProcessor
+    from get_matches_last30 import TableTennisResults
+    from monitor import DatabaseManager
+    from send_telegram import TelegramBetNotifier
+
+    TableTennisResults(db_path=results_db)
+    DatabaseManager(db_name=tm_db).close()
+
+    BetProcessor(
+        tm_db_path=tm_db,
+        bets_db_path=bets_db,
+        results_db_path=results_db,
+        load_models=False,
+    )
+    TelegramBetNotifier(bets_db_path=bets_db, connect_bot=False)
+
+
+def odds_from_prob(prob, margin=1.06):
+    prob = min(max(prob, 0.03), 0.97)
+    return round(1 / (prob * margin), 2)
+
+
+def generate(
+    n_events,
+    out_dir,
+    upcoming=50,
+    odds_history=20_000,
+    bet_rate=0.25,
+    pending_bets=500,
+    seed=42,
+):
+    """Gera os três bancos e um arquivo de fixtures de resultados em out_dir"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    results_db = os.path.join(out_dir, "table_tennis_results.db")
+    tm_db = os.path.join(out_dir, "tm_data.db")
+    bets_db = os.path.join(out_dir, "bets.db")
+    fixtures_path = os.path.join(out_dir, "fixtures.jsonl")
+    for path in (results_db, tm_db, bets_db, fixtures_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    create_schemas(results_db, tm_db, bets_db)
+
+    pools = build_player_pools(rng)
+    league_weights = [weight for _, _, _, weight in LEAGUES]
+    now = int(time.time())
+    history_span = max(30 * 86400, n_events * 30)
+    step = history_span / n_events
+    start_time = now - history_span
+
+    started = time.time()
+    results_conn = sqlite3.connect(results_db)
+    tm_conn = sqlite3.connect(tm_db)
+    bets_conn = sqlite3.connect(bets_db)
+    for conn in (results_conn, tm_conn, bets_conn):
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+    events_rows, scores_rows = [], []
+    tm_events, tm_odds, bets_rows, processed_rows = [], [], [], []
+    history_start = n_events - min(odds_history, n_events)
+
+    def flush():
+        results_conn.executemany(
+            """INSERT INTO events (event_id, event_time, time_status, league_id, league_name,
+            home_id, home_name, away_id, away_name, score, bestofsets)
+            VALUES (?, ?, 3, ?, ?, ?, ?, ?, ?, ?, '5')""",
+            events_rows,
+        )
+        results_conn.executemany(
+            "INSERT INTO event_scores (event_id, set_number, home_score, away_score) VALUES (?, ?, ?, ?)",
+            scores_rows,
+        )
+        events_rows.clear()
+        scores_rows.clear()
+
+    for i in range(n_events):
+        league_id, league_name, home, away = pick_match(rng, pools, league_weights)
+        sets = simulate_match(rng, home[2], away[2])
+        event_id = str(150_000_000 + i)
+        event_time = int(start_time + i * step)
+        home_sets = sum(1 for h, a in sets if h > a)
+        score = f"{home_sets}-{len(sets) - home_sets}"
+
+        events_rows.append(
+            (event_id, event_time, str(league_id), league_name,
+             home[0], home[1], away[0], away[1], score)
+        )
+        for set_number, (h, a) in enumerate(sets, start=1):
+            scores_rows.append((event_id, set_number, h, a))
+
+        if i >= history_start:
+            total_games = sum(h + a for h, a in sets)
+            tm_events.append(
+                (event_id, event_time, 3, league_id, league_name, home[1], away[1], 1)
+            )
+            tm_odds.extend(
+                synthetic_odds(rng, event_id, home[2], away[2], event_time)
+            )
+            processed_rows.append((int(event_id),))
+            if rng.random() < bet_rate:
+                bets_rows.append(
+                    synthetic_bet(rng, event_id, league_name, home, away,
+                                  event_time, total_games)
+                )
+
+        if len(events_rows) >= 50_000:
+            flush()
+
+    flush()
+    results_conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bench_events_time ON events(event_time)"
+    )
+    results_conn.commit()
+    results_conn.close()
+
+    fixtures = []
+    for j in range(upcoming):
+        league_id, league_name, home, away = pick_match(rng, pools, league_weights)
+        event_id = str(190_000_000 + j)
+        event_time = now + 600 + int(j * 3 * 86400 / max(upcoming, 1))
+        tm_events.append(
+            (event_id, event_time, 0, league_id, league_name, home[1], away[1], 1)
+        )
+        tm_odds.extend(synthetic_odds(rng, event_id, home[2], away[2], event_time))
+
+    for k in range(pending_bets):
+        league_id, league_name, home, away = pick_match(rng, pools, league_weights)
+        event_id = str(195_000_000 + k)
+        event_time = now - rng.randint(3600, 2 * 86400)
+        sets = simulate_match(rng, home[2], away[2])
+        bet = synthetic_bet(rng, event_id, league_name, home, away, event_time, None)
+        bets_rows.append(bet)
+        fixtures.append(result_fixture(event_id, home, away, sets, event_time))
+
+    tm_conn.executemany(
+        """INSERT INTO events (id, time, time_status, league_id, league_name,
+        home_team, away_team, odds_processed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        tm_events,
+    )
+    tm_conn.executemany(
+        """INSERT OR IGNORE INTO match_odds (event_id, market_type, selection, odds,
+        handicap_value, updated_at) VALUES (?, ?, ?, ?, ?, ?)""",
+        tm_odds,
+    )
+    tm_conn.commit()
+    tm_conn.close()
+
+    bets_conn.executemany(
+        """INSERT OR IGNORE INTO bets (event_id, league_name, home_team, away_team,
+        event_time, bet_type, selection, handicap, odds, fair_odds, estimated_roi,
+        result, profit, actual_result, bet_timestamp)
+        VALUES (?, ?, ?, ?, ?, 'Total', ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        bets_rows,
+    )
+    bets_conn.executemany(
+        "INSERT OR IGNORE INTO processed_events (event_id) VALUES (?)", processed_rows
+    )
+    bets_conn.execute(
+        """INSERT INTO telegram_sent_bets (bet_id)
+        SELECT id FROM bets WHERE result IS NOT NULL AND id % 2 = 0"""
+    )
+    bets_conn.commit()
+    bets_conn.close()
+
+    with open(fixtures_path, "w", encoding="utf-8") as f:
+        for fixture in fixtures:
+            f.write(json.dumps(fixture) + "\n")
+
+    manifest = {
+        "events": n_events,
+        "upcoming": upcoming,
+        "odds_history": min(odds_history, n_events),
+        "bets": len(bets_rows),
+        "pending_bets": pending_bets,
+        "seed": seed,
+        "generated_in_seconds": round(time.time() - started, 2),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def synthetic_odds(rng, event_id, home_strength, away_strength, event_time):
+    """Odds ML e linhas de Total no formato salvo por DatabaseManager.save_odds_batch"""
+    p_home = 1 / (1 + 10 ** ((away_strength - home_strength) / 2.5))
+    rows = [
+        (event_id, "To Win", "Home", odds_from_prob(p_home), "", event_time),
+        (event_id, "To Win", "Away", odds_from_prob(1 - p_home), "", event_time),
+    ]
+    main_line = rng.choice(TOTAL_LINES[1:-1])
+    for line in (main_line - 1, main_line, main_line + 1):
+        p_over = min(max(0.5 + (76.5 - line) * 0.08 + rng.gauss(0, 0.05), 0.1), 0.9)
+        rows.append((event_id, "Total", f"Over {line}", odds_from_prob(p_over), str(line), event_time))
+        rows.append((event_id, "Total", f"Under {line}", odds_from_prob(1 - p_over), str(line), event_time))
+    return rows
+
+
+def synthetic_bet(rng, event_id, league_name, home, away, event_time, total_games):
+    """Aposta Total no formato de bets; total_games=None gera aposta pendente"""
+    line = rng.choice([75.5, 76.5, 77.5, 78.5])
+    selection = "Under" if rng.random() < 0.8 else "Over"
+    odds = round(rng.uniform(1.6, 2.3), 2)
+    est_prob = rng.uniform(0.5, 0.75)
+    roi = (est_prob * (odds - 1) - (1 - est_prob)) * 100
+    result = profit = actual = None
+    if total_games is not None:
+        won = total_games < line if selection == "Under" else total_games > line
+        result = 1 if won else 0
+        profit = (odds - 1) if won else -1
+        actual = f"{total_games} games"
+    return (
+        int(event_id), league_name, home[1], away[1],
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(event_time)),
+        f"{selection} {line}", line, odds, round(1 / est_prob, 3), roi,
+        result, profit, actual,
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(event_time - 3600)),
+    )
+
+
+def result_fixture(event_id, home, away, sets, event_time):
+    """Resposta de /v1/bet365/result para uso com http_fixtures"""
+    home_sets = sum(1 for h, a in sets if h > a)
+    return {
+        "endpoint": "/v1/bet365/result",
+        "params": {"event_id": event_id},
+        "status": 200,
+        "body": {
+            "success": 1,
+            "results": [
+                {
+                    "id": event_id,
+                    "time": str(event_time),
+                    "time_status": "3",
+                    "home": {"id": home[0], "name": home[1]},
+                    "away": {"id": away[0], "name": away[1]},
+                    "ss": f"{home_sets}-{len(sets) - home_sets}",
+                    "scores": {
+                        str(n): {"home": str(h), "away": str(a)}
+                        for n, (h, a) in enumerate(sets, start=1)
+                    },
+                }
+            ],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m ou um inteiro")
+    parser.add_argument("--out", default=None, help="Diretório de saída")
+    parser.add_argument("--upcoming", type=int, default=50)
+    parser.add_argument("--odds-history", type=int, default=20_000)
+    parser.add_argument("--pending-bets", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    n_events = parse_scale(args.scale)
+    out_dir = args.out or os.path.join(ROOT, "benchmarks", "data", str(args.scale))
+    manifest = generate(
+        n_events,
+        out_dir,
+        upcoming=args.upcoming,
+        odds_history=args.odds_history,
+        pending_bets=args.pending_bets,
+        seed=args.seed,
+    )
+    print(f"✅ Dados sintéticos gerados em {out_dir}: {manifest}")
+
+
+if __name__ == "__main__":
+    main()
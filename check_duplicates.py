@@ -26,7 +26,7 @@ class BetCleaner:
             id, event_id, league_name, home_team, away_team, 
             event_time, bet_type, selection, odds, created_at
         FROM bets
-        WHERE result IS NULL
+        WHERE result IS NULL AND actual_result IS NOT 'void'
         ORDER BY league_name, home_team, away_team, event_time
         """
 
@@ -3,6 +3,10 @@ import pandas as pd
 from datetime import datetime
 import random
 
+from elo_engine import RatingHistory
+from player_registry import PlayerRegistry
+from player_stats import WINDOWS, PlayerStatsCache
+
 
 class DetailedPlayerStatsAnalyzer:
     def __init__(
@@ -10,6 +14,47 @@ class DetailedPlayerStatsAnalyzer:
     ):
         self.tm_db_path = tm_db_path
         self.results_db_path = results_db_path
+        self.rating_history = None
+        self.player_stats = None
+        self.player_registry = None
+
+    def resolve_player(self, player_name):
+        if self.player_registry is None:
+            self.player_registry = PlayerRegistry(self.results_db_path)
+            self.player_registry.sync()
+            self.player_registry.load()
+        return self.player_registry.resolve(player_name)
+
+    def get_ratings_before_match(self, match):
+        """ELO de cada jogador no instante do jogo (só partidas anteriores)"""
+        if self.rating_history is None:
+            self.rating_history = RatingHistory.from_results_db(self.results_db_path)
+        timestamp = int(match["event_time"].timestamp())
+        return (
+            self.rating_history.rating_at(self.resolve_player(match["home_team"]), timestamp),
+            self.rating_history.rating_at(self.resolve_player(match["away_team"]), timestamp),
+        )
+
+    def print_current_form(self, player_name):
+        """Resumo atual do jogador a partir do cache de estatísticas"""
+        if self.player_stats is None:
+            self.player_stats = PlayerStatsCache(self.results_db_path)
+            self.player_stats.sync()
+            self.player_stats.load()
+        player_id = self.resolve_player(player_name)
+        print(f"\n📦 FORMA ATUAL DE {player_name} (cache):")
+        for window in WINDOWS:
+            stats = self.player_stats.get(player_id, window)
+            if not stats or not stats["matches"]:
+                print(f"   {window:>4}: sem partidas")
+                continue
+            decided = stats["wins"] + stats["losses"]
+            win_rate = stats["wins"] / decided * 100 if decided else 0
+            print(
+                f"   {window:>4}: {stats['matches']:2} jogos | WR {win_rate:5.1f}% | "
+                f"sets {stats['sets_won']}-{stats['sets_lost']} | "
+                f"média {stats['avg_games']:.1f} games | O75.5 {stats['over_75_5'] * 100:.0f}%"
+            )
 
     def get_random_match_from_tm_db(self):
         """Obtém um jogo aleatório do banco tm_data.db para análise"""
@@ -215,6 +260,9 @@ class DetailedPlayerStatsAnalyzer:
         home_stats = self.calculate_detailed_stats(home_player, home_matches)
         away_stats = self.calculate_detailed_stats(away_player, away_matches)
 
+        home_elo, away_elo = self.get_ratings_before_match(match)
+        print(f"\n📐 ELO antes do jogo: {home_player} {home_elo:.0f} x {away_elo:.0f} {away_player}")
+
         # Exibir resultados
         print(f"\n📊 ESTATÍSTICAS DETALHADAS DE {home_player}:")
         print(f"   Total de jogos: {home_stats['total_matches']}")
@@ -275,6 +323,9 @@ class DetailedPlayerStatsAnalyzer:
                 result = "OVER" if games > 75.5 else "UNDER"
                 print(f"     Jogo {i + 1}: {games} games → {result}")
 
+        self.print_current_form(home_player)
+        self.print_current_form(away_player)
+
         # Salvar resultados em um arquivo CSV
         self.save_detailed_stats_to_csv(
             home_player, home_stats, away_player, away_stats, match
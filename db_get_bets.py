@@ -1,10 +1,18 @@
+import argparse
+import multiprocessing
 import sqlite3
-import pandas as pd
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
 import logging
 from colorama import Fore, Style, init
-from collections import defaultdict
+
+from form_engine import FormEngine
+from h2h_index import HeadToHeadIndex
+from odds_book import OddsBook
+from player_registry import PlayerRegistry
+from player_stats import PlayerStatsCache
+from settlement_scheduler import PENDING_INDEX_SQL
+from strategy import load_strategy
 
 init(autoreset=True)
 
@@ -26,8 +34,73 @@ MIN_ROI_UNBALANCED_OVER = 15  # ROI mínimo para Over em jogo desequilibrado
 MIN_ROI_BALANCED_UNDER = 15  # ROI mínimo para Under em jogo equilibrado
 MIN_ROI_UNBALANCED_UNDER = 25  # ROI mínimo para Under em jogo desequilibrado
 
-# --- BLACKLIST DE LIGAS ---
-OU_LEAGUE_BLACKLIST = ["TT Elite Series"]
+# --- CONFRONTO DIRETO (H2H) ---
+H2H_PROB_WEIGHT = 0.0  # Peso do H2H na probabilidade O/U (0 = desativado)
+H2H_MIN_MEETINGS = 3  # Mínimo de confrontos com placar para usar o H2H
+
+# --- BLACKLIST DE LIGAS (config/strategy.json) ---
+OU_LEAGUE_BLACKLIST = load_strategy().ou_league_blacklist
+
+# --- GRAVAÇÃO DAS APOSTAS ---
+# Sinais de form_engine gravados em colunas numéricas de bets, para que os
+# filtros de config/strategy.json possam usá-los (NULL sem partidas recentes)
+FORM_FEATURES = {"streak": "INTEGER", "win_rate": "REAL", "avg_games": "REAL"}
+FORM_COLUMNS = {
+    f"{side}_form_{name}": column_type
+    for side in ("home", "away")
+    for name, column_type in FORM_FEATURES.items()
+}
+
+BET_COLUMNS = [
+    "event_id",
+    "league_name",
+    "home_team",
+    "away_team",
+    "event_time",
+    "bet_type",
+    "selection",
+    "handicap",
+    "odds",
+    "fair_odds",
+    "estimated_roi",
+    "home_elo_at_bet",
+    "away_elo_at_bet",
+    "elo_prob_home",
+    "implied_prob",
+    "bet_edge",
+    "min_roi_required",
+    "bet_decision_reason",
+    "player_form_home",
+    "player_form_away",
+    "h2h_summary",
+    "bet_timestamp",
+    *FORM_COLUMNS,
+]
+# Colunas reescritas quando a aposta já existe
+BET_UPDATE_COLUMNS = [
+    "odds",
+    "estimated_roi",
+    "bet_timestamp",
+    "fair_odds",
+    "home_elo_at_bet",
+    "away_elo_at_bet",
+    "elo_prob_home",
+    "implied_prob",
+    "bet_edge",
+    "min_roi_required",
+    "bet_decision_reason",
+    "player_form_home",
+    "player_form_away",
+    "h2h_summary",
+    *FORM_COLUMNS,
+]
+# bet_timestamp muda a cada execução, então não conta como alteração
+BET_COMPARED_COLUMNS = [c for c in BET_UPDATE_COLUMNS if c != "bet_timestamp"]
+
+# --- AVALIAÇÃO PARALELA ---
+EVALUATION_CHUNK_SIZE = 64  # Jogos por tarefa enviada a cada processo
+
+_WORKER_PROCESSOR = None
 
 
 class BetProcessor:
@@ -36,7 +109,10 @@ class BetProcessor:
         tm_db_path: str = "tm_data.db",
         bets_db_path: str = "bets.db",
         results_db_path: str = "table_tennis_results.db",
+        load_models: bool = True,
     ):
+        """load_models=False só cria o schema de bets.db, sem registro de
+        jogadores, ELO e caches (benchmarks e testes)"""
         self.tm_db_path = tm_db_path
         self.bets_db_path = bets_db_path
         self.results_db_path = results_db_path
@@ -49,6 +125,16 @@ class BetProcessor:
             10073465: "TT Elite Series",
         }
         self.init_bets_db()
+        if not load_models:
+            self.player_registry = None
+            self.player_ratings = {}
+            self.player_stats = None
+            self.h2h_index = None
+            self.form_engine = None
+            return
+        self.player_registry = PlayerRegistry(self.results_db_path)
+        self.player_registry.sync()
+        self.player_registry.load()
         logger.info(
             "🧠 Calculando ratings ELO de todos os jogadores a partir do histórico..."
         )
@@ -56,6 +142,15 @@ class BetProcessor:
         logger.info(
             f"✅ Ratings ELO calculados para {len(self.player_ratings)} jogadores."
         )
+        self.player_stats = PlayerStatsCache(self.results_db_path)
+        self.player_stats.sync()
+        self.player_stats.load()
+        self.h2h_index = HeadToHeadIndex(self.results_db_path)
+        self.h2h_index.sync()
+        self.h2h_index.load()
+        self.form_engine = FormEngine(self.results_db_path)
+        self.form_engine.sync()
+        self.form_engine.load()
 
     def _get_expected_score(self, rating1, rating2):
         return 1 / (1 + 10 ** ((rating2 - rating1) / 400))
@@ -69,32 +164,23 @@ class BetProcessor:
     def _calculate_all_player_elos(self):
         conn = sqlite3.connect(self.results_db_path)
         query = """
-        SELECT home_name, away_name, score
+        SELECT home_player_id, away_player_id, score
         FROM events 
         WHERE time_status = 3 AND score IS NOT NULL AND score != ''
         ORDER BY event_time ASC
         """
-        df = pd.read_sql_query(query, conn)
+        rows = conn.execute(query).fetchall()
         conn.close()
 
-        ratings = defaultdict(lambda: DEFAULT_ELO)
-
-        for _, row in df.iterrows():
-            home_player, away_player = row["home_name"], row["away_name"]
+        if not rows:
+            return {}
 
-            try:
-                home_score, away_score = map(int, row["score"].split("-"))
-            except ValueError:
-                continue  # Ignora scores mal formatados
+        from elo_engine import compute_elo_ratings  # NumPy só ao calcular o ELO
 
-            s1 = 1 if home_score > away_score else 0
-            r1, r2 = ratings[home_player], ratings[away_player]
-
-            new_r1, new_r2 = self._update_ratings(r1, r2, s1, 1 - s1)
-            ratings[home_player] = new_r1
-            ratings[away_player] = new_r2
-
-        return dict(ratings)
+        home_ids, away_ids, scores = zip(*rows)
+        return compute_elo_ratings(
+            home_ids, away_ids, scores, k_factor=K_FACTOR, default_elo=DEFAULT_ELO
+        )
 
     def init_bets_db(self):
         conn = sqlite3.connect(self.bets_db_path)
@@ -130,13 +216,27 @@ class BetProcessor:
             player_form_away TEXT,
             h2h_summary TEXT,
             bet_timestamp TIMESTAMP,
+            home_form_streak INTEGER,
+            home_form_win_rate REAL,
+            home_form_avg_games REAL,
+            away_form_streak INTEGER,
+            away_form_win_rate REAL,
+            away_form_avg_games REAL,
             UNIQUE(event_id, bet_type, selection, handicap)
         )
         """)
+        # Bancos criados antes das colunas de forma
+        cursor.execute("PRAGMA table_info(bets)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in FORM_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE bets ADD COLUMN {column} {column_type}")
 
         cursor.execute(
             "CREATE TABLE IF NOT EXISTS processed_events (event_id INTEGER PRIMARY KEY, processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
         )
+        # Apostas sem resultado (liquidação, check_duplicates.py)
+        cursor.execute(PENDING_INDEX_SQL)
         conn.commit()
         conn.close()
 
@@ -151,20 +251,6 @@ class BetProcessor:
         conn.close()
         return processed_ids
 
-    def mark_event_processed(self, event_id):
-        conn = sqlite3.connect(self.bets_db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT OR IGNORE INTO processed_events (event_id) VALUES (?)",
-                (event_id,),
-            )
-            conn.commit()
-        except sqlite3.Error as e:
-            logger.error(f"Erro ao marcar evento {event_id}: {e}")
-        finally:
-            conn.close()
-
     def get_all_upcoming_matches(self):
         conn = sqlite3.connect(self.tm_db_path)
         today = date.today()
@@ -178,49 +264,65 @@ class BetProcessor:
             else:
                 query = "SELECT id, league_name, home_team, away_team, time FROM events WHERE time_status = 0 AND league_id = ? AND date(datetime(time, 'unixepoch')) >= date(?)"
                 params = [league_id, today]
-            df = pd.read_sql_query(query, conn, params=params)
-            for _, row in df.iterrows():
+            for event_id, league_name, home_team, away_team, event_time in conn.execute(
+                query, params
+            ):
                 upcoming_matches.append(
                     {
-                        "event_id": row["id"],
-                        "league_name": row["league_name"],
-                        "home_team": row["home_team"],
-                        "away_team": row["away_team"],
-                        "event_time": datetime.fromtimestamp(row["time"]),
+                        "event_id": event_id,
+                        "league_name": league_name,
+                        "home_team": home_team,
+                        "away_team": away_team,
+                        "event_time": datetime.fromtimestamp(event_time),
                     }
                 )
         conn.close()
         return upcoming_matches
 
     def get_match_odds(self, event_id):
+        """Odds To Win/Total do evento como OddsBook"""
         conn = sqlite3.connect(self.tm_db_path)
-        query = """SELECT market_type, selection, odds, handicap_value FROM match_odds WHERE event_id = ? AND market_type IN ('To Win', 'Total')"""
-        df = pd.read_sql_query(query, conn, params=(event_id,))
+        odds_book = OddsBook.from_db(conn, event_id)
         conn.close()
-        return df
+        return odds_book
+
+    def resolve_player(self, player_name):
+        """Id inteiro do jogador (tolerante a variações de grafia) ou None"""
+        if self.player_registry is None:
+            return None
+        return self.player_registry.resolve(player_name)
 
     def get_games_per_match_list(self, player_name, limit=20):
+        player_id = self.resolve_player(player_name)
+        if self.player_stats is not None and player_id is not None:
+            games_list = self.player_stats.games_list(player_id, limit)
+            if games_list is not None:
+                return games_list
+
         conn = sqlite3.connect(self.results_db_path)
-        matches_df = pd.read_sql_query(
-            "SELECT event_id FROM events WHERE (home_name = ? OR away_name = ?) ORDER BY event_time DESC LIMIT ?",
-            conn,
-            params=(player_name, player_name, limit),
-        )
-        games_list = []
-        for _, match in matches_df.iterrows():
-            detailed_scores = pd.read_sql_query(
-                "SELECT home_score, away_score FROM event_scores WHERE event_id = ?",
-                conn,
-                params=(match["event_id"],),
-            )
-            total_games = (
-                detailed_scores["home_score"].sum()
-                + detailed_scores["away_score"].sum()
-            )
-            if total_games > 0:
-                games_list.append(total_games)
+        rows = conn.execute(
+            """
+            SELECT (SELECT SUM(home_score) + SUM(away_score)
+                    FROM event_scores WHERE event_id = e.event_id)
+            FROM events e
+            WHERE (e.home_name = ? OR e.away_name = ?)
+            ORDER BY e.event_time DESC LIMIT ?
+            """,
+            (player_name, player_name, limit),
+        ).fetchall()
         conn.close()
-        return games_list
+        return [total for (total,) in rows if total and total > 0]
+
+    def get_totals_distribution(self, player_name, limit=20):
+        """Totais recentes do jogador como array ordenado (P(total > x) por busca binária)"""
+        player_id = self.resolve_player(player_name)
+        if self.player_stats is not None and player_id is not None:
+            distribution = self.player_stats.distribution(player_id, limit)
+            if distribution is not None:
+                return distribution
+        from totals_model import TotalsDistribution  # NumPy só para quem analisa
+
+        return TotalsDistribution(self.get_games_per_match_list(player_name, limit))
 
     def analyze_over_under_bet_strategy(
         self,
@@ -233,6 +335,7 @@ class BetProcessor:
         away_rating,
         ml_odds_home,
         ml_odds_away,
+        est_prob=None,
     ):
         # 1. Avaliar o equilíbrio do confronto usando ELO e Odds ML
         elo_diff = abs(home_rating - away_rating)
@@ -268,30 +371,18 @@ class BetProcessor:
             return False, 0, 0, decision_reason
 
         # 3. Calcular probabilidade estimada e ROI
-        if "Over" in selection:
-            home_prob = (
-                sum(1 for g in home_games if g > handicap_value) / len(home_games)
-                if home_games
-                else 0
-            )
-            away_prob = (
-                sum(1 for g in away_games if g > handicap_value) / len(away_games)
-                if away_games
-                else 0
+        # (analyze_bet_value já passa est_prob calculado para todas as linhas do evento)
+        if est_prob is None:
+            from totals_model import as_distribution, score_total_lines
+
+            est_prob = float(
+                score_total_lines(
+                    as_distribution(home_games),
+                    as_distribution(away_games),
+                    [handicap_value],
+                    ["Over" in selection],
+                )[0]
             )
-        else:  # Under
-            home_prob = (
-                sum(1 for g in home_games if g < handicap_value) / len(home_games)
-                if home_games
-                else 0
-            )
-            away_prob = (
-                sum(1 for g in away_games if g < handicap_value) / len(away_games)
-                if away_games
-                else 0
-            )
-
-        est_prob = (home_prob + away_prob) / 2
         roi = ((est_prob * (odds_value - 1)) - (1 - est_prob)) * 100
 
         # 4. Decisão final
@@ -309,68 +400,73 @@ class BetProcessor:
 
         return accept, est_prob, roi, decision_reason
 
-    def analyze_bet_value(self, match, odds_df):
+    def analyze_bet_value(self, match, odds_book):
+        from totals_model import TotalsDistribution, line_probs, score_total_lines
+
         valuable_bets = []
         home_player, away_player = match["home_team"], match["away_team"]
-        home_rating = self.player_ratings.get(home_player, DEFAULT_ELO)
-        away_rating = self.player_ratings.get(away_player, DEFAULT_ELO)
-
-        # Buscar odds ML para determinar o equilíbrio do confronto
-        ml_odds_home = (
-            odds_df[
-                (odds_df["market_type"] == "To Win") & (odds_df["selection"] == "Home")
-            ]["odds"].iloc[0]
-            if not odds_df[
-                (odds_df["market_type"] == "To Win") & (odds_df["selection"] == "Home")
-            ].empty
-            else 0
-        )
-        ml_odds_away = (
-            odds_df[
-                (odds_df["market_type"] == "To Win") & (odds_df["selection"] == "Away")
-            ]["odds"].iloc[0]
-            if not odds_df[
-                (odds_df["market_type"] == "To Win") & (odds_df["selection"] == "Away")
-            ].empty
-            else 0
-        )
-
-        for _, odds_row in odds_df.iterrows():
-            market, selection, odds_value, handicap = (
-                odds_row["market_type"],
-                odds_row["selection"],
-                odds_row["odds"],
-                odds_row["handicap_value"],
+        home_id = self.resolve_player(home_player)
+        away_id = self.resolve_player(away_player)
+        home_rating = self.player_ratings.get(home_id, DEFAULT_ELO)
+        away_rating = self.player_ratings.get(away_id, DEFAULT_ELO)
+
+        # Odds ML para determinar o equilíbrio do confronto
+        ml_odds_home = odds_book.ml_home
+        ml_odds_away = odds_book.ml_away
+
+        # Linhas Total válidas do evento, pontuadas depois numa única chamada vetorizada
+        total_lines = odds_book.totals
+        if not total_lines:
+            return valuable_bets
+
+        if match["league_name"] in OU_LEAGUE_BLACKLIST:
+            logger.info(f"❌ Liga {match['league_name']} na blacklist. Ignorando.")
+            return valuable_bets
+
+        home_dist = self.get_totals_distribution(home_player)
+        away_dist = self.get_totals_distribution(away_player)
+
+        if not len(home_dist) or not len(away_dist):
+            logger.info(
+                f"❌ Dados históricos insuficientes para {home_player} ou {away_player}. Ignorando."
             )
+            return valuable_bets
+
+        lines = [line.handicap for line in total_lines]
+        is_over = [line.is_over for line in total_lines]
+        est_probs = score_total_lines(home_dist, away_dist, lines, is_over)
+
+        player_form_home = player_form_away = "N/A"
+        form_values = dict.fromkeys(FORM_COLUMNS)
+        if self.form_engine is not None:
+            player_form_home = self.form_engine.summary(home_id)
+            player_form_away = self.form_engine.summary(away_id)
+            for side, player_id in (("home", home_id), ("away", away_id)):
+                features = self.form_engine.features(player_id)
+                if features["matches"]:
+                    for name in FORM_FEATURES:
+                        form_values[f"{side}_form_{name}"] = features[name]
+
+        h2h_summary = "N/A"
+        if self.h2h_index is not None:
+            h2h_summary = self.h2h_index.summary(home_id, away_id)
+            if H2H_PROB_WEIGHT > 0:
+                h2h_totals = self.h2h_index.recent_totals(home_id, away_id)
+                if len(h2h_totals) >= H2H_MIN_MEETINGS:
+                    est_probs = (1 - H2H_PROB_WEIGHT) * est_probs + H2H_PROB_WEIGHT * (
+                        line_probs(TotalsDistribution(h2h_totals), lines, is_over)
+                    )
 
-            if market != "Total" or not handicap:
-                continue
-
-            if match["league_name"] in OU_LEAGUE_BLACKLIST:
-                logger.info(f"❌ Liga {match['league_name']} na blacklist. Ignorando.")
-                continue
-
-            try:
-                handicap_value = float(
-                    str(handicap).replace("O ", "").replace("U ", "")
-                )
-            except ValueError:
-                logger.warning(f"Handicap inválido: {handicap}. Ignorando.")
-                continue
-
-            home_games_list = self.get_games_per_match_list(home_player)
-            away_games_list = self.get_games_per_match_list(away_player)
-
-            if not home_games_list or not away_games_list:
-                logger.info(
-                    f"❌ Dados históricos insuficientes para {home_player} ou {away_player}. Ignorando."
-                )
-                continue
-
+        for line, line_prob in zip(total_lines, est_probs):
+            selection, odds_value, handicap_value = (
+                line.selection,
+                line.odds,
+                line.handicap,
+            )
             accept_bet, est_prob, estimated_roi, decision_reason = (
                 self.analyze_over_under_bet_strategy(
-                    home_games_list,
-                    away_games_list,
+                    home_dist,
+                    away_dist,
                     handicap_value,
                     selection,
                     odds_value,
@@ -378,6 +474,7 @@ class BetProcessor:
                     away_rating,
                     ml_odds_home,
                     ml_odds_away,
+                    est_prob=float(line_prob),
                 )
             )
 
@@ -407,7 +504,7 @@ class BetProcessor:
                         "home_team": home_player,
                         "away_team": away_player,
                         "event_time": match["event_time"].isoformat(),
-                        "bet_type": market,
+                        "bet_type": "Total",
                         "selection": selection,
                         "handicap": handicap_value,
                         "odds": odds_value,
@@ -422,10 +519,11 @@ class BetProcessor:
                         "bet_edge": est_prob - (1 / odds_value),
                         "min_roi_required": min_roi_for_record,
                         "bet_decision_reason": decision_reason,
-                        "player_form_home": "N/A",
-                        "player_form_away": "N/A",
-                        "h2h_summary": "N/A",
+                        "player_form_home": player_form_home,
+                        "player_form_away": player_form_away,
+                        "h2h_summary": h2h_summary,
                         "bet_timestamp": datetime.now().isoformat(),
+                        **form_values,
                     }
                 )
             else:
@@ -435,82 +533,112 @@ class BetProcessor:
 
         return valuable_bets
 
-    def save_top_bets_by_league(self, bets):
-        conn = sqlite3.connect(self.bets_db_path)
-        cursor = conn.cursor()
-        saved_count = 0
+    def save_top_bets_by_league(self, bets, processed_event_ids=()):
+        """Grava as apostas num único lote INSERT ... ON CONFLICT DO UPDATE.
+
+        Apostas já existentes só são reescritas se algum campo da análise
+        mudou; retorna quantas linhas foram inseridas ou atualizadas. Os
+        eventos analisados são marcados em processed_events no mesmo commit,
+        então uma falha não deixa evento marcado sem aposta (nem o contrário).
+        """
+        if not bets and not processed_event_ids:
+            return 0
+
+        rows = []
         for bet in bets:
-            try:
-                # Convert datetime objects to ISO format strings for SQLite TIMESTAMP compatibility
-                bet["event_time"] = (
-                    bet["event_time"]
-                    if isinstance(bet["event_time"], str)
-                    else bet["event_time"].isoformat()
-                )
-                bet["bet_timestamp"] = (
-                    bet["bet_timestamp"]
-                    if isinstance(bet["bet_timestamp"], str)
-                    else bet["bet_timestamp"].isoformat()
-                )
+            # Convert datetime objects to ISO format strings for SQLite TIMESTAMP compatibility
+            for field in ("event_time", "bet_timestamp"):
+                if not isinstance(bet[field], str):
+                    bet[field] = bet[field].isoformat()
+            rows.append(tuple(bet.get(column) for column in BET_COLUMNS))
+
+        columns = ", ".join(BET_COLUMNS)
+        placeholders = ", ".join("?" * len(BET_COLUMNS))
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in BET_UPDATE_COLUMNS)
+        changed = " OR ".join(f"{c} IS NOT excluded.{c}" for c in BET_COMPARED_COLUMNS)
+        query = f"""
+            INSERT INTO bets ({columns}) VALUES ({placeholders})
+            ON CONFLICT(event_id, bet_type, selection, handicap) DO UPDATE SET
+                {assignments}, updated_at = CURRENT_TIMESTAMP
+            WHERE {changed}
+        """
 
-                cursor.execute(
-                    "SELECT id FROM bets WHERE event_id = ? AND bet_type = ? AND selection = ? AND handicap = ?",
-                    (
-                        bet["event_id"],
-                        bet["bet_type"],
-                        bet["selection"],
-                        bet["handicap"],
-                    ),
-                )
-                exists = cursor.fetchone()
-                if exists:
-                    cursor.execute(
-                        """
-                        UPDATE bets SET 
-                            odds = ?, estimated_roi = ?, bet_timestamp = ?, 
-                            fair_odds = ?, home_elo_at_bet = ?, away_elo_at_bet = ?, 
-                            elo_prob_home = ?, implied_prob = ?, bet_edge = ?, 
-                            min_roi_required = ?, bet_decision_reason = ?, 
-                            player_form_home = ?, player_form_away = ?, h2h_summary = ?
-                        WHERE id = ?
-                    """,
-                        (
-                            bet["odds"],
-                            bet["estimated_roi"],
-                            bet["bet_timestamp"],
-                            bet["fair_odds"],
-                            bet["home_elo_at_bet"],
-                            bet["away_elo_at_bet"],
-                            bet["elo_prob_home"],
-                            bet["implied_prob"],
-                            bet["bet_edge"],
-                            bet["min_roi_required"],
-                            bet["bet_decision_reason"],
-                            bet["player_form_home"],
-                            bet["player_form_away"],
-                            bet["h2h_summary"],
-                            exists[0],
-                        ),
-                    )
-                else:
-                    columns = ", ".join(bet.keys())
-                    placeholders = ", ".join("?" * len(bet))
-                    cursor.execute(
-                        f"INSERT INTO bets ({columns}) VALUES ({placeholders})",
-                        list(bet.values()),
-                    )
-                saved_count += 1
-            except sqlite3.IntegrityError:
-                logger.warning(
-                    f"Aposta para evento {bet['event_id']} já existe e não pôde ser atualizada."
-                )
-            except Exception as e:
-                logger.error(f"Erro ao salvar aposta {bet['event_id']}: {e}")
-        conn.commit()
-        conn.close()
+        conn = sqlite3.connect(self.bets_db_path)
+        try:
+            cursor = conn.cursor()
+            saved_count = 0
+            if rows:
+                cursor.executemany(query, rows)
+                saved_count = cursor.rowcount
+            cursor.executemany(
+                "INSERT OR IGNORE INTO processed_events (event_id) VALUES (?)",
+                [(event_id,) for event_id in processed_event_ids],
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(
+                f"Erro ao salvar lote de {len(rows)} apostas "
+                f"({len(processed_event_ids)} eventos ficam para a próxima execução): {e}"
+            )
+            return 0
+        finally:
+            conn.close()
+
+        if saved_count < len(rows):
+            logger.info(f"⏭️ {len(rows) - saved_count} apostas sem alteração ignoradas")
         return saved_count
 
-    def process_all_matches(self):
+    def evaluate_match(self, match):
+        """Analisa um jogo; retorna (event_id, apostas aceitas). Só lê dos bancos."""
+        event_id = match.get("event_id")
+        try:
+            logger.info(
+                f"Analisando evento {event_id}: {match['home_team']} vs {match['away_team']}"
+            )
+            odds_book = self.get_match_odds(event_id)
+            if not odds_book:
+                return event_id, []
+            return event_id, self.analyze_bet_value(match, odds_book)
+        except Exception as e:
+            logger.error(
+                f"Erro fatal ao processar evento {event_id if event_id is not None else 'N/A'}: {e}"
+            )
+            return event_id, []
+
+    def _evaluate_matches_parallel(self, matches, workers):
+        """Distribui os jogos (já agrupados por liga) entre processos.
+
+        Os processos herdam este BetProcessor por fork (ratings, registro e
+        caches de estatísticas/forma/H2H já carregados, compartilhados em
+        copy-on-write) e só leem dos bancos; processed_events e bets são
+        gravados pelo processo principal, juntos, ao final. Sem fork na
+        plataforma (spawn/forkserver teriam de serializar o BetProcessor
+        inteiro para cada processo), a avaliação é sequencial.
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logger.info("⚙️ fork indisponível nesta plataforma, avaliando sequencialmente")
+            return [self.evaluate_match(match) for match in matches]
+
+        chunks = [
+            matches[i : i + EVALUATION_CHUNK_SIZE]
+            for i in range(0, len(matches), EVALUATION_CHUNK_SIZE)
+        ]
+        logger.info(
+            f"⚙️ Avaliando {len(matches)} jogos em {len(chunks)} lotes com {workers} processos"
+        )
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self,),
+        ) as executor:
+            for chunk_results in executor.map(_evaluate_chunk, chunks):
+                results.extend(chunk_results)
+        return results
+
+    def process_all_matches(self, workers=1):
         logger.info(
             "🚀 Iniciando processamento com MODELO ELO e registro de dados expandido..."
         )
@@ -528,35 +656,47 @@ class BetProcessor:
             return
 
         all_valuable_bets = []
-        for match in upcoming_matches:
-            try:
-                event_id = match["event_id"]
-                logger.info(
-                    f"Analisando evento {event_id}: {match['home_team']} vs {match['away_team']}"
-                )
-                odds_df = self.get_match_odds(event_id)
-                if not odds_df.empty:
-                    valuable_bets = self.analyze_bet_value(match, odds_df)
-                    all_valuable_bets.extend(valuable_bets)
-                self.mark_event_processed(event_id)
-            except Exception as e:
-                logger.error(
-                    f"Erro fatal ao processar evento {match.get('event_id', 'N/A')}: {e}"
-                )
-                if "event_id" in match:
-                    self.mark_event_processed(match["event_id"])
-
-        total_saved = self.save_top_bets_by_league(all_valuable_bets)
+        processed_event_ids = []
+        if workers > 1 and len(upcoming_matches) > EVALUATION_CHUNK_SIZE:
+            results = self._evaluate_matches_parallel(upcoming_matches, workers)
+        else:
+            results = (self.evaluate_match(match) for match in upcoming_matches)
+        for event_id, valuable_bets in results:
+            all_valuable_bets.extend(valuable_bets)
+            if event_id is not None:
+                processed_event_ids.append(event_id)
+
+        total_saved = self.save_top_bets_by_league(
+            all_valuable_bets, processed_event_ids
+        )
         logger.info(f"✅ Processamento ELO concluído. {total_saved} apostas salvas.")
 
 
+def _init_worker(processor):
+    global _WORKER_PROCESSOR
+    _WORKER_PROCESSOR = processor
+
+
+def _evaluate_chunk(matches):
+    return [_WORKER_PROCESSOR.evaluate_match(match) for match in matches]
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Gera apostas de valor (modelo ELO)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processos para avaliar os jogos (1 = sequencial)",
+    )
+    args = parser.parse_args()
+
     processor = BetProcessor(
         tm_db_path="tm_data.db",
         bets_db_path="bets.db",
         results_db_path="table_tennis_results.db",
     )
-    processor.process_all_matches()
+    processor.process_all_matches(workers=args.workers)
 
 
 if __name__ == "__main__":
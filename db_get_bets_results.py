@@ -1,11 +1,18 @@
 import sqlite3
-import pandas as pd
-import requests
 import os
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 
+from http_fixtures import create_requests_session
+from settlement_scheduler import (
+    due_pending_bets,
+    classify_time_status,
+    init_settlement_queue,
+    record_attempts,
+)
+from strategy_stats import settle_bets
+
 load_dotenv()
 
 logging.basicConfig(
@@ -21,32 +28,38 @@ class BetResultsChecker:
         self.bets_db_path = bets_db_path
         self.results_db_path = results_db_path
         self.api_key = os.getenv("BETSAPI_API_KEY")
+        self.session = create_requests_session()
 
-    def get_pending_bets(self):
-        """Busca apostas que ainda não tem resultado"""
+    def get_pending_bets(self, now=None):
+        """Apostas sem resultado cujo evento já terminou e que estão fora da
+        janela de espera (settlement_scheduler)"""
         conn = sqlite3.connect(self.bets_db_path)
-        query = """
-        SELECT id, event_id, league_name, home_team, away_team,
-               event_time, bet_type, selection, handicap, odds
-        FROM bets
-        WHERE result IS NULL
-        ORDER BY event_time
-        """
-        df = pd.read_sql_query(query, conn)
+        cursor = conn.cursor()
+        init_settlement_queue(cursor)
+        conn.commit()
+        bets = due_pending_bets(cursor, now)
         conn.close()
-        return df
+        return bets
 
-    def get_result_from_api(self, event_id):
-        """Busca resultado diretamente da API"""
+    def reschedule_unavailable(self, statuses, now=None):
+        """Eventos sem resultado ({event_id: status}) só voltam a ser
+        consultados na janela do seu status; anulados saem da fila"""
+        conn = sqlite3.connect(self.bets_db_path)
+        record_attempts(conn.cursor(), statuses, now)
+        conn.commit()
+        conn.close()
+
+    def fetch_event_result(self, event_id):
+        """Consulta a API: ("final", resultado) ou (status da fila, None)"""
         if not self.api_key:
             logger.warning("API_KEY não encontrada")
-            return None
+            return "error", None
 
         url = "https://api.betsapi.com/v1/bet365/result"
         params = {"token": self.api_key, "event_id": event_id}
 
         try:
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params)
             data = response.json()
 
             logger.info(
@@ -56,24 +69,33 @@ class BetResultsChecker:
             if data.get("success") == 1 and data.get("results"):
                 result = data["results"][0]
                 time_status = result.get("time_status")
+                status = classify_time_status(time_status)
 
-                if str(time_status) == "3":  # Finalizado (comparar como string)
+                if status == "final":
                     logger.info(
                         f"✅ Resultado encontrado na API para event_id {event_id}"
                     )
-                    return result
+                    return status, result
+                elif status == "void":
+                    logger.info(
+                        f"🚫 Evento {event_id} cancelado/anulado (status: {time_status})"
+                    )
                 else:
                     logger.info(
                         f"🕐 Evento {event_id} ainda não finalizado (status: {time_status})"
                     )
-                    return None
+                return status, None
             else:
                 logger.warning(f"❌ Evento {event_id} não encontrado na API: {data}")
-                return None
+                return "not_found", None
 
         except Exception as e:
             logger.error(f"Erro ao buscar na API: {e}")
-            return None
+            return "error", None
+
+    def get_result_from_api(self, event_id):
+        """Busca resultado diretamente da API (None se não finalizado)"""
+        return self.fetch_event_result(event_id)[1]
 
     def calculate_total_games_from_api(self, api_result):
         """Calcula total de games a partir do resultado da API"""
@@ -153,50 +175,65 @@ class BetResultsChecker:
         return None, None, None
 
     def update_bet_result(self, bet_id, result, profit, actual_result=None):
-        """Atualiza resultado da aposta no banco"""
+        """Atualiza resultado da aposta no banco (e o resumo em strategy_stats)"""
         conn = sqlite3.connect(self.bets_db_path)
         cursor = conn.cursor()
 
-        cursor.execute(
-            """
-        UPDATE bets
-        SET result = ?, profit = ?, actual_result = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-        """,
-            (result, profit, actual_result, bet_id),
-        )
+        settle_bets(cursor, [(result, profit, actual_result, bet_id)])
 
         conn.commit()
         conn.close()
 
-    def process_results(self):
-        """Processa resultados usando a API"""
+    def process_results(self, now=None):
+        """Processa resultados usando a API (uma consulta por evento)"""
         logger.info("🔍 Processando resultados via API...")
 
-        pending_bets = self.get_pending_bets()
+        if not self.api_key:
+            logger.warning("API_KEY não encontrada")
+            return
+
+        pending_bets = self.get_pending_bets(now)
 
-        if pending_bets.empty:
-            logger.info("✅ Nenhuma aposta pendente")
+        if not pending_bets:
+            logger.info("✅ Nenhuma aposta pendente para consultar")
             return
 
-        logger.info(f"📊 Total pendentes: {len(pending_bets)}")
+        bets_by_event = {}
+        for bet in pending_bets:
+            bets_by_event.setdefault(bet["event_id"], []).append(bet)
+
+        logger.info(
+            f"📊 Total pendentes: {len(pending_bets)} ({len(bets_by_event)} eventos)"
+        )
 
         processed = 0
         wins = 0
         losses = 0
         total_profit = 0
         not_found = 0
+        voided = 0
+        unavailable = {}
 
-        for i, bet in pending_bets.iterrows():
-            logger.info(f"\n--- {i + 1}/{len(pending_bets)} ---")
-            logger.info(f"ID: {bet['id']} | Event: {bet['event_id']}")
-            logger.info(f"{bet['home_team']} vs {bet['away_team']}")
-            logger.info(f"{bet['bet_type']} | {bet['selection']}")
+        for i, (event_id, event_bets) in enumerate(bets_by_event.items()):
+            logger.info(f"\n--- {i + 1}/{len(bets_by_event)} ---")
+            logger.info(f"Event: {event_id}")
+            logger.info(f"{event_bets[0]['home_team']} vs {event_bets[0]['away_team']}")
 
             # Buscar resultado na API
-            api_result = self.get_result_from_api(bet["event_id"])
+            status, api_result = self.fetch_event_result(event_id)
+
+            if not api_result:
+                unavailable[event_id] = status
+                if status == "void":
+                    voided += len(event_bets)
+                    logger.warning("🚫 Evento anulado, apostas fora da fila")
+                else:
+                    not_found += len(event_bets)
+                    logger.warning("❌ Resultado não disponível")
+                continue
 
-            if api_result:
+            for bet in event_bets:
+                logger.info(f"ID: {bet['id']} | {bet['bet_type']} | {bet['selection']}")
                 result, profit, actual_result = self.check_bet_result_from_api(
                     bet, api_result
                 )
@@ -214,13 +251,15 @@ class BetResultsChecker:
                         logger.info(f"🔴 PERDEU | {profit:.2f}u | {actual_result}")
                 else:
                     logger.warning("❓ Erro ao processar resultado")
-            else:
-                not_found += 1
-                logger.warning("❌ Resultado não disponível")
+                    unavailable[event_id] = "invalid"
+
+        if unavailable:
+            self.reschedule_unavailable(unavailable, now)
+            logger.info(f"⏳ {len(unavailable)} eventos reagendados ou anulados")
 
-        self.show_summary(processed, wins, losses, total_profit, not_found)
+        self.show_summary(processed, wins, losses, total_profit, not_found, voided)
 
-    def show_summary(self, processed, wins, losses, total_profit, not_found):
+    def show_summary(self, processed, wins, losses, total_profit, not_found, voided=0):
         """Mostra resumo dos resultados"""
         logger.info(f"\n{'=' * 50}")
         logger.info(f"📊 RESUMO FINAL")
@@ -237,6 +276,7 @@ class BetResultsChecker:
             else "Derrotas: 0"
         )
         logger.info(f"Não encontradas: {not_found}")
+        logger.info(f"Anuladas: {voided}")
         logger.info(f"Lucro total: {total_profit:+.2f}u")
         logger.info(
             f"ROI: {total_profit / processed * 100:+.1f}%"
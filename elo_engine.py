@@ -0,0 +1,283 @@
+"""Motor ELO vetorizado sobre arrays NumPy.
+
+Reproduz exatamente o laço de BetProcessor._calculate_all_player_elos
+(mesma fórmula, mesma ordem das operações em ponto flutuante), com os
+placares parseados por uma regex pré-compilada linha a linha, jogadores
+mapeados para ids inteiros densos e a atualização sequencial feita sobre
+arrays contíguos. O laço roda em Python puro sobre listas nativas; só a
+partir de NUMBA_MIN_MATCHES partidas, e se o numba estiver instalado, ele é
+compilado (a compilação custa mais que o laço inteiro em históricos menores,
+e no CI o cache do numba nunca está quente).
+"""
+
+import re
+
+import numpy as np
+
+K_FACTOR = 32
+DEFAULT_ELO = 1500
+
+# Abaixo disso o laço em Python puro é mais rápido que compilar com numba
+NUMBA_MIN_MATCHES = 500_000
+
+# Mesmo conjunto de placares aceito por map(int, score.split("-"))
+SCORE_PATTERN = r"^\s*\+?(\d+)\s*-\s*\+?(\d+)\s*$"
+_SCORE_RE = re.compile(SCORE_PATTERN)
+
+
+def parse_scores(scores):
+    """Parseia placares "3-1" e retorna (home_sets, away_sets, válidos)"""
+    n = len(scores)
+    home_sets = np.zeros(n, dtype=np.int64)
+    away_sets = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    for i, score in enumerate(scores):
+        match = _SCORE_RE.match(score) if isinstance(score, str) else None
+        if match:
+            home_sets[i] = int(match.group(1))
+            away_sets[i] = int(match.group(2))
+            valid[i] = True
+    return home_sets, away_sets, valid
+
+
+def encode_players(home_names, away_names):
+    """Mapeia nomes para ids inteiros densos (ordem de primeira aparição);
+    retorna (home_idx, away_idx, nomes)"""
+    ids = {}
+    home_idx = np.fromiter(
+        (ids.setdefault(name, len(ids)) for name in home_names),
+        dtype=np.int64,
+        count=len(home_names),
+    )
+    away_idx = np.fromiter(
+        (ids.setdefault(name, len(ids)) for name in away_names),
+        dtype=np.int64,
+        count=len(away_names),
+    )
+    return home_idx, away_idx, list(ids)
+
+
+def _replay_python(home_idx, away_idx, home_won, ratings, k_factor):
+    ratings_list = ratings.tolist()
+    for h, a, s1 in zip(home_idx.tolist(), away_idx.tolist(), home_won.tolist()):
+        r1 = ratings_list[h]
+        r2 = ratings_list[a]
+        expected1 = 1 / (1 + 10 ** ((r2 - r1) / 400))
+        ratings_list[h] = r1 + k_factor * (s1 - expected1)
+        ratings_list[a] = r2 + k_factor * ((1 - s1) - (1 - expected1))
+    ratings[:] = ratings_list
+    return ratings
+
+
+def _replay_kernel(home_idx, away_idx, home_won, ratings, k_factor):
+    for i in range(home_idx.shape[0]):
+        h = home_idx[i]
+        a = away_idx[i]
+        s1 = home_won[i]
+        r1 = ratings[h]
+        r2 = ratings[a]
+        expected1 = 1.0 / (1.0 + 10.0 ** ((r2 - r1) / 400.0))
+        ratings[h] = r1 + k_factor * (s1 - expected1)
+        ratings[a] = r2 + k_factor * ((1.0 - s1) - (1.0 - expected1))
+    return ratings
+
+
+def _replay_record_python(home_idx, away_idx, home_won, ratings, k_factor, home_after, away_after):
+    ratings_list = ratings.tolist()
+    home_out = []
+    away_out = []
+    for h, a, s1 in zip(home_idx.tolist(), away_idx.tolist(), home_won.tolist()):
+        r1 = ratings_list[h]
+        r2 = ratings_list[a]
+        expected1 = 1 / (1 + 10 ** ((r2 - r1) / 400))
+        ratings_list[h] = r1 + k_factor * (s1 - expected1)
+        ratings_list[a] = r2 + k_factor * ((1 - s1) - (1 - expected1))
+        home_out.append(ratings_list[h])
+        away_out.append(ratings_list[a])
+    ratings[:] = ratings_list
+    home_after[:] = home_out
+    away_after[:] = away_out
+    return ratings
+
+
+def _replay_record_kernel(home_idx, away_idx, home_won, ratings, k_factor, home_after, away_after):
+    for i in range(home_idx.shape[0]):
+        h = home_idx[i]
+        a = away_idx[i]
+        s1 = home_won[i]
+        r1 = ratings[h]
+        r2 = ratings[a]
+        expected1 = 1.0 / (1.0 + 10.0 ** ((r2 - r1) / 400.0))
+        ratings[h] = r1 + k_factor * (s1 - expected1)
+        ratings[a] = r2 + k_factor * ((1.0 - s1) - (1.0 - expected1))
+        home_after[i] = ratings[h]
+        away_after[i] = ratings[a]
+    return ratings
+
+
+_numba_kernels = None
+
+
+def _compiled_kernels(n_matches):
+    """(replay, replay_record) compilados com numba, ou (None, None) sem numba
+    ou com menos de NUMBA_MIN_MATCHES partidas"""
+    global _numba_kernels
+    if n_matches < NUMBA_MIN_MATCHES:
+        return None, None
+    if _numba_kernels is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _numba_kernels = (None, None)
+        else:
+            _numba_kernels = (
+                njit(cache=True)(_replay_kernel),
+                njit(cache=True)(_replay_record_kernel),
+            )
+    return _numba_kernels
+
+
+def replay_ratings(home_idx, away_idx, home_won, n_players, k_factor=K_FACTOR, default_elo=DEFAULT_ELO):
+    """Aplica as partidas em ordem e devolve o array final de ratings"""
+    ratings = np.full(n_players, float(default_elo), dtype=np.float64)
+    home_won = np.ascontiguousarray(home_won, dtype=np.float64)
+    replay_numba, _ = _compiled_kernels(len(home_idx))
+    if replay_numba is not None:
+        return replay_numba(home_idx, away_idx, home_won, ratings, float(k_factor))
+    return _replay_python(home_idx, away_idx, home_won, ratings, k_factor)
+
+
+def replay_ratings_with_history(home_idx, away_idx, home_won, n_players, k_factor=K_FACTOR, default_elo=DEFAULT_ELO):
+    """Como replay_ratings, mas também devolve o rating de cada lado após cada partida"""
+    ratings = np.full(n_players, float(default_elo), dtype=np.float64)
+    home_won = np.ascontiguousarray(home_won, dtype=np.float64)
+    home_after = np.empty(len(home_idx), dtype=np.float64)
+    away_after = np.empty(len(home_idx), dtype=np.float64)
+    replay = _compiled_kernels(len(home_idx))[1] or _replay_record_python
+    replay(home_idx, away_idx, home_won, ratings, float(k_factor), home_after, away_after)
+    return ratings, home_after, away_after
+
+
+def compute_elo_ratings(home_names, away_names, scores, k_factor=K_FACTOR, default_elo=DEFAULT_ELO):
+    """Ratings finais {jogador: elo} para partidas já ordenadas por horário.
+
+    Partidas com placar inválido são ignoradas sem criar o jogador, como no
+    laço original.
+    """
+    home_sets, away_sets, valid = parse_scores(scores)
+    home_names = np.asarray(home_names, dtype=object)[valid]
+    away_names = np.asarray(away_names, dtype=object)[valid]
+    home_won = (home_sets[valid] > away_sets[valid]).astype(np.float64)
+
+    home_idx, away_idx, players = encode_players(home_names, away_names)
+    ratings = replay_ratings(
+        home_idx, away_idx, home_won, len(players), k_factor, default_elo
+    )
+    return dict(zip(players, ratings.tolist()))
+
+
+class RatingHistory:
+    """Índice as-of dos ratings: rating de cada jogador após cada partida.
+
+    Os pontos ficam num único array ordenado por (jogador, horário), com a
+    chave composta jogador << 32 | horário, então rating_at/ratings_at são uma
+    busca binária. rating_at(jogador, ts) considera apenas partidas com
+    horário < ts, ou seja, o rating que o modelo conhecia antes do jogo.
+    """
+
+    def __init__(self, players, keys, values, default_elo=DEFAULT_ELO):
+        self.players = list(players)
+        self.player_ids = {name: i for i, name in enumerate(self.players)}
+        self.keys = keys
+        self.values = values
+        self.default_elo = float(default_elo)
+
+    @classmethod
+    def build(cls, home_names, away_names, scores, event_times, k_factor=K_FACTOR, default_elo=DEFAULT_ELO):
+        """Constrói o índice a partir de partidas já ordenadas por horário"""
+        home_sets, away_sets, valid = parse_scores(scores)
+        home_names = np.asarray(home_names, dtype=object)[valid]
+        away_names = np.asarray(away_names, dtype=object)[valid]
+        times = np.asarray(event_times, dtype=np.int64)[valid]
+        home_won = (home_sets[valid] > away_sets[valid]).astype(np.float64)
+
+        home_idx, away_idx, players = encode_players(home_names, away_names)
+        _, home_after, away_after = replay_ratings_with_history(
+            home_idx, away_idx, home_won, len(players), k_factor, default_elo
+        )
+
+        player_ids = np.concatenate([home_idx, away_idx])
+        keys = (player_ids << 32) | np.concatenate([times, times])
+        values = np.concatenate([home_after, away_after])
+        # Estável: partidas no mesmo horário mantêm a ordem de aplicação
+        order = np.argsort(keys, kind="stable")
+        return cls(players, keys[order], values[order], default_elo)
+
+    @classmethod
+    def from_results_db(cls, results_db_path, k_factor=K_FACTOR, default_elo=DEFAULT_ELO):
+        """Constrói o índice com as partidas finalizadas de table_tennis_results.db,
+        com os jogadores identificados pelo id de player_registry"""
+        import sqlite3
+
+        from player_registry import PlayerRegistry
+
+        PlayerRegistry(results_db_path).sync()
+        conn = sqlite3.connect(results_db_path)
+        rows = conn.execute(
+            """
+            SELECT home_player_id, away_player_id, score, event_time
+            FROM events
+            WHERE time_status = 3 AND score IS NOT NULL AND score != ''
+            ORDER BY event_time ASC
+            """
+        ).fetchall()
+        conn.close()
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return cls([], empty, np.empty(0, dtype=np.float64), default_elo)
+        home_names, away_names, scores, times = zip(*rows)
+        return cls.build(home_names, away_names, scores, times, k_factor, default_elo)
+
+    def ratings_at(self, players, timestamps):
+        """Versão vetorizada de rating_at para arrays de jogadores e horários"""
+        ids = np.array(
+            [self.player_ids.get(p, -1) for p in players], dtype=np.int64
+        )
+        timestamps = np.broadcast_to(
+            np.asarray(timestamps, dtype=np.int64), ids.shape
+        )
+        known = ids >= 0
+        result = np.full(ids.shape, self.default_elo, dtype=np.float64)
+        if not known.any() or len(self.keys) == 0:
+            return result
+
+        query = (ids[known] << 32) | timestamps[known]
+        pos = np.searchsorted(self.keys, query, side="left") - 1
+        # O ponto anterior precisa ser do mesmo jogador
+        same_player = (pos >= 0) & ((self.keys[np.maximum(pos, 0)] >> 32) == ids[known])
+        found = np.where(same_player, self.values[np.maximum(pos, 0)], self.default_elo)
+        result[known] = found
+        return result
+
+    def rating_at(self, player, timestamp):
+        """Rating do jogador considerando só partidas antes de timestamp"""
+        return float(self.ratings_at([player], [int(timestamp)])[0])
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            players=np.array(self.players, dtype=object),
+            keys=self.keys,
+            values=self.values,
+            default_elo=self.default_elo,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        return cls(
+            data["players"].tolist(),
+            data["keys"],
+            data["values"],
+            float(data["default_elo"]),
+        )
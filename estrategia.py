@@ -1,34 +1,14 @@
-import pandas as pd
-import sqlite3
+from analytics import BetAnalytics
+from strategy import load_strategy
 
-def apply_filters_v2(df):
-    """Aplica os filtros V2 (V1 + novo filtro Czech ML ROI 100%+)"""
-    df = df.copy()
-    df["exclude"] = False
-
-    # Filtro 1: Czech ML - Odds e ROI
-    czech_ml_mask = (df["league_name"].str.contains("Czech", case=False, na=False)) & (df["bet_type"] == "To Win")
-    df.loc[czech_ml_mask, "exclude"] = (df.loc[czech_ml_mask, "odds"] >= 3.5) | (df.loc[czech_ml_mask, "odds"] < 1.5)
-    df.loc[czech_ml_mask, "exclude"] = df.loc[czech_ml_mask, "exclude"] | (df.loc[czech_ml_mask, "estimated_roi"] < 20) | (df.loc[czech_ml_mask, "estimated_roi"] >= 100)  # Mudança: 150 -> 100
-
-    # Filtro 2: Czech O/U (apenas Under)
-    czech_ou_mask = (df["league_name"].str.contains("Czech", case=False, na=False)) & (df["bet_type"] == "Total")
-    df.loc[czech_ou_mask, "exclude"] = ~df.loc[czech_ou_mask, "selection"].str.contains("Under", case=False, na=False)
-
-    # Filtro 3: TT Elite ML (não apostar)
-    tt_ml_mask = (df["league_name"].str.contains("TT Elite", case=False, na=False)) & (df["bet_type"] == "To Win")
-    df.loc[tt_ml_mask, "exclude"] = True
+SETTLED_SQL = "b.result IS NOT NULL AND b.profit IS NOT NULL"
 
-    # Filtro 4: TT Elite O/U (apenas Under)
-    tt_ou_mask = (df["league_name"].str.contains("TT Elite", case=False, na=False)) & (df["bet_type"] == "Total")
-    df.loc[tt_ou_mask, "exclude"] = ~df.loc[tt_ou_mask, "selection"].str.contains("Under", case=False, na=False)
-
-    df_filtered = df[df["exclude"] != True].copy()
-    df_filtered.drop(columns=["exclude"], inplace=True)
-    return df_filtered
+def apply_filters_v2(df):
+    """Aplica os filtros V2 (V1 + novo filtro Czech ML ROI 100%+), definidos em config/strategy.json"""
+    return df[load_strategy().filter("v2").mask(df)].copy()
 
 def calculate_league_stats(df, league_name):
-    """Calcula estatísticas para uma liga específica"""
+    """Calcula estatísticas para uma liga específica (df agregado por liga e mercado)"""
     league_df = df[df["league_name"].str.contains(league_name, case=False, na=False)]
     
     if league_df.empty:
@@ -36,8 +16,8 @@ def calculate_league_stats(df, league_name):
     
     # Estatísticas gerais
     total_profit = league_df["profit"].sum()
-    total_volume = len(league_df)
-    wins = league_df["result"].sum()
+    total_volume = league_df["volume"].sum()
+    wins = league_df["wins"].sum()
     losses = total_volume - wins
     roi = (total_profit / total_volume) * 100 if total_volume > 0 else 0
     
@@ -46,10 +26,10 @@ def calculate_league_stats(df, league_name):
     ou_df = league_df[league_df["bet_type"] == "Total"]
     
     ml_profit = ml_df["profit"].sum() if not ml_df.empty else 0
-    ml_volume = len(ml_df)
+    ml_volume = ml_df["volume"].sum()
     
     ou_profit = ou_df["profit"].sum() if not ou_df.empty else 0
-    ou_volume = len(ou_df)
+    ou_volume = ou_df["volume"].sum()
     
     return {
         "league": league_name,
@@ -113,13 +93,14 @@ def generate_summary(df, title):
     print(f"{emoji} {format_profit(total_profit)} | ROI: {format_roi(total_roi)}")
 
 def main():
-    # Conectar ao banco de dados
-    conn = sqlite3.connect("bets.db")
-    df_original = pd.read_sql_query("SELECT * FROM bets WHERE result IS NOT NULL AND profit IS NOT NULL", conn)
-    conn.close()
-    
-    # Aplicar filtros V2
-    df_filtered = apply_filters_v2(df_original)
+    # Apostas liquidadas agregadas por liga e mercado, sem e com os filtros V2
+    analytics = BetAnalytics()
+    by = ("league_name", "bet_type")
+    df_original = analytics.report(by=by, where=SETTLED_SQL)
+    df_filtered = analytics.report(
+        by=by, where=f"{SETTLED_SQL} AND {load_strategy().filter('v2').sql('b')}"
+    )
+    analytics.close()
     
     # Gerar resumos
     generate_summary(df_original, "RESUMO ORIGINAL (SEM FILTROS)")
@@ -131,8 +112,8 @@ def main():
     
     original_profit = df_original["profit"].sum()
     filtered_profit = df_filtered["profit"].sum()
-    original_volume = len(df_original)
-    filtered_volume = len(df_filtered)
+    original_volume = int(df_original["volume"].sum())
+    filtered_volume = int(df_filtered["volume"].sum())
     
     profit_diff = filtered_profit - original_profit
     volume_diff = filtered_volume - original_volume
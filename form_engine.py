@@ -0,0 +1,234 @@
+"""Forma recente dos jogadores calculada sobre o fluxo de partidas finalizadas.
+
+Para cada jogador, player_form guarda a sequência atual (positiva para
+vitórias seguidas, negativa para derrotas) e as últimas FORM_WINDOW partidas
+finalizadas (resultado, sets e total de games), de onde saem W/L, sets e
+média de games. sync() lê só as linhas de events acima da marca d'água
+(events.id, como em player_stats.py), em ordem cronológica, e aplica cada
+partida ao estado do jogador numa única passada. Partidas que chegam fora de
+ordem para um jogador fazem o estado dele ser reconstruído do zero. Os
+jogadores são identificados pelo id inteiro de player_registry.py.
+"""
+
+import json
+import logging
+import sqlite3
+
+from player_registry import drop_outdated_table, init_registry, prepare_derived_cache
+from player_stats import parse_sets
+
+logger = logging.getLogger("form_engine")
+
+FORM_WINDOW = 10
+
+
+class PlayerForm:
+    __slots__ = ("streak", "recent", "last_event_time")
+
+    def __init__(self, streak=0, recent=None, last_event_time=0):
+        self.streak = streak
+        # [(won, sets_won, sets_lost, total_games)], da mais antiga para a mais recente
+        self.recent = recent or []
+        self.last_event_time = last_event_time
+
+    def apply(self, event_time, sets_won, sets_lost, total_games):
+        won = sets_won > sets_lost
+        if won:
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+        else:
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+        self.recent.append((int(won), sets_won, sets_lost, total_games))
+        del self.recent[:-FORM_WINDOW]
+        self.last_event_time = event_time
+
+    def features(self):
+        matches = len(self.recent)
+        wins = sum(r[0] for r in self.recent)
+        totals = [r[3] for r in self.recent if r[3] > 0]
+        return {
+            "matches": matches,
+            "streak": self.streak,
+            "wins": wins,
+            "losses": matches - wins,
+            "win_rate": wins / matches if matches else 0,
+            "sets_won": sum(r[1] for r in self.recent),
+            "sets_lost": sum(r[2] for r in self.recent),
+            "avg_games": sum(totals) / len(totals) if totals else 0,
+            "results": "".join("W" if r[0] else "L" for r in self.recent),
+        }
+
+    def summary(self):
+        """Texto para as colunas player_form_home/player_form_away"""
+        f = self.features()
+        if not f["matches"]:
+            return "N/A"
+        streak = f"+{f['streak']}" if f["streak"] > 0 else str(f["streak"])
+        return (
+            f"{f['results']} ({streak}) | W/L {f['wins']}-{f['losses']} | "
+            f"sets {f['sets_won']}-{f['sets_lost']} | média {f['avg_games']:.1f} games"
+        )
+
+
+class FormEngine:
+    def __init__(self, results_db_path="table_tennis_results.db"):
+        self.results_db_path = results_db_path
+        self._forms = {}
+        self.init_db()
+
+    def init_db(self):
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        init_registry(cursor)
+        drop_outdated_table(cursor, "player_form", "player_id", "form_state")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS player_form (
+            player_id INTEGER PRIMARY KEY,
+            streak INTEGER,
+            recent_matches TEXT,
+            last_event_time INTEGER,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS form_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_event_scores_event_id ON event_scores(event_id)"
+        )
+        conn.commit()
+        conn.close()
+
+    def _player_matches(self, cursor, where, params):
+        """Fluxo de partidas finalizadas, uma linha por jogador, em ordem cronológica"""
+        cursor.execute(
+            f"""
+            SELECT e.event_time, e.home_player_id, e.away_player_id, e.score,
+                (SELECT SUM(home_score) + SUM(away_score)
+                 FROM event_scores WHERE event_id = e.event_id)
+            FROM events e
+            WHERE e.time_status = 3 AND {where}
+            ORDER BY e.event_time ASC, e.id ASC
+            """,
+            params,
+        )
+        for event_time, home, away, score, total in cursor.fetchall():
+            sets = parse_sets(score)
+            if sets is None or sets[0] == sets[1]:
+                continue
+            yield home, event_time, sets[0], sets[1], total or 0
+            yield away, event_time, sets[1], sets[0], total or 0
+
+    def _rebuild_player(self, cursor, player):
+        form = PlayerForm()
+        for player_id, event_time, sets_won, sets_lost, total in self._player_matches(
+            cursor, "(e.home_player_id = ? OR e.away_player_id = ?)", (player, player)
+        ):
+            if player_id == player:
+                form.apply(event_time, sets_won, sets_lost, total)
+        return form
+
+    def _load_forms(self, cursor):
+        cursor.execute(
+            "SELECT player_id, streak, recent_matches, last_event_time FROM player_form"
+        )
+        return {
+            player_id: PlayerForm(
+                streak, [tuple(r) for r in json.loads(recent or "[]")], last_event_time
+            )
+            for player_id, streak, recent, last_event_time in cursor.fetchall()
+        }
+
+    def sync(self):
+        """Aplica as partidas finalizadas inseridas desde a última sincronização"""
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        try:
+            prepare_derived_cache(cursor, ["player_form"], "form_state")
+            cursor.execute("SELECT value FROM form_state WHERE key = 'last_event_row_id'")
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+            cursor.execute("SELECT MAX(id) FROM events")
+            max_id = cursor.fetchone()[0] or 0
+            if max_id <= last_id:
+                conn.commit()
+                return 0
+
+            forms = self._load_forms(cursor)
+            touched = set()
+            out_of_order = set()
+            for player, event_time, sets_won, sets_lost, total in self._player_matches(
+                cursor, "e.id > ? AND e.id <= ?", (last_id, max_id)
+            ):
+                if player is None or player in out_of_order:
+                    continue
+                form = forms.setdefault(player, PlayerForm())
+                if event_time is None or event_time < form.last_event_time:
+                    out_of_order.add(player)
+                    continue
+                form.apply(event_time, sets_won, sets_lost, total)
+                touched.add(player)
+
+            for player in out_of_order:
+                forms[player] = self._rebuild_player(cursor, player)
+            touched |= out_of_order
+
+            cursor.executemany(
+                """
+                INSERT INTO player_form (player_id, streak, recent_matches, last_event_time)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(player_id) DO UPDATE SET
+                    streak = excluded.streak,
+                    recent_matches = excluded.recent_matches,
+                    last_event_time = excluded.last_event_time,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                [
+                    (
+                        player,
+                        forms[player].streak,
+                        json.dumps(forms[player].recent),
+                        forms[player].last_event_time,
+                    )
+                    for player in touched
+                ],
+            )
+            cursor.execute(
+                """
+                INSERT INTO form_state (key, value) VALUES ('last_event_row_id', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (max_id,),
+            )
+            conn.commit()
+            if touched:
+                logger.info(
+                    f"📈 Forma atualizada para {len(touched)} jogadores "
+                    f"({len(out_of_order)} reconstruídos)"
+                )
+            return len(touched)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao sincronizar forma dos jogadores: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def load(self):
+        """Carrega a forma de todos os jogadores em memória"""
+        conn = sqlite3.connect(self.results_db_path)
+        self._forms = self._load_forms(conn.cursor())
+        conn.close()
+        return self
+
+    def get(self, player_id):
+        return self._forms.get(player_id) or PlayerForm()
+
+    def features(self, player_id):
+        """Sinais de forma do jogador para filtros da estratégia"""
+        return self.get(player_id).features()
+
+    def summary(self, player_id):
+        return self.get(player_id).summary()
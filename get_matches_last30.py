@@ -1,15 +1,27 @@
-import requests
 import os
+import json
 import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from http_fixtures import create_requests_session
+from form_engine import FormEngine
+from h2h_index import HeadToHeadIndex
+from player_registry import PlayerRegistry
+from player_stats import PlayerStatsCache
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Janela de backfill executada apenas na primeira sincronização de cada liga
+BACKFILL_DAYS = 30
+# Eventos pendentes mais antigos que isso deixam de ser reconsultados
+PENDING_MAX_AGE_DAYS = 7
+# time_status que não mudam mais (finalizado, cancelado, W.O., abandonado, etc.)
+FINAL_TIME_STATUSES = {"3", "5", "6", "8", "9", "99"}
+
 
 class TableTennisResults:
     def __init__(self, db_path="table_tennis_results.db"):
@@ -31,6 +43,7 @@ class TableTennisResults:
 
         self.request_count = 0
         self.last_request_time = time.time()
+        self.session = create_requests_session()
         self.init_database()
 
     def init_database(self):
@@ -75,6 +88,17 @@ class TableTennisResults:
         )
         """)
 
+        # Marca d'água por liga: último dia totalmente coletado e eventos
+        # ainda não finalizados ({event_id: dia}) que precisam ser reconsultados
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            league_id INTEGER PRIMARY KEY,
+            last_completed_day TEXT,
+            pending_event_ids TEXT DEFAULT '{}',
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
         conn.commit()
         conn.close()
         print("✅ Banco de dados inicializado")
@@ -90,7 +114,7 @@ class TableTennisResults:
             time.sleep(min_interval - elapsed)
 
         try:
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params)
             self.last_request_time = time.time()
             self.request_count += 1
 
@@ -102,8 +126,49 @@ class TableTennisResults:
             print(f"❌ Erro na requisição: {e}")
             return None
 
-    def get_events_from_leagues(self, days=30):
-        """Coleta eventos das ligas de tênis de mesa dos últimos N dias"""
+    def load_sync_state(self):
+        """Carrega a marca d'água de sincronização de cada liga"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT league_id, last_completed_day, pending_event_ids FROM sync_state"
+        )
+        state = {}
+        for league_id, last_completed_day, pending_json in cursor.fetchall():
+            state[int(league_id)] = {
+                "last_completed_day": last_completed_day,
+                "pending": json.loads(pending_json or "{}"),
+            }
+        conn.close()
+        return state
+
+    def get_days_to_fetch(self, last_completed_day, days):
+        """Lista os dias (mais antigo primeiro) ainda não coletados para uma liga"""
+        today = datetime.now().date()
+        if last_completed_day:
+            start = datetime.strptime(last_completed_day, "%Y%m%d").date() + timedelta(
+                days=1
+            )
+        else:
+            # Primeira execução: backfill limitado à janela de N dias
+            start = today - timedelta(days=days - 1)
+
+        if start > today:
+            start = today
+
+        return [
+            (start + timedelta(days=i)).strftime("%Y%m%d")
+            for i in range((today - start).days + 1)
+        ]
+
+    def get_events_from_leagues(self, days=BACKFILL_DAYS):
+        """Coleta eventos das ligas apenas para os dias ainda não sincronizados.
+
+        Na primeira execução de uma liga coleta os últimos N dias (backfill);
+        nas seguintes, só os dias após o último dia completo registrado em
+        sync_state. O progresso fica em self.sync_progress até que
+        update_sync_state seja chamado.
+        """
         if not self.api_key:
             print("❌ API_KEY não encontrada nas variáveis de ambiente")
             print("Variáveis disponíveis:")
@@ -113,18 +178,29 @@ class TableTennisResults:
             return []
 
         all_events = []
+        state = self.load_sync_state()
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+        self.sync_progress = {}
 
         print("=" * 70)
-        print(f"COLETANDO EVENTOS DE TÊNIS DE MESA - ÚLTIMOS {days} DIAS")
+        print("COLETANDO EVENTOS DE TÊNIS DE MESA - SINCRONIZAÇÃO INCREMENTAL")
         print("=" * 70)
 
-        for i in range(days):
-            target_date = (datetime.now() - timedelta(days=i)).strftime("%Y%m%d")
-            print(f"\n📅 Buscando eventos para: {target_date}")
+        for league_id, league_name in self.leagues.items():
+            league_state = state.get(league_id, {})
+            last_completed_day = league_state.get("last_completed_day")
+            target_days = self.get_days_to_fetch(last_completed_day, days)
+
+            print(
+                f"\n🔍 Liga: {league_name} | último dia completo: "
+                f"{last_completed_day or 'nenhum (backfill)'} | "
+                f"{len(target_days)} dia(s) para buscar"
+            )
 
-            for league_id, league_name in self.leagues.items():
-                print(f"   🔍 Liga: {league_name}")
+            completed_up_to = last_completed_day
+            all_days_ok = True
 
+            for target_date in target_days:
                 url = "https://api.betsapi.com/v1/bet365/upcoming"
                 params = {
                     "token": self.api_key,
@@ -136,26 +212,117 @@ class TableTennisResults:
                 try:
                     response = self.rate_limited_request(url, params)
                     if not response:
+                        all_days_ok = False
                         continue
 
                     data = response.json()
 
                     if data.get("success") == 1 and "results" in data:
                         events = data["results"]
-                        print(f"      ✅ {len(events)} eventos encontrados")
+                        print(f"   📅 {target_date}: ✅ {len(events)} eventos encontrados")
 
                         for event in events:
                             event["league_name"] = league_name
+                            event["league_id"] = league_id
                             event["event_date"] = target_date
                             all_events.append(event)
                     else:
-                        print(f"      ⚠️  Nenhum evento encontrado")
+                        print(f"   📅 {target_date}: ⚠️  Nenhum evento encontrado")
+
+                    # Só avança a marca d'água sobre dias passados e contíguos
+                    if all_days_ok and target_date <= yesterday:
+                        completed_up_to = target_date
 
                 except Exception as e:
-                    print(f"      ❌ Erro: {e}")
+                    all_days_ok = False
+                    print(f"   📅 {target_date}: ❌ Erro: {e}")
+
+            self.sync_progress[league_id] = {
+                "last_completed_day": completed_up_to,
+                "pending": league_state.get("pending", {}),
+            }
 
         return all_events
 
+    def get_event_ids_to_check(self, events):
+        """Junta eventos novos ainda não finalizados no banco com os pendentes"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT event_id FROM events WHERE time_status = 3")
+        finished_ids = {row[0] for row in cursor.fetchall()}
+        conn.close()
+
+        event_ids = []
+        seen = set()
+        for event in events:
+            event_id = str(event["id"])
+            if event_id not in finished_ids and event_id not in seen:
+                event_ids.append(event_id)
+                seen.add(event_id)
+
+        pending_count = 0
+        for progress in getattr(self, "sync_progress", {}).values():
+            for event_id in progress["pending"]:
+                if event_id not in seen:
+                    event_ids.append(event_id)
+                    seen.add(event_id)
+                    pending_count += 1
+
+        print(
+            f"\n📋 {len(event_ids) - pending_count} eventos novos + "
+            f"{pending_count} pendentes para verificar"
+        )
+        return event_ids
+
+    def update_sync_state(self, events, results):
+        """Grava o novo último dia completo e os eventos ainda não finalizados"""
+        if not getattr(self, "sync_progress", None):
+            return
+
+        status_by_id = {
+            str(result.get("id")): str(result.get("time_status"))
+            for result in results
+        }
+        cutoff = (datetime.now() - timedelta(days=PENDING_MAX_AGE_DAYS)).strftime(
+            "%Y%m%d"
+        )
+
+        candidates = {league_id: {} for league_id in self.sync_progress}
+        for league_id, progress in self.sync_progress.items():
+            candidates[league_id].update(progress["pending"])
+        for event in events:
+            league_id = event.get("league_id")
+            if league_id in candidates:
+                candidates[league_id][str(event["id"])] = event.get("event_date")
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT event_id FROM events WHERE time_status = 3")
+        finished_ids = {row[0] for row in cursor.fetchall()}
+
+        for league_id, progress in self.sync_progress.items():
+            pending = {
+                event_id: event_date
+                for event_id, event_date in candidates[league_id].items()
+                if event_id not in finished_ids
+                and status_by_id.get(event_id) not in FINAL_TIME_STATUSES
+                and (event_date or "") >= cutoff
+            }
+            cursor.execute(
+                """
+            INSERT INTO sync_state (league_id, last_completed_day, pending_event_ids, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(league_id) DO UPDATE SET
+                last_completed_day = excluded.last_completed_day,
+                pending_event_ids = excluded.pending_event_ids,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+                (league_id, progress["last_completed_day"], json.dumps(pending)),
+            )
+        conn.commit()
+        conn.close()
+        print("✅ Estado de sincronização atualizado")
+
     def get_event_results_batch(self, event_ids):
         """Busca resultados para um lote de event_ids (máximo 10 por requisição)"""
         if not self.api_key:
@@ -228,9 +395,18 @@ class TableTennisResults:
         for result in results:
             event_id = result.get("id")
 
-            cursor.execute("SELECT id FROM events WHERE event_id = ?", (event_id,))
-            if cursor.fetchone():
-                continue
+            cursor.execute(
+                "SELECT time_status FROM events WHERE event_id = ?", (event_id,)
+            )
+            existing = cursor.fetchone()
+            if existing:
+                if str(existing[0]) == "3":
+                    continue
+                # Evento pendente salvo antes de terminar: substitui pelo estado atual
+                cursor.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+                cursor.execute(
+                    "DELETE FROM event_scores WHERE event_id = ?", (event_id,)
+                )
 
             try:
                 stadium_data = result.get("extra", {}).get("stadium_data", {})
@@ -314,16 +490,23 @@ class TableTennisResults:
         print("\n📊 ANÁLISE DOS RESULTADOS ARMAZENADOS")
         print("=" * 60)
 
-        events_df = pd.read_sql_query("SELECT * FROM events", conn)
+        import pandas as pd  # só para a tabela da análise
 
-        print(f"📈 Total de eventos: {len(events_df)}")
-        print(f"🏆 Ligas representadas: {events_df['league_name'].nunique()}")
+        league_stats = pd.read_sql_query(
+            """
+            SELECT league_name AS Liga, COUNT(*) AS Eventos FROM events
+            WHERE league_name IS NOT NULL
+            GROUP BY league_name ORDER BY Eventos DESC
+            """,
+            conn,
+        )
+
+        print(f"📈 Total de eventos: {event_count}")
+        print(f"🏆 Ligas representadas: {len(league_stats)}")
 
         print("\n📋 DISTRIBUIÇÃO POR LIGA:")
-        league_stats = events_df["league_name"].value_counts().reset_index()
-        league_stats.columns = ["Liga", "Eventos"]
         league_stats["Percentual"] = (
-            league_stats["Eventos"] / len(events_df) * 100
+            league_stats["Eventos"] / event_count * 100
         ).round(1)
         print(league_stats.to_string(index=False))
 
@@ -333,18 +516,22 @@ class TableTennisResults:
 def main():
     collector = TableTennisResults()
 
-    events = collector.get_events_from_leagues(days=3)
+    events = collector.get_events_from_leagues(days=BACKFILL_DAYS)
+    event_ids = collector.get_event_ids_to_check(events)
 
-    if not events:
-        print("❌ Nenhum evento encontrado")
+    if not event_ids:
+        print("❌ Nenhum evento novo ou pendente")
+        collector.update_sync_state(events, [])
         return
 
-    event_ids = [event["id"] for event in events]
-    print(f"\n📋 Total de {len(event_ids)} eventos encontrados")
-
     results = collector.get_all_event_results(event_ids, max_workers=5)
 
     collector.save_results_to_db(results)
+    collector.update_sync_state(events, results)
+    PlayerRegistry(collector.db_path).sync()
+    PlayerStatsCache(collector.db_path).sync()
+    HeadToHeadIndex(collector.db_path).sync()
+    FormEngine(collector.db_path).sync()
     collector.analyze_results()
 
     print(f"\n📊 Total de requisições realizadas: {collector.request_count}")
@@ -0,0 +1,238 @@
+"""Índice de confrontos diretos (H2H) por par de jogadores.
+
+Cada par não ordenado de jogadores (ids de player_registry.py, menor primeiro) tem uma linha em h2h_pairs
+com os últimos H2H_MAX_MEETINGS confrontos finalizados (total de games e
+vencedor) e o placar acumulado de todos os confrontos. Assim como em
+player_stats.py, a atualização usa events.id como marca d'água e só recalcula
+os pares que aparecem nas linhas novas; depois de load(), as consultas são
+acessos a dicionário.
+"""
+
+import json
+import logging
+import sqlite3
+
+from player_registry import drop_outdated_table, init_registry, prepare_derived_cache
+from player_stats import parse_sets
+
+logger = logging.getLogger("h2h_index")
+
+H2H_MAX_MEETINGS = 10
+
+
+def pair_key(player1, player2):
+    return (player1, player2) if player1 <= player2 else (player2, player1)
+
+
+def build_pair_row(pair, meetings):
+    """meetings: [(event_time, home, away, score, total_games)], mais recente primeiro"""
+    player_a, player_b = pair
+    recent = []
+    a_wins = b_wins = 0
+    for event_time, home, away, score, total in meetings:
+        sets = parse_sets(score)
+        if sets is None or sets[0] == sets[1]:
+            continue
+        winner = home if sets[0] > sets[1] else away
+        if winner == player_a:
+            a_wins += 1
+        else:
+            b_wins += 1
+        if len(recent) < H2H_MAX_MEETINGS:
+            recent.append(
+                {
+                    "event_time": event_time,
+                    "home": home,
+                    "away": away,
+                    "score": score,
+                    "total_games": total or 0,
+                    "winner": winner,
+                }
+            )
+    return (player_a, player_b, a_wins + b_wins, a_wins, b_wins, json.dumps(recent))
+
+
+class HeadToHeadIndex:
+    def __init__(self, results_db_path="table_tennis_results.db"):
+        self.results_db_path = results_db_path
+        self._pairs = {}
+        self.init_db()
+
+    def init_db(self):
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        init_registry(cursor)
+        drop_outdated_table(cursor, "h2h_pairs", "player_a_id", "h2h_state")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS h2h_pairs (
+            player_a_id INTEGER NOT NULL,
+            player_b_id INTEGER NOT NULL,
+            meetings INTEGER,
+            a_wins INTEGER,
+            b_wins INTEGER,
+            recent_meetings TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (player_a_id, player_b_id)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS h2h_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_event_scores_event_id ON event_scores(event_id)"
+        )
+        conn.commit()
+        conn.close()
+
+    def _load_all_meetings(self, cursor):
+        """Varredura única de events (usada na primeira construção)"""
+        cursor.execute("""
+        SELECT e.event_time, e.home_player_id, e.away_player_id, e.score, s.total
+        FROM events e
+        LEFT JOIN (
+            SELECT event_id, SUM(home_score) + SUM(away_score) AS total
+            FROM event_scores GROUP BY event_id
+        ) s ON s.event_id = e.event_id
+        WHERE e.time_status = 3
+          AND e.home_player_id IS NOT NULL AND e.away_player_id IS NOT NULL
+        ORDER BY e.event_time DESC
+        """)
+        meetings = {}
+        for row in cursor.fetchall():
+            meetings.setdefault(pair_key(row[1], row[2]), []).append(row)
+        return meetings
+
+    def _load_pair_meetings(self, cursor, pairs):
+        meetings = {}
+        for player_a, player_b in pairs:
+            cursor.execute(
+                """
+                SELECT event_time, home_player_id, away_player_id, score,
+                    (SELECT SUM(home_score) + SUM(away_score)
+                     FROM event_scores WHERE event_id = events.event_id)
+                FROM events
+                WHERE time_status = 3
+                  AND ((home_player_id = ? AND away_player_id = ?)
+                    OR (home_player_id = ? AND away_player_id = ?))
+                ORDER BY event_time DESC
+                """,
+                (player_a, player_b, player_b, player_a),
+            )
+            meetings[(player_a, player_b)] = cursor.fetchall()
+        return meetings
+
+    def sync(self):
+        """Recalcula os pares com confrontos novos desde a última sincronização"""
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        try:
+            prepare_derived_cache(cursor, ["h2h_pairs"], "h2h_state")
+            cursor.execute("SELECT value FROM h2h_state WHERE key = 'last_event_row_id'")
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+
+            cursor.execute(
+                """
+                SELECT id, home_player_id, away_player_id FROM events
+                WHERE id > ? AND home_player_id IS NOT NULL AND away_player_id IS NOT NULL
+                """,
+                (last_id,),
+            )
+            new_rows = cursor.fetchall()
+            if not new_rows:
+                conn.commit()
+                return 0
+            max_id = max(r[0] for r in new_rows)
+            pairs = {pair_key(home, away) for _, home, away in new_rows}
+
+            if last_id == 0:
+                meetings = self._load_all_meetings(cursor)
+            else:
+                meetings = self._load_pair_meetings(cursor, pairs)
+
+            cursor.executemany(
+                """
+                INSERT INTO h2h_pairs (player_a_id, player_b_id, meetings, a_wins, b_wins, recent_meetings)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(player_a_id, player_b_id) DO UPDATE SET
+                    meetings = excluded.meetings,
+                    a_wins = excluded.a_wins,
+                    b_wins = excluded.b_wins,
+                    recent_meetings = excluded.recent_meetings,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                [build_pair_row(pair, meetings.get(pair, [])) for pair in pairs],
+            )
+            cursor.execute(
+                """
+                INSERT INTO h2h_state (key, value) VALUES ('last_event_row_id', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (max_id,),
+            )
+            conn.commit()
+            logger.info(f"🤝 Índice H2H atualizado: {len(pairs)} pares recalculados")
+            return len(pairs)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao sincronizar índice H2H: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def load(self):
+        """Carrega todos os pares em memória para leitura O(1)"""
+        conn = sqlite3.connect(self.results_db_path)
+        rows = conn.execute(
+            "SELECT player_a_id, player_b_id, meetings, a_wins, b_wins, recent_meetings FROM h2h_pairs"
+        ).fetchall()
+        conn.close()
+
+        self._pairs = {
+            (player_a, player_b): {
+                "meetings": meetings,
+                "wins": {player_a: a_wins, player_b: b_wins},
+                "recent": json.loads(recent or "[]"),
+            }
+            for player_a, player_b, meetings, a_wins, b_wins, recent in rows
+        }
+        return self
+
+    def get(self, player1, player2):
+        """Dados do confronto ou None se os jogadores nunca se enfrentaram"""
+        if player1 is None or player2 is None:
+            return None
+        return self._pairs.get(pair_key(player1, player2))
+
+    def last_meetings(self, player1, player2, n=H2H_MAX_MEETINGS):
+        """Últimos n confrontos finalizados, do mais recente para o mais antigo"""
+        pair = self.get(player1, player2)
+        return pair["recent"][:n] if pair else []
+
+    def recent_totals(self, player1, player2, n=H2H_MAX_MEETINGS):
+        """Totais de games dos últimos confrontos (só partidas com placar por set)"""
+        return [
+            m["total_games"]
+            for m in self.last_meetings(player1, player2, n)
+            if m["total_games"] > 0
+        ]
+
+    def summary(self, player1, player2, n=H2H_MAX_MEETINGS):
+        """Texto curto para a coluna h2h_summary, do ponto de vista de player1"""
+        pair = self.get(player1, player2)
+        if not pair or not pair["meetings"]:
+            return "N/A"
+        recent = pair["recent"][:n]
+        recent_wins = sum(1 for m in recent if m["winner"] == player1)
+        totals = [m["total_games"] for m in recent if m["total_games"] > 0]
+        text = (
+            f"{pair['wins'].get(player1, 0)}-{pair['wins'].get(player2, 0)} "
+            f"em {pair['meetings']} jogos | últimos {len(recent)}: "
+            f"{recent_wins}-{len(recent) - recent_wins}"
+        )
+        if totals:
+            text += f" | média {sum(totals) / len(totals):.1f} games"
+        return text
@@ -0,0 +1,297 @@
+"""Gravação e reprodução de respostas HTTP da BetsAPI em JSONL.
+
+Uso (variáveis de ambiente lidas pelos clientes de monitor.py,
+get_matches_last30.py, db_get_bets_results.py e update_csv.py):
+
+    HTTP_RECORD_PATH=fixtures.jsonl python monitor.py      # grava
+    HTTP_REPLAY_PATH=fixtures.jsonl BETSAPI_API_KEY=offline python monitor.py
+
+Na reprodução, HTTP_REPLAY_LATENCY_MS simula a latência da API,
+HTTP_REPLAY_RATE_LIMIT_EVERY devolve um erro de rate limit (HTTP 429) a cada
+N requisições e HTTP_REPLAY_SEED fixa o jitter, para execuções determinísticas.
+
+Capturas antigas (ex.: dados_completos.json) podem ser convertidas com:
+
+    python http_fixtures.py import dados_completos.json /v1/bet365/event FI=10895511
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+logger = logging.getLogger("http_fixtures")
+
+# Parâmetros que nunca são gravados nem usados na chave de busca
+IGNORED_PARAMS = {"token"}
+
+RATE_LIMIT_BODY = {"success": 0, "error": "Rate limit exceeded (replay)"}
+NOT_FOUND_BODY = {"success": 0, "error": "No fixture recorded for this request"}
+
+
+def normalize_params(params):
+    """Converte parâmetros em uma tupla ordenada de strings, sem o token"""
+    if params is None:
+        return ()
+    items = params.items() if isinstance(params, dict) else params
+    return tuple(
+        sorted((str(k), str(v)) for k, v in items if str(k) not in IGNORED_PARAMS)
+    )
+
+
+def fixture_key(endpoint, params):
+    return endpoint + "?" + "&".join(f"{k}={v}" for k, v in normalize_params(params))
+
+
+class HttpRecorder:
+    """Anexa pares requisição/resposta a um arquivo JSONL"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, url, status, body):
+        parsed = urlsplit(str(url))
+        entry = {
+            "endpoint": parsed.path,
+            "params": dict(normalize_params(parse_qsl(parsed.query))),
+            "status": status,
+            "body": body,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def requests_hook(self, response, *args, **kwargs):
+        """Hook de resposta para requests.Session"""
+        try:
+            self.record(response.url, response.status_code, response.json())
+        except ValueError:
+            logger.warning(f"Resposta não-JSON não gravada: {response.url}")
+        return response
+
+    async def httpx_hook(self, response):
+        """Hook de resposta para httpx.AsyncClient"""
+        await response.aread()
+        try:
+            self.record(response.request.url, response.status_code, response.json())
+        except ValueError:
+            logger.warning(f"Resposta não-JSON não gravada: {response.request.url}")
+
+
+class FixtureReplayer:
+    """Serve respostas gravadas com latência e erros de rate limit configuráveis.
+
+    Uma requisição sem gravação exata reaproveita uma resposta do mesmo
+    endpoint (escolhida de forma estável pela chave) e reescreve os ids dos
+    resultados para os ids pedidos, o que permite benchmarks em volume maior
+    que o gravado.
+    """
+
+    def __init__(self, path, latency_ms=0.0, rate_limit_every=0, seed=0):
+        self.latency_ms = latency_ms
+        self.rate_limit_every = rate_limit_every
+        self.random = random.Random(seed)
+        self.by_key = {}
+        self.by_endpoint = {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.load(path)
+
+    def load(self, path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                response = (entry.get("status", 200), entry["body"])
+                self.by_key[fixture_key(entry["endpoint"], entry["params"])] = response
+                self.by_endpoint.setdefault(entry["endpoint"], []).append(response)
+        logger.info(f"{len(self.by_key)} fixtures carregadas de {path}")
+
+    def respond(self, endpoint, params):
+        """Retorna (status, body, atraso_em_segundos) para uma requisição"""
+        with self._lock:
+            self.request_count += 1
+            count = self.request_count
+            jitter = self.random.uniform(0.8, 1.2) if self.latency_ms else 0
+
+        delay = self.latency_ms * jitter / 1000
+
+        if self.rate_limit_every and count % self.rate_limit_every == 0:
+            return 429, RATE_LIMIT_BODY, delay
+
+        key = fixture_key(endpoint, params)
+        if key in self.by_key:
+            return (*self.by_key[key], delay)
+
+        candidates = self.by_endpoint.get(endpoint)
+        if not candidates:
+            return 404, NOT_FOUND_BODY, delay
+
+        status, body = candidates[zlib.crc32(key.encode()) % len(candidates)]
+        return status, self._retarget_ids(body, dict(normalize_params(params))), delay
+
+    @staticmethod
+    def _retarget_ids(body, params):
+        requested = params.get("event_id") or params.get("FI")
+        results = body.get("results") if isinstance(body, dict) else None
+        if not requested or not isinstance(results, list):
+            return body
+
+        ids = requested.split(",")
+        rewritten = []
+        for i, event_id in enumerate(ids):
+            result = results[i % len(results)] if results else None
+            if isinstance(result, dict):
+                result = dict(result, id=event_id)
+                if "FI" in result:
+                    result["FI"] = event_id
+            if result is not None:
+                rewritten.append(result)
+        return dict(body, results=rewritten)
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter de requests que responde a partir do FixtureReplayer"""
+
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        parsed = urlsplit(request.url)
+        status, body, delay = self.replayer.respond(
+            parsed.path, parse_qsl(parsed.query)
+        )
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode("utf-8")
+        response.headers["Content-Type"] = "application/json"
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def async_replay_transport(replayer):
+    """Transport do httpx que responde a partir do FixtureReplayer.
+
+    Definido sob demanda para que quem só usa requests não importe o httpx.
+    """
+    import httpx
+
+    class AsyncReplayTransport(httpx.AsyncBaseTransport):
+        def __init__(self, replayer):
+            self.replayer = replayer
+
+        async def handle_async_request(self, request):
+            status, body, delay = self.replayer.respond(
+                request.url.path, parse_qsl(request.url.query.decode())
+            )
+            if delay:
+                await asyncio.sleep(delay)
+            return httpx.Response(status, json=body, request=request)
+
+    return AsyncReplayTransport(replayer)
+
+
+_replayer = None
+
+
+def get_replayer():
+    """Replayer compartilhado configurado por HTTP_REPLAY_PATH (ou None)"""
+    global _replayer
+    replay_path = os.getenv("HTTP_REPLAY_PATH")
+    if not replay_path:
+        return None
+    if _replayer is None:
+        _replayer = FixtureReplayer(
+            replay_path,
+            latency_ms=float(os.getenv("HTTP_REPLAY_LATENCY_MS", "0")),
+            rate_limit_every=int(os.getenv("HTTP_REPLAY_RATE_LIMIT_EVERY", "0")),
+            seed=int(os.getenv("HTTP_REPLAY_SEED", "0")),
+        )
+    return _replayer
+
+
+def create_requests_session():
+    """requests.Session gravando ou reproduzindo conforme as variáveis de ambiente"""
+    session = requests.Session()
+    replayer = get_replayer()
+    if replayer:
+        adapter = ReplayAdapter(replayer)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    elif os.getenv("HTTP_RECORD_PATH"):
+        recorder = HttpRecorder(os.getenv("HTTP_RECORD_PATH"))
+        session.hooks["response"].append(recorder.requests_hook)
+    return session
+
+
+def create_async_client(timeout):
+    """httpx.AsyncClient gravando ou reproduzindo conforme as variáveis de ambiente"""
+    import httpx
+
+    replayer = get_replayer()
+    if replayer:
+        return httpx.AsyncClient(
+            timeout=timeout, transport=async_replay_transport(replayer)
+        )
+    if os.getenv("HTTP_RECORD_PATH"):
+        recorder = HttpRecorder(os.getenv("HTTP_RECORD_PATH"))
+        return httpx.AsyncClient(
+            timeout=timeout, event_hooks={"response": [recorder.httpx_hook]}
+        )
+    return httpx.AsyncClient(timeout=timeout)
+
+
+def import_capture(capture_path, endpoint, params, output_path):
+    """Converte uma captura JSON bruta em uma linha de fixture"""
+    with open(capture_path, encoding="utf-8") as f:
+        body = json.load(f)
+    recorder = HttpRecorder(output_path)
+    query = "&".join(f"{k}={v}" for k, v in normalize_params(params))
+    recorder.record(f"{endpoint}?{query}", 200, body)
+    print(f"✅ {capture_path} → {output_path} ({endpoint})")
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 3 or args[0] != "import":
+        print(
+            "Uso: python http_fixtures.py import <captura.json> <endpoint> "
+            "[param=valor ...] [--out fixtures.jsonl]"
+        )
+        return
+
+    output_path = "fixtures.jsonl"
+    if "--out" in args:
+        idx = args.index("--out")
+        output_path = args[idx + 1]
+        args = args[:idx] + args[idx + 2 :]
+
+    params = dict(arg.split("=", 1) for arg in args[3:])
+    import_capture(args[1], args[2], params, output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from dotenv import load_dotenv
 import json
 from contextlib import asynccontextmanager
 
+from http_fixtures import create_async_client
+
 # Suprimir logs do httpx
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
@@ -85,7 +87,7 @@ class Bet365Client:
         self.max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))
         self.retry_attempts = int(os.getenv("RETRY_ATTEMPTS", "3"))
         self.retry_delay = float(os.getenv("RETRY_DELAY", "1.0"))
-        self.client = httpx.AsyncClient(timeout=self.request_timeout)
+        self.client = create_async_client(self.request_timeout)
         self.semaphore = asyncio.Semaphore(self.max_concurrent_requests)
         self.requests_count = 0
 
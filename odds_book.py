@@ -0,0 +1,68 @@
+"""Odds de um evento (To Win e Total) em registros leves, lidos direto do cursor.
+
+Substitui o DataFrame que analyze_bet_value recebia: as odds ML ficam em dois
+atributos e as linhas Total numa lista de TotalLine com o handicap já
+convertido para float, sem máscaras booleanas nem iterrows() por evento.
+"""
+
+import logging
+
+logger = logging.getLogger("odds_book")
+
+ODDS_QUERY = """SELECT market_type, selection, odds, handicap_value FROM match_odds WHERE event_id = ? AND market_type IN ('To Win', 'Total')"""
+
+
+def parse_handicap(handicap):
+    """'O 76.5' / 'U 76.5' / '76.5' -> 76.5 (ValueError se inválido)"""
+    return float(str(handicap).replace("O ", "").replace("U ", ""))
+
+
+class TotalLine:
+    __slots__ = ("selection", "odds", "handicap")
+
+    def __init__(self, selection, odds, handicap):
+        self.selection = selection
+        self.odds = odds
+        self.handicap = handicap
+
+    @property
+    def is_over(self):
+        return "Over" in self.selection
+
+
+class OddsBook:
+    """Odds ML (primeira cotação de cada lado, 0 se ausente) e linhas Total válidas"""
+
+    __slots__ = ("ml_home", "ml_away", "totals", "rows")
+
+    def __init__(self, ml_home=0, ml_away=0, totals=None, rows=0):
+        self.ml_home = ml_home
+        self.ml_away = ml_away
+        self.totals = totals if totals is not None else []
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (market_type, selection, odds, handicap_value) como em match_odds"""
+        ml = {}
+        totals = []
+        count = 0
+        for market, selection, odds, handicap in rows:
+            count += 1
+            if market == "To Win":
+                ml.setdefault(selection, odds)
+            elif market == "Total" and handicap:
+                try:
+                    line = parse_handicap(handicap)
+                except ValueError:
+                    logger.warning(f"Handicap inválido: {handicap}. Ignorando.")
+                    continue
+                totals.append(TotalLine(selection, odds, line))
+        return cls(ml.get("Home", 0), ml.get("Away", 0), totals, count)
+
+    @classmethod
+    def from_db(cls, conn, event_id):
+        return cls.from_rows(conn.execute(ODDS_QUERY, (event_id,)))
@@ -0,0 +1,284 @@
+"""Exportação incremental de bets.db e table_tennis_results.db para Parquet.
+
+Cada conjunto (bets, results) vira um diretório particionado no formato hive
+por liga e mês:
+
+    parquet/bets/league_name=Czech Liga Pro/month=2026-09/part-0.parquet
+
+Uma consulta GROUP BY calcula uma impressão digital por partição (contagem,
+somas, último updated_at...) e compara com a da exportação anterior
+(_state.json): só as partições que mudaram são relidas e regravadas
+(arquivo temporário + os.replace), e as que sumiram são apagadas.
+
+As análises (analytics.py) leem bets pelo DuckDB direto desta exportação,
+que atualizam antes da primeira consulta: só as colunas usadas são lidas e
+partições e row groups são podados pelos filtros. Sem DuckDB ou pyarrow, as
+análises leem do SQLite.
+
+    python parquet_export.py --bets-db bets.db --results-db table_tennis_results.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("parquet_export")
+
+DEFAULT_EXPORT_DIR = "parquet"
+PARTITION_COLUMNS = ("league_name", "month")
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+STATE_FILE = "_state.json"
+
+DATASETS = {
+    "bets": {
+        "database": "bets",
+        "tables": ["bets"],
+        "query": """
+            SELECT b.*, substr(b.event_time, 1, 7) AS month
+            FROM bets b
+        """,
+        # Muda com inserções, remoções, liquidações e upserts de odds/ROI
+        "fingerprint": """
+            COUNT(*), TOTAL(id), MAX(updated_at), COUNT(result),
+            TOTAL(profit), TOTAL(odds), TOTAL(estimated_roi)
+        """,
+        "order_by": "event_time, id",
+        "types": {"month": "TEXT"},
+    },
+    "results": {
+        "database": "results",
+        "tables": ["events"],
+        "query": """
+            SELECT e.event_id, e.event_time, e.time_status, e.league_id,
+                   e.league_name, e.home_id, e.home_name, e.away_id, e.away_name,
+                   e.score, g.total_games,
+                   strftime('%Y-%m', e.event_time, 'unixepoch') AS month
+            FROM events e
+            LEFT JOIN (
+                SELECT event_id, SUM(home_score + away_score) AS total_games
+                FROM event_scores
+                GROUP BY event_id
+            ) g ON g.event_id = e.event_id
+        """,
+        "fingerprint": """
+            COUNT(*), TOTAL(event_id), TOTAL(time_status), TOTAL(total_games),
+            MAX(score), MIN(score)
+        """,
+        "order_by": "event_time, event_id",
+        "types": {"total_games": "INTEGER", "month": "TEXT"},
+    },
+}
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow é necessário para exportar/ler Parquet (pip install pyarrow)")
+
+
+def _arrow_type(declared):
+    """Tipo declarado no SQLite -> tipo Arrow (mesmas regras de afinidade)"""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def _partition_dir(dataset_dir, league, month):
+    parts = [
+        f"{column}={quote(str(value), safe=' ') if value is not None else NULL_PARTITION}"
+        for column, value in zip(PARTITION_COLUMNS, (league, month))
+    ]
+    return os.path.join(dataset_dir, *parts)
+
+
+def _partition_key(league, month):
+    return json.dumps([league, month], ensure_ascii=False)
+
+
+def _partition_dirs_on_disk(dataset_dir):
+    """Diretórios league_name=.../month=... existentes na exportação"""
+    found = set()
+    for league_dir in os.listdir(dataset_dir):
+        league_path = os.path.join(dataset_dir, league_dir)
+        if not league_dir.startswith("league_name=") or not os.path.isdir(league_path):
+            continue
+        for month_dir in os.listdir(league_path):
+            if month_dir.startswith("month="):
+                found.add(os.path.join(league_path, month_dir))
+    return found
+
+
+class ParquetExporter:
+    def __init__(
+        self,
+        bets_db_path="bets.db",
+        results_db_path="table_tennis_results.db",
+        export_dir=DEFAULT_EXPORT_DIR,
+    ):
+        require_pyarrow()
+        self.databases = {"bets": bets_db_path, "results": results_db_path}
+        self.export_dir = export_dir
+
+    def dataset_dir(self, name):
+        return os.path.join(self.export_dir, name)
+
+    def _load_state(self, name):
+        path = os.path.join(self.dataset_dir(name), STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, name, state):
+        path = os.path.join(self.dataset_dir(name), STATE_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _schema(self, conn, spec, columns):
+        declared = {}
+        for table in spec["tables"]:
+            for row in conn.execute(f"PRAGMA table_info({table})"):
+                declared[row[1]] = row[2]
+        declared.update(spec["types"])
+        return pa.schema(
+            [(c, _arrow_type(declared.get(c))) for c in columns if c not in PARTITION_COLUMNS]
+        )
+
+    def _write_partition(self, name, league, month, columns, rows, schema):
+        directory = _partition_dir(self.dataset_dir(name), league, month)
+        os.makedirs(directory, exist_ok=True)
+        data_columns = [c for c in columns if c not in PARTITION_COLUMNS]
+        indexes = [columns.index(c) for c in data_columns]
+        table = pa.table(
+            {
+                column: pa.array([row[i] for row in rows], type=schema.field(column).type)
+                for column, i in zip(data_columns, indexes)
+            },
+            schema=schema,
+        )
+        # Prefixo ".": pyarrow (e o glob *.parquet do DuckDB) ignora o temporário
+        tmp_path = os.path.join(directory, ".part-0.parquet.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, "part-0.parquet"))
+
+    def export_dataset(self, name, full=False):
+        """Regrava só as partições que mudaram; retorna quantas foram regravadas"""
+        spec = DATASETS[name]
+        db_path = self.databases[spec["database"]]
+        if not os.path.exists(db_path):
+            logger.warning(f"⚠️ {db_path} não encontrado, {name} não exportado")
+            return 0
+
+        dataset_dir = self.dataset_dir(name)
+        os.makedirs(dataset_dir, exist_ok=True)
+        saved = self._load_state(name)
+        previous = {} if full else saved
+
+        conn = sqlite3.connect(db_path)
+        try:
+            fingerprints = {
+                _partition_key(league, month): list(values)
+                for league, month, *values in conn.execute(
+                    f"""
+                    SELECT league_name, month, {spec['fingerprint']}
+                    FROM ({spec['query']})
+                    GROUP BY league_name, month
+                    """
+                )
+            }
+            changed = [k for k, v in fingerprints.items() if previous.get(k) != v]
+            current = {
+                _partition_dir(dataset_dir, *json.loads(k)) for k in fingerprints
+            }
+            removed = {
+                _partition_dir(dataset_dir, *json.loads(k))
+                for k in saved
+                if k not in fingerprints
+            }
+            if full:
+                # Regravação completa: também some o que o estado não conhece
+                removed |= _partition_dirs_on_disk(dataset_dir) - current
+
+            if changed:
+                where = ""
+                params = []
+                if len(changed) < len(fingerprints):
+                    # IS em vez de IN: liga ou mês NULL também formam uma partição
+                    keys = [json.loads(k) for k in changed]
+                    where = "WHERE " + " OR ".join(
+                        "(league_name IS ? AND month IS ?)" for _ in keys
+                    )
+                    params = [value for key in keys for value in key]
+                cursor = conn.execute(
+                    f"SELECT * FROM ({spec['query']}) {where} ORDER BY {spec['order_by']}",
+                    params,
+                )
+                columns = [c[0] for c in cursor.description]
+                schema = self._schema(conn, spec, columns)
+                league_idx = columns.index("league_name")
+                month_idx = columns.index("month")
+
+                partitions = {}
+                for row in cursor:
+                    partitions.setdefault((row[league_idx], row[month_idx]), []).append(row)
+                for (league, month), rows in partitions.items():
+                    self._write_partition(name, league, month, columns, rows, schema)
+        finally:
+            conn.close()
+
+        for directory in removed:
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(directory))  # liga sem nenhum mês
+            except OSError:
+                pass
+
+        self._save_state(name, fingerprints)
+        logger.info(
+            f"📦 {name}: {len(changed)} partições regravadas, {len(removed)} removidas, "
+            f"{len(fingerprints) - len(changed)} inalteradas"
+        )
+        return len(changed)
+
+    def export_all(self, full=False):
+        return {name: self.export_dataset(name, full) for name in DATASETS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação incremental para Parquet")
+    parser.add_argument("--bets-db", default="bets.db")
+    parser.add_argument("--results-db", default="table_tennis_results.db")
+    parser.add_argument("--out", default=DEFAULT_EXPORT_DIR, help="Diretório de saída")
+    parser.add_argument(
+        "--only", choices=sorted(DATASETS), help="Exporta apenas este conjunto"
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Regrava todas as partições"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    exporter = ParquetExporter(args.bets_db, args.results_db, args.out)
+    if args.only:
+        exporter.export_dataset(args.only, args.full)
+    else:
+        exporter.export_all(args.full)
+
+
+if __name__ == "__main__":
+    main()
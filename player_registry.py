@@ -0,0 +1,276 @@
+"""Identidade dos jogadores: ids da BetsAPI e variações de nome -> id inteiro.
+
+Os nomes chegam em texto livre (home_name/away_name nos resultados,
+home_team/away_team em tm_data.db e bets) e a BetsAPI manda também
+home_id/away_id. A tabela players dá um id inteiro a cada jogador;
+player_betsapi_ids e player_aliases (nome normalizado: sem acento, minúsculo,
+tokens em ordem alfabética) apontam para ele. O id da BetsAPI é quem decide:
+um id novo cujo nome já pertence a um jogador com outro id da BetsAPI é um
+homônimo e ganha um jogador próprio (o nome continua apontando para o
+primeiro). Um nome visto antes só sem id é ligado ao id que aparecer com ele;
+se isso liga dois jogadores já existentes, eles são unidos no menor id e a
+geração do registro é incrementada para que os caches derivados se
+reconstruam.
+
+events ganha as colunas home_player_id/away_player_id, preenchidas por
+assign_player_ids() para as linhas ainda sem id (índice parcial), e os caches
+derivados (player_stats, h2h_pairs, player_form) e o ELO usam esses inteiros.
+"""
+
+import logging
+import re
+import sqlite3
+import unicodedata
+
+logger = logging.getLogger("player_registry")
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def normalize_name(name):
+    """'Šimon  NOVÁK' e 'Novak Simon' -> 'novak simon'"""
+    if name is None:
+        return None
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    tokens = TOKEN_PATTERN.findall(text)
+    return " ".join(sorted(tokens)) or None
+
+
+def init_registry(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS players (
+        player_id INTEGER PRIMARY KEY,
+        name TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_betsapi_ids (
+        betsapi_id TEXT PRIMARY KEY,
+        player_id INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_aliases (
+        alias TEXT PRIMARY KEY,
+        player_id INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_registry_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER
+    )
+    """)
+
+    cursor.execute("PRAGMA table_info(events)")
+    columns = {row[1] for row in cursor.fetchall()}
+    for column in ("home_player_id", "away_player_id"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE events ADD COLUMN {column} INTEGER")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_events_home_player_time ON events(home_player_id, event_time)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_events_away_player_time ON events(away_player_id, event_time)"
+    )
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_events_unmapped_players ON events(id)
+    WHERE home_player_id IS NULL OR away_player_id IS NULL
+    """)
+
+
+def get_generation(cursor):
+    cursor.execute("SELECT value FROM player_registry_state WHERE key = 'generation'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _merge_players(cursor, keep, drop, by_betsapi, by_alias):
+    """Une dois jogadores que se revelaram o mesmo (mantém o menor id)"""
+    for table in ("player_betsapi_ids", "player_aliases"):
+        cursor.execute(
+            f"UPDATE {table} SET player_id = ? WHERE player_id = ?", (keep, drop)
+        )
+    cursor.execute(
+        "UPDATE events SET home_player_id = ? WHERE home_player_id = ?", (keep, drop)
+    )
+    cursor.execute(
+        "UPDATE events SET away_player_id = ? WHERE away_player_id = ?", (keep, drop)
+    )
+    cursor.execute("DELETE FROM players WHERE player_id = ?", (drop,))
+    for mapping in (by_betsapi, by_alias):
+        for key, pid in mapping.items():
+            if pid == drop:
+                mapping[key] = keep
+
+
+def assign_player_ids(cursor):
+    """Preenche home_player_id/away_player_id das linhas novas de events.
+
+    Roda na transação de quem chama; retorna o número de linhas mapeadas.
+    """
+    init_registry(cursor)
+    cursor.execute("""
+    SELECT id, home_id, home_name, away_id, away_name FROM events
+    WHERE home_player_id IS NULL OR away_player_id IS NULL
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    cursor.execute("SELECT betsapi_id, player_id FROM player_betsapi_ids")
+    by_betsapi = dict(cursor.fetchall())
+    cursor.execute("SELECT alias, player_id FROM player_aliases")
+    by_alias = dict(cursor.fetchall())
+    # Jogadores que já têm id da BetsAPI
+    identified = set(by_betsapi.values())
+    merges = 0
+
+    def resolve(betsapi_id, name):
+        nonlocal merges
+        betsapi_id = str(betsapi_id) if betsapi_id not in (None, "") else None
+        alias = normalize_name(name)
+        if betsapi_id is None and alias is None:
+            return None
+
+        pid_by_id = by_betsapi.get(betsapi_id)
+        pid_by_alias = by_alias.get(alias)
+        if betsapi_id is not None and pid_by_alias in identified and pid_by_alias != pid_by_id:
+            # Nome de outro jogador com id da BetsAPI: homônimo, não une
+            pid_by_alias = None
+        if pid_by_id is None and pid_by_alias is None:
+            cursor.execute("INSERT INTO players (name) VALUES (?)", (name,))
+            pid = cursor.lastrowid
+        elif pid_by_id is not None and pid_by_alias is not None and pid_by_id != pid_by_alias:
+            pid, drop = min(pid_by_id, pid_by_alias), max(pid_by_id, pid_by_alias)
+            _merge_players(cursor, pid, drop, by_betsapi, by_alias)
+            identified.discard(drop)
+            identified.add(pid)
+            merges += 1
+        else:
+            pid = pid_by_id if pid_by_id is not None else pid_by_alias
+
+        if betsapi_id is not None and betsapi_id not in by_betsapi:
+            by_betsapi[betsapi_id] = pid
+            identified.add(pid)
+            cursor.execute(
+                "INSERT INTO player_betsapi_ids (betsapi_id, player_id) VALUES (?, ?)",
+                (betsapi_id, pid),
+            )
+        if alias is not None and alias not in by_alias:
+            by_alias[alias] = pid
+            cursor.execute(
+                "INSERT INTO player_aliases (alias, player_id) VALUES (?, ?)",
+                (alias, pid),
+            )
+        return pid
+
+    assigned = []
+    for row_id, home_id, home_name, away_id, away_name in rows:
+        assigned.append(
+            (home_id, home_name, away_id, away_name, row_id,
+             resolve(home_id, home_name), resolve(away_id, away_name))
+        )
+
+    # Uma união no meio do lote pode ter invalidado ids já resolvidos: resolve de novo
+    updates = []
+    for home_id, home_name, away_id, away_name, row_id, home_pid, away_pid in assigned:
+        if merges:
+            home_pid = resolve(home_id, home_name)
+            away_pid = resolve(away_id, away_name)
+        updates.append((home_pid, away_pid, row_id))
+    cursor.executemany(
+        "UPDATE events SET home_player_id = ?, away_player_id = ? WHERE id = ?",
+        updates,
+    )
+
+    if merges:
+        cursor.execute(
+            """
+            INSERT INTO player_registry_state (key, value) VALUES ('generation', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+            """
+        )
+        logger.info(f"🔗 {merges} jogadores unidos por id/nome em comum")
+    return len(rows)
+
+
+def prepare_derived_cache(cursor, tables, state_table):
+    """Chamado no início do sync de um cache derivado: atribui ids pendentes e,
+    se o registro mudou de geração desde a última sincronização do cache,
+    apaga o cache para que seja reconstruído do zero"""
+    assign_player_ids(cursor)
+    generation = get_generation(cursor)
+    cursor.execute(
+        f"SELECT value FROM {state_table} WHERE key = 'registry_generation'"
+    )
+    row = cursor.fetchone()
+    if row is None or row[0] != generation:
+        for table in tables:
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"DELETE FROM {state_table}")
+        cursor.execute(
+            f"INSERT INTO {state_table} (key, value) VALUES ('registry_generation', ?)",
+            (generation,),
+        )
+
+
+def drop_outdated_table(cursor, table, required_column, state_table):
+    """Descarta um cache criado antes da chave por player_id (é reconstruído no sync)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = {row[1] for row in cursor.fetchall()}
+    if columns and required_column not in columns:
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (state_table,),
+        )
+        if cursor.fetchone():
+            cursor.execute(f"DELETE FROM {state_table}")
+
+
+class PlayerRegistry:
+    def __init__(self, results_db_path="table_tennis_results.db"):
+        self.results_db_path = results_db_path
+        self._aliases = {}
+        self._names = {}
+        conn = sqlite3.connect(self.results_db_path)
+        init_registry(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def sync(self):
+        """Atribui ids às linhas novas de events"""
+        conn = sqlite3.connect(self.results_db_path)
+        try:
+            assigned = assign_player_ids(conn.cursor())
+            conn.commit()
+            if assigned:
+                logger.info(f"🪪 Ids de jogador atribuídos a {assigned} partidas")
+            return assigned
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao atribuir ids de jogadores: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def load(self):
+        conn = sqlite3.connect(self.results_db_path)
+        self._aliases = dict(
+            conn.execute("SELECT alias, player_id FROM player_aliases").fetchall()
+        )
+        self._names = dict(
+            conn.execute("SELECT player_id, name FROM players").fetchall()
+        )
+        conn.close()
+        return self
+
+    def resolve(self, name):
+        """Id inteiro do jogador pelo nome (qualquer variação já vista) ou None"""
+        return self._aliases.get(normalize_name(name))
+
+    def name(self, player_id):
+        return self._names.get(player_id)
@@ -0,0 +1,331 @@
+"""Cache de estatísticas por jogador em janelas móveis.
+
+Para cada jogador mantém, na tabela player_stats de table_tennis_results.db,
+agregados para as janelas das últimas 10/20/50 partidas e dos últimos 7/30
+dias: distribuição de games por partida, taxa de over nas linhas comuns,
+vitórias e sets ganhos.
+
+A atualização é incremental: events.id é AUTOINCREMENT e os coletores
+substituem eventos com DELETE + INSERT, então toda linha nova tem id maior que
+a marca d'água salva em player_stats_state. sync() recalcula só os jogadores
+dessas linhas (e os que têm partidas saindo das janelas por dias). Depois de
+load(), as leituras são consultas em dicionário. Os jogadores são
+identificados pelo id inteiro de player_registry.py.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+
+from player_registry import drop_outdated_table, init_registry, prepare_derived_cache
+
+logger = logging.getLogger("player_stats")
+
+# janela -> (tipo, tamanho)
+WINDOWS = {
+    "m10": ("matches", 10),
+    "m20": ("matches", 20),
+    "m50": ("matches", 50),
+    "d7": ("days", 7),
+    "d30": ("days", 30),
+}
+COMMON_LINES = (75.5, 76.5, 77.5, 78.5, 79.5)
+
+MAX_MATCH_WINDOW = max(size for kind, size in WINDOWS.values() if kind == "matches")
+MAX_DAY_WINDOW = max(size for kind, size in WINDOWS.values() if kind == "days")
+
+# Limite de variáveis por consulta do SQLite
+CHUNK_SIZE = 400
+
+
+def line_column(line):
+    """75.5 -> over_75_5"""
+    return "over_" + str(line).replace(".", "_")
+
+
+def parse_sets(score):
+    """'3-1' -> (3, 1); None se o placar for inválido"""
+    try:
+        home_sets, away_sets = map(int, str(score).split("-"))
+    except (ValueError, TypeError):
+        return None
+    return home_sets, away_sets
+
+
+def aggregate_window(matches):
+    """Agrega partidas [(event_time, total_games, sets_won, sets_lost), ...]
+    ordenadas da mais recente para a mais antiga"""
+    games_list = [total for _, total, _, _ in matches if total > 0]
+    decided = [m for m in matches if m[2] is not None]
+    wins = sum(1 for _, _, won, lost in decided if won > lost)
+    stats = {
+        "matches": len(games_list),
+        "wins": wins,
+        "losses": len(decided) - wins,
+        "sets_won": sum(m[2] for m in decided),
+        "sets_lost": sum(m[3] for m in decided),
+        "games_list": games_list,
+        "avg_games": sum(games_list) / len(games_list) if games_list else 0,
+        "oldest_event_time": matches[-1][0] if matches else None,
+        "newest_event_time": matches[0][0] if matches else None,
+    }
+    for line in COMMON_LINES:
+        stats[line_column(line)] = (
+            sum(1 for g in games_list if g > line) / len(games_list)
+            if games_list
+            else 0
+        )
+    return stats
+
+
+class PlayerStatsCache:
+    def __init__(self, results_db_path="table_tennis_results.db"):
+        self.results_db_path = results_db_path
+        self._stats = {}
+        self._distributions = {}
+        self.init_db()
+
+    def init_db(self):
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        line_columns = ",\n            ".join(
+            f"{line_column(line)} REAL" for line in COMMON_LINES
+        )
+        init_registry(cursor)
+        drop_outdated_table(cursor, "player_stats", "player_id", "player_stats_state")
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS player_stats (
+            player_id INTEGER NOT NULL,
+            stat_window TEXT NOT NULL,
+            matches INTEGER,
+            wins INTEGER,
+            losses INTEGER,
+            sets_won INTEGER,
+            sets_lost INTEGER,
+            games_list TEXT,
+            avg_games REAL,
+            {line_columns},
+            oldest_event_time INTEGER,
+            newest_event_time INTEGER,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (player_id, stat_window)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS player_stats_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_event_scores_event_id ON event_scores(event_id)"
+        )
+        conn.commit()
+        conn.close()
+
+    def _get_state(self, cursor, key, default=0):
+        cursor.execute("SELECT value FROM player_stats_state WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else default
+
+    def _find_stale_players(self, cursor, now):
+        """Jogadores com linhas novas em events ou com partidas saindo das janelas por dias"""
+        last_id = self._get_state(cursor, "last_event_row_id")
+        cursor.execute(
+            "SELECT MAX(id) FROM events WHERE id > ?", (last_id,)
+        )
+        max_id = cursor.fetchone()[0]
+
+        players = set()
+        if max_id is not None:
+            cursor.execute(
+                "SELECT home_player_id, away_player_id FROM events WHERE id > ?",
+                (last_id,),
+            )
+            for home_player_id, away_player_id in cursor.fetchall():
+                players.add(home_player_id)
+                players.add(away_player_id)
+
+        for window, (kind, size) in WINDOWS.items():
+            if kind != "days":
+                continue
+            cursor.execute(
+                "SELECT player_id FROM player_stats WHERE stat_window = ? AND oldest_event_time < ?",
+                (window, now - size * 86400),
+            )
+            players.update(row[0] for row in cursor.fetchall())
+
+        players.discard(None)
+        return players, max_id if max_id is not None else last_id
+
+    def _load_player_matches(self, cursor, players, now):
+        """Partidas recentes de cada jogador, da mais recente para a mais antiga"""
+        cutoff = now - MAX_DAY_WINDOW * 86400
+        matches = {player: [] for player in players}
+        players = list(players)
+        for i in range(0, len(players), CHUNK_SIZE):
+            chunk = players[i : i + CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT player, event_time, score, is_home,
+                    (SELECT SUM(home_score) + SUM(away_score)
+                     FROM event_scores WHERE event_id = ranked.event_id)
+                FROM (
+                    SELECT player, event_id, event_time, score, is_home,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY player ORDER BY event_time DESC
+                        ) AS rn
+                    FROM (
+                        SELECT home_player_id AS player, event_id, event_time, score, 1 AS is_home
+                        FROM events WHERE home_player_id IN ({placeholders})
+                        UNION ALL
+                        SELECT away_player_id AS player, event_id, event_time, score, 0 AS is_home
+                        FROM events WHERE away_player_id IN ({placeholders})
+                    )
+                ) AS ranked
+                WHERE rn <= ? OR event_time >= ?
+                ORDER BY player, rn
+                """,
+                (*chunk, *chunk, MAX_MATCH_WINDOW, cutoff),
+            )
+            for player, event_time, score, is_home, total in cursor.fetchall():
+                sets = parse_sets(score)
+                if sets is None:
+                    won = lost = None
+                else:
+                    won, lost = sets if is_home else (sets[1], sets[0])
+                matches[player].append((event_time, total or 0, won, lost))
+        return matches
+
+    def _build_rows(self, player, matches, now):
+        rows = []
+        for window, (kind, size) in WINDOWS.items():
+            if kind == "matches":
+                selected = matches[:size]
+            else:
+                cutoff = now - size * 86400
+                selected = [m for m in matches if m[0] is not None and m[0] >= cutoff]
+            if not selected:
+                continue
+            stats = aggregate_window(selected)
+            rows.append(
+                (
+                    player,
+                    window,
+                    stats["matches"],
+                    stats["wins"],
+                    stats["losses"],
+                    stats["sets_won"],
+                    stats["sets_lost"],
+                    json.dumps(stats["games_list"]),
+                    stats["avg_games"],
+                    *(stats[line_column(line)] for line in COMMON_LINES),
+                    stats["oldest_event_time"],
+                    stats["newest_event_time"],
+                )
+            )
+        return rows
+
+    def sync(self, now=None):
+        """Recalcula as estatísticas dos jogadores afetados desde a última sincronização"""
+        now = int(now if now is not None else time.time())
+        conn = sqlite3.connect(self.results_db_path)
+        cursor = conn.cursor()
+        try:
+            prepare_derived_cache(cursor, ["player_stats"], "player_stats_state")
+            players, max_id = self._find_stale_players(cursor, now)
+            if players:
+                matches = self._load_player_matches(cursor, players, now)
+                rows = []
+                for player, player_matches in matches.items():
+                    rows.extend(self._build_rows(player, player_matches, now))
+
+                player_list = list(players)
+                for i in range(0, len(player_list), CHUNK_SIZE):
+                    chunk = player_list[i : i + CHUNK_SIZE]
+                    cursor.execute(
+                        f"DELETE FROM player_stats WHERE player_id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                columns = [
+                    "player_id", "stat_window", "matches", "wins", "losses",
+                    "sets_won", "sets_lost", "games_list", "avg_games",
+                    *(line_column(line) for line in COMMON_LINES),
+                    "oldest_event_time", "newest_event_time",
+                ]
+                cursor.executemany(
+                    f"INSERT INTO player_stats ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    rows,
+                )
+            cursor.execute(
+                """
+                INSERT INTO player_stats_state (key, value) VALUES ('last_event_row_id', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (max_id,),
+            )
+            conn.commit()
+            if players:
+                logger.info(
+                    f"📦 Cache de jogadores atualizado: {len(players)} jogadores recalculados"
+                )
+            return len(players)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao sincronizar cache de jogadores: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def load(self):
+        """Carrega todas as estatísticas em memória para leitura O(1)"""
+        conn = sqlite3.connect(self.results_db_path)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM player_stats").fetchall()
+        conn.close()
+
+        self._stats = {}
+        self._distributions = {}
+        for row in rows:
+            stats = dict(row)
+            stats["games_list"] = json.loads(stats["games_list"] or "[]")
+            self._stats[(stats.pop("player_id"), stats.pop("stat_window"))] = stats
+        return self
+
+    def get(self, player_id, window="m20"):
+        """Estatísticas do jogador na janela, ou None se não houver partidas"""
+        return self._stats.get((player_id, window))
+
+    def games_list(self, player_id, limit=20):
+        """Totais de games das últimas `limit` partidas (mesmo critério de
+        BetProcessor.get_games_per_match_list); None se a janela não existe"""
+        window = f"m{limit}"
+        if window not in WINDOWS:
+            return None
+        stats = self._stats.get((player_id, window))
+        return list(stats["games_list"]) if stats else []
+
+    def distribution(self, player_id, limit=20):
+        """TotalsDistribution (totais ordenados) da janela de `limit` partidas;
+        None se a janela não existe"""
+        from totals_model import TotalsDistribution  # NumPy só para quem analisa
+
+        key = (player_id, limit)
+        if key not in self._distributions:
+            games_list = self.games_list(player_id, limit)
+            if games_list is None:
+                return None
+            self._distributions[key] = TotalsDistribution(games_list)
+        return self._distributions[key]
+
+    def over_rate(self, player_id, line, window="m20"):
+        """Fração das partidas da janela acima da linha (under = 1 - over)"""
+        stats = self._stats.get((player_id, window))
+        if not stats or not stats["games_list"]:
+            return 0
+        if line in COMMON_LINES:
+            return stats[line_column(line)]
+        games = stats["games_list"]
+        return sum(1 for g in games if g > line) / len(games)
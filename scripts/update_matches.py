@@ -1,7 +1,6 @@
 import requests
 import os
 import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import time
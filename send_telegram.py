@@ -2,11 +2,15 @@ import asyncio
 import logging
 import os
 import sqlite3
+import time
 from datetime import datetime
 
-import pandas as pd
 from telegram import Bot
 from telegram.constants import ParseMode
+from telegram.error import RetryAfter
+
+from strategy import load_strategy
+from strategy_stats import init_strategy_stats, load_strategy_stats
 
 try:
     from dotenv import load_dotenv
@@ -20,21 +24,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger("telegram_notifier")
 
+# Limites do Telegram: ~1 msg/s por chat (com pequenas rajadas) e 30 msg/s no total
+CHAT_RATE_PER_SECOND = 1.0
+CHAT_BURST = 3
+GLOBAL_RATE_PER_SECOND = 30.0
+MAX_SEND_ATTEMPTS = 3
+
+# Filtro de config/strategy.json que escolhe as apostas enviadas
+SELECTION_FILTER = "telegram_under"
+
+
+class TokenBucket:
+    """Balde de fichas assíncrono: `rate` fichas por segundo, até `capacity` acumuladas"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Segura o balde até daqui a `seconds` (RetryAfter); aí libera uma ficha"""
+        self.tokens = 1.0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+def format_event_time(event_time):
+    """'2025-09-19T03:43:00' -> '19/09 03:43'"""
+    return datetime.fromisoformat(str(event_time)).strftime("%d/%m %H:%M")
+
 
 class TelegramBetNotifier:
-    def __init__(self, bot_token=None, chat_id=None, bets_db_path="bets.db"):
+    def __init__(self, bot_token=None, chat_id=None, bets_db_path="bets.db", connect_bot=True):
+        """connect_bot=False só prepara as tabelas, sem credenciais nem Bot"""
         self.bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
         self.bets_db_path = bets_db_path
         self.MAX_MESSAGE_LENGTH = 4096
+        self.strategy = load_strategy()
+        self.selection = self.strategy.filter(SELECTION_FILTER)
+        if not connect_bot:
+            self.init_tracking_tables(self.selection)
+            return
 
         if not self.bot_token or not self.chat_id:
             raise ValueError("TELEGRAM_BOT_TOKEN e TELEGRAM_CHAT_ID são obrigatórios!")
 
         self.bot = Bot(token=self.bot_token)
-        self.init_tracking_tables()
+        self.chat_bucket = TokenBucket(CHAT_RATE_PER_SECOND, CHAT_BURST)
+        self.global_bucket = TokenBucket(
+            GLOBAL_RATE_PER_SECOND, GLOBAL_RATE_PER_SECOND
+        )
+        self.init_tracking_tables(self.selection)
 
-    def init_tracking_tables(self):
+    def init_tracking_tables(self, selection=None):
+        """Tabela de apostas enviadas e, se houver `selection`, o índice do
+        filtro de seleção em bets"""
         conn = sqlite3.connect(self.bets_db_path)
         cursor = conn.cursor()
         cursor.execute(
@@ -46,72 +105,55 @@ class TelegramBetNotifier:
             )
             """
         )
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bets'")
+        if selection is not None and cursor.fetchone():
+            # Índice nas colunas comuns às regras: o OR vira buscas no índice
+            selection.ensure_index(cursor)
         conn.commit()
         conn.close()
 
     def get_new_bets(self):
         conn = sqlite3.connect(self.bets_db_path)
 
-        query = """
+        query = f"""
             SELECT
                 b.id, b.league_name, b.home_team, b.away_team,
                 b.event_time, b.bet_type, b.selection, b.handicap,
                 b.odds, b.estimated_roi
             FROM bets b
             LEFT JOIN telegram_sent_bets t ON b.id = t.bet_id
-            WHERE t.bet_id IS NULL
-              AND b.bet_type = 'Total'
-              AND b.selection LIKE 'Under%'
-              AND (
-                  (b.league_name = 'Setka Cup' AND b.handicap = 76.5 AND b.estimated_roi >= 20)
-                  OR (b.league_name = 'Czech Liga Pro' AND b.handicap = 76.5 AND b.estimated_roi >= 20)
-                  OR (b.league_name = 'Czech Liga Pro' AND b.handicap = 78.5 AND b.estimated_roi >= 10)
-              )
+            WHERE t.bet_id IS NULL AND {self.selection.sql("b")}
             ORDER BY b.league_name, b.event_time ASC
         """
-        df = pd.read_sql_query(query, conn)
+        conn.row_factory = sqlite3.Row
+        bets = [dict(row) for row in conn.execute(query).fetchall()]
         conn.close()
 
-        if not df.empty:
-            logger.info(f"Apostas Under não enviadas encontradas: {len(df)}")
-        return df
+        if bets:
+            logger.info(f"Apostas Under não enviadas encontradas: {len(bets)}")
+        return bets
 
     def mark_bets_as_sent(self, bet_ids):
         conn = sqlite3.connect(self.bets_db_path)
-        cursor = conn.cursor()
-        for bet_id in bet_ids:
-            cursor.execute(
-                "INSERT INTO telegram_sent_bets (bet_id) VALUES (?)", (bet_id,)
-            )
+        conn.executemany(
+            "INSERT OR IGNORE INTO telegram_sent_bets (bet_id) VALUES (?)",
+            [(bet_id,) for bet_id in bet_ids],
+        )
         conn.commit()
         conn.close()
 
     def get_profit_summary(self):
+        """Totais por segmento da estratégia, já materializados em strategy_stats"""
         conn = sqlite3.connect(self.bets_db_path)
-        query = """
-            SELECT
-                result,
-                profit,
-                handicap,
-                estimated_roi,
-                bet_edge,
-                league_name
-            FROM bets
-            WHERE result IS NOT NULL 
-              AND bet_type = 'Total' 
-              AND selection LIKE 'Under%'
-              AND (
-                  (league_name = 'Setka Cup' AND handicap = 76.5 AND estimated_roi >= 20)
-                  OR (league_name = 'Czech Liga Pro' AND handicap = 76.5 AND estimated_roi >= 20)
-                  OR (league_name = 'Czech Liga Pro' AND handicap = 78.5 AND estimated_roi >= 10)
-              )
-        """
-        df = pd.read_sql_query(query, conn)
+        cursor = conn.cursor()
+        init_strategy_stats(cursor)
+        conn.commit()
+        stats = load_strategy_stats(cursor)
         conn.close()
-        return df
+        return stats
 
     def format_bet_messages(self, league_bets):
-        league_name = league_bets.iloc[0]["league_name"]
+        league_name = league_bets[0]["league_name"]
         league_icons = {
             "Czech Liga Pro": "🇨🇿",
             "TT Elite Series": "⭐",
@@ -128,14 +170,14 @@ class TelegramBetNotifier:
         current_message = header
 
         def format_under_section(bets):
-            if bets.empty:
+            if not bets:
                 return ""
 
-            bets_sorted = bets.sort_values("event_time")
+            bets_sorted = sorted(bets, key=lambda bet: bet["event_time"])
             section = "🔻 *UNDER*\n"
 
-            for _, bet in bets_sorted.iterrows():
-                time_str = pd.to_datetime(bet["event_time"]).strftime("%d/%m %H:%M")
+            for bet in bets_sorted:
+                time_str = format_event_time(bet["event_time"])
                 tip = f"{bet['selection']} {bet['handicap']:.1f}"
 
                 # Definir estrelas conforme categoria
@@ -153,7 +195,7 @@ class TelegramBetNotifier:
 
             return section
 
-        if not league_bets.empty:
+        if league_bets:
             under_section = format_under_section(league_bets)
 
             if len(current_message + under_section) > self.MAX_MESSAGE_LENGTH:
@@ -162,10 +204,10 @@ class TelegramBetNotifier:
                     current_message = header
 
                 temp_section = "🔻 *UNDER*\n"
-                under_sorted = league_bets.sort_values("event_time")
+                under_sorted = sorted(league_bets, key=lambda bet: bet["event_time"])
 
-                for _, bet in under_sorted.iterrows():
-                    time_str = pd.to_datetime(bet["event_time"]).strftime("%d/%m %H:%M")
+                for bet in under_sorted:
+                    time_str = format_event_time(bet["event_time"])
                     tip = f"{bet['selection']} {bet['handicap']:.1f}"
 
                     is_setka = bet["league_name"] == "Setka Cup"
@@ -202,121 +244,89 @@ class TelegramBetNotifier:
         return messages
 
     def format_profit_message(self, profit_data):
-        if profit_data.empty:
+        """Um bloco por segmento de config/strategy.json; o primeiro é o total"""
+        total_segment = next(iter(self.strategy.segments))
+        if not profit_data[total_segment]["bets"]:
             return "📊 *RESUMO DE LUCROS UNDER*\n\nNenhum dado disponível ainda."
 
-        # Estratégia otimizada completa
-        total_profit = profit_data["profit"].sum()
-        total_bets = len(profit_data)
-        total_wins = (profit_data["result"] == 1).sum()
-        total_losses = (profit_data["result"] == 0).sum()
-        total_roi = (total_profit / total_bets * 100) if total_bets > 0 else 0
-
-        # Setka Cup H76.5 ROI>=20
-        setka = profit_data[
-            (profit_data["league_name"] == "Setka Cup")
-            & (profit_data["handicap"] == 76.5)
-        ]
-        setka_profit = setka["profit"].sum()
-        setka_bets = len(setka)
-        setka_wins = (setka["result"] == 1).sum()
-        setka_losses = (setka["result"] == 0).sum()
-        setka_roi = (setka_profit / setka_bets * 100) if setka_bets > 0 else 0
-
-        # Czech Liga Pro H76.5 ROI>=20
-        czech_76 = profit_data[
-            (profit_data["league_name"] == "Czech Liga Pro")
-            & (profit_data["handicap"] == 76.5)
-        ]
-        czech_76_profit = czech_76["profit"].sum()
-        czech_76_bets = len(czech_76)
-        czech_76_wins = (czech_76["result"] == 1).sum()
-        czech_76_losses = (czech_76["result"] == 0).sum()
-        czech_76_roi = (
-            (czech_76_profit / czech_76_bets * 100) if czech_76_bets > 0 else 0
-        )
-
-        # Czech Liga Pro H78.5 ROI>=10
-        czech_78 = profit_data[
-            (profit_data["league_name"] == "Czech Liga Pro")
-            & (profit_data["handicap"] >= 78.5)
-        ]
-        czech_78_profit = czech_78["profit"].sum()
-        czech_78_bets = len(czech_78)
-        czech_78_wins = (czech_78["result"] == 1).sum()
-        czech_78_losses = (czech_78["result"] == 0).sum()
-        czech_78_roi = (
-            (czech_78_profit / czech_78_bets * 100) if czech_78_bets > 0 else 0
-        )
+        blocks = []
+        for segment, (label, _) in self.strategy.segments.items():
+            stats = profit_data[segment]
+            roi = stats["profit"] / stats["bets"] * 100 if stats["bets"] > 0 else 0
+            status = "✅" if stats["profit"] > 0 else "❌"
+            blocks.append(
+                f"{label}\n"
+                f"{status} {stats['profit']:+.2f}u | ROI: {roi:+.1f}% | "
+                f"{stats['wins']}W-{stats['losses']}L ({stats['bets']})"
+            )
 
         message = "💰 *RESUMO DE LUCROS UNDER*\n"
         message += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-
-        status_total = "✅" if total_profit > 0 else "❌"
-        message += f"🎯 *ESTRATÉGIA OTIMIZADA*\n"
-        message += f"{status_total} {total_profit:+.2f}u | ROI: {total_roi:+.1f}% | {total_wins}W-{total_losses}L ({total_bets})\n\n"
-
-        status_setka = "✅" if setka_profit > 0 else "❌"
-        message += f"🔥 *Setka H76.5 (ROI≥20%)*\n"
-        message += f"{status_setka} {setka_profit:+.2f}u | ROI: {setka_roi:+.1f}% | {setka_wins}W-{setka_losses}L ({setka_bets})\n\n"
-
-        status_c76 = "✅" if czech_76_profit > 0 else "❌"
-        message += f"🇨🇿 *Czech H76.5 (ROI≥20%)*\n"
-        message += f"{status_c76} {czech_76_profit:+.2f}u | ROI: {czech_76_roi:+.1f}% | {czech_76_wins}W-{czech_76_losses}L ({czech_76_bets})\n\n"
-
-        status_c78 = "✅" if czech_78_profit > 0 else "❌"
-        message += f"⭐ *Czech H78.5+ (ROI≥10%)*\n"
-        message += f"{status_c78} {czech_78_profit:+.2f}u | ROI: {czech_78_roi:+.1f}% | {czech_78_wins}W-{czech_78_losses}L ({czech_78_bets})"
-
-        return message
+        return message + "\n\n".join(blocks)
 
     async def send_message(self, text):
-        try:
-            await self.bot.send_message(
-                chat_id=self.chat_id, text=text, parse_mode=ParseMode.MARKDOWN
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao enviar mensagem: {e}")
-            return False
+        """Envia respeitando os baldes de taxa; em RetryAfter espera o tempo
+        pedido pelo servidor e tenta de novo"""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            await self.chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(
+                    chat_id=self.chat_id, text=text, parse_mode=ParseMode.MARKDOWN
+                )
+                return True
+            except RetryAfter as e:
+                delay = float(e.retry_after)
+                logger.warning(
+                    f"⏳ Limite do Telegram atingido, aguardando {delay:.0f}s "
+                    f"(tentativa {attempt}/{MAX_SEND_ATTEMPTS})"
+                )
+                # Todas as ligas esperam: o limite é do chat, não da mensagem
+                self.chat_bucket.pause(delay)
+            except Exception as e:
+                logger.error(f"Erro ao enviar mensagem: {e}")
+                return False
+        logger.error("Erro ao enviar mensagem: limite de tentativas esgotado")
+        return False
+
+    async def send_league_bets(self, league, league_bets):
+        """Formata e envia as mensagens de uma liga, em ordem; marca as apostas
+        como enviadas assim que a liga termina"""
+        messages = self.format_bet_messages(league_bets)
+
+        for i, message in enumerate(messages):
+            if await self.send_message(message):
+                logger.info(
+                    f"✅ Enviada parte {i + 1}/{len(messages)} da liga {league}"
+                )
+            else:
+                logger.error(f"❌ Falha ao enviar parte {i + 1} da liga {league}")
+                return 0
+
+        self.mark_bets_as_sent([bet["id"] for bet in league_bets])
+        logger.info(
+            f"✅ Todas as {len(league_bets)} apostas da liga {league} enviadas"
+        )
+        return len(league_bets)
 
     async def send_new_bets(self):
         new_bets = self.get_new_bets()
 
-        if new_bets.empty:
+        if not new_bets:
             logger.info("Nenhuma aposta nova para enviar")
             return 0
 
         logger.info(f"Encontradas {len(new_bets)} apostas novas")
 
-        sent_count = 0
-        sent_bet_ids = []
-
-        for league in new_bets["league_name"].unique():
-            league_bets = new_bets[new_bets["league_name"] == league]
-            messages = self.format_bet_messages(league_bets)
-
-            league_success = True
-            for i, message in enumerate(messages):
-                if await self.send_message(message):
-                    logger.info(
-                        f"✅ Enviada parte {i + 1}/{len(messages)} da liga {league}"
-                    )
-                    await asyncio.sleep(1)
-                else:
-                    logger.error(f"❌ Falha ao enviar parte {i + 1} da liga {league}")
-                    league_success = False
-                    break
+        bets_by_league = {}
+        for bet in new_bets:
+            bets_by_league.setdefault(bet["league_name"], []).append(bet)
 
-            if league_success:
-                sent_bet_ids.extend(league_bets["id"].tolist())
-                sent_count += len(league_bets)
-                logger.info(
-                    f"✅ Todas as {len(league_bets)} apostas da liga {league} enviadas"
-                )
-
-        if sent_bet_ids:
-            self.mark_bets_as_sent(sent_bet_ids)
+        # Uma liga por vez: mensagens de ligas diferentes não se intercalam no chat
+        sent_count = 0
+        for league, league_bets in bets_by_league.items():
+            sent_count += await self.send_league_bets(league, league_bets)
+        if sent_count:
             logger.info(f"Total de apostas enviadas: {sent_count}")
 
         return sent_count
@@ -333,7 +343,6 @@ class TelegramBetNotifier:
     async def run(self):
         try:
             sent_count = await self.send_new_bets()
-            await asyncio.sleep(2)
             await self.send_profit_summary()
             logger.info("✅ Execução concluída")
         except Exception as e:
@@ -0,0 +1,184 @@
+"""Fila de liquidação: quais apostas pendentes vale a pena perguntar à API agora.
+
+As apostas sem resultado ficam num índice parcial
+(bets(event_time) WHERE result IS NULL AND actual_result IS NOT 'void'), que
+cresce só com as pendentes e não com o histórico inteiro. Um evento só é consultado depois que event_time
+(+ SETTLEMENT_GRACE_MINUTES) passou. Cada consulta sem resultado fica em
+settlement_attempts (última consulta, status, próxima janela) e a espera
+depende do que a API respondeu (RETRY_POLICY): ao vivo volta em minutos,
+adiado/suspenso em horas, e cancelado/abandonado sai da fila de vez: as
+apostas do evento ficam com actual_result = 'void' e result NULL (fora do
+lucro/ROI e das pendentes). A espera
+dobra a cada consulta seguida no mesmo status e recomeça quando ele muda.
+
+Os horários seguem o formato de bets.event_time (ISO, hora local).
+"""
+
+from datetime import datetime, timedelta
+
+# Partida de tênis de mesa leva ~30 min: antes disso a API não tem o resultado
+SETTLEMENT_GRACE_MINUTES = 30
+
+# time_status da BetsAPI -> status na fila ("3" = finalizado, liquida)
+TIME_STATUS_CATEGORIES = {
+    "0": "not_started",
+    "1": "live",
+    "2": "postponed",  # a definir
+    "4": "postponed",
+    "7": "postponed",  # interrompido
+    "10": "postponed",  # suspenso
+    "5": "void",  # cancelado
+    "6": "void",  # W.O.
+    "8": "void",  # abandonado
+    "9": "void",  # desistência
+    "11": "void",  # decidido pela federação
+    "99": "void",  # removido
+}
+
+# Status -> (espera inicial, espera máxima) em minutos
+RETRY_POLICY = {
+    "live": (5, 30),
+    "not_started": (15, 2 * 60),
+    "postponed": (2 * 60, 24 * 60),
+    "not_found": (30, 12 * 60),  # evento ausente na API
+    "invalid": (30, 12 * 60),  # finalizado sem placar utilizável
+    "error": (5, 6 * 60),  # falha de rede / resposta inesperada
+}
+
+# actual_result das apostas de eventos anulados (result continua NULL)
+VOID_RESULT = "void"
+
+# Condição de "aposta pendente"; as consultas repetem o predicado do índice
+PENDING_SQL = "result IS NULL AND actual_result IS NOT 'void'"
+
+PENDING_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS idx_bets_pending
+ON bets(event_time) WHERE {PENDING_SQL}
+"""
+
+DUE_BETS_QUERY = """
+SELECT b.id, b.event_id, b.league_name, b.home_team, b.away_team,
+       b.event_time, b.bet_type, b.selection, b.handicap, b.odds
+FROM bets b
+LEFT JOIN settlement_attempts a ON a.event_id = b.event_id
+WHERE b.result IS NULL AND b.actual_result IS NOT 'void'
+  AND b.event_time <= ?
+  AND (a.event_id IS NULL OR a.next_check_at <= ?)
+ORDER BY b.event_time
+"""
+
+
+def _timestamp(moment):
+    return moment.isoformat(timespec="seconds")
+
+
+def init_settlement_queue(cursor):
+    """Índice parcial das pendentes e tabela de tentativas por evento.
+
+    Remove tentativas de eventos que não têm mais aposta pendente
+    (liquidados aqui ou por update_csv.py, ou anulados).
+    """
+    cursor.execute(PENDING_INDEX_SQL)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS settlement_attempts (
+        event_id INTEGER PRIMARY KEY,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_checked_at TIMESTAMP,
+        next_check_at TIMESTAMP NOT NULL,
+        last_status TEXT
+    )
+    """)
+    cursor.execute(f"""
+    DELETE FROM settlement_attempts
+    WHERE event_id NOT IN (SELECT event_id FROM bets WHERE {PENDING_SQL})
+    """)
+
+
+def classify_time_status(time_status):
+    """time_status da API -> "final" ou o status da fila"""
+    time_status = str(time_status)
+    if time_status == "3":
+        return "final"
+    return TIME_STATUS_CATEGORIES.get(time_status, "error")
+
+
+def retry_delay(status, attempts):
+    """Espera após a n-ésima consulta seguida no mesmo status"""
+    initial, maximum = RETRY_POLICY.get(status, RETRY_POLICY["error"])
+    minutes = initial * 2 ** max(attempts - 1, 0)
+    return timedelta(minutes=min(minutes, maximum))
+
+
+def due_pending_bets(cursor, now=None):
+    """Apostas pendentes cujo evento já terminou e cuja janela de nova
+    consulta chegou, em ordem de event_time"""
+    now = now or datetime.now()
+    cursor.execute(
+        DUE_BETS_QUERY,
+        (_timestamp(now - timedelta(minutes=SETTLEMENT_GRACE_MINUTES)), _timestamp(now)),
+    )
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def void_events(cursor, event_ids):
+    """Marca as apostas pendentes dos eventos anulados (actual_result = 'void',
+    result NULL) e tira os eventos da fila"""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    placeholders = ",".join("?" * len(event_ids))
+    cursor.execute(
+        f"""
+        UPDATE bets
+        SET actual_result = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE event_id IN ({placeholders}) AND result IS NULL
+        """,
+        [VOID_RESULT, *event_ids],
+    )
+    cursor.execute(
+        f"DELETE FROM settlement_attempts WHERE event_id IN ({placeholders})",
+        event_ids,
+    )
+
+
+def record_attempts(cursor, statuses, now=None):
+    """Registra as consultas sem resultado ({event_id: status}) e agenda a
+    próxima de cada evento; eventos anulados saem da fila (void_events)"""
+    now = now or datetime.now()
+    void_events(cursor, [e for e, status in statuses.items() if status == "void"])
+    statuses = {e: status for e, status in statuses.items() if status != "void"}
+    if not statuses:
+        return
+    event_ids = list(statuses)
+    placeholders = ",".join("?" * len(event_ids))
+    cursor.execute(
+        f"""
+        SELECT event_id, attempts, last_status FROM settlement_attempts
+        WHERE event_id IN ({placeholders})
+        """,
+        event_ids,
+    )
+    previous = {event_id: (attempts, status) for event_id, attempts, status in cursor.fetchall()}
+
+    rows = []
+    for event_id, status in statuses.items():
+        attempts, last_status = previous.get(event_id, (0, None))
+        attempts = attempts + 1 if status == last_status else 1
+        next_check = now + retry_delay(status, attempts)
+        rows.append(
+            (event_id, attempts, _timestamp(now), _timestamp(next_check), status)
+        )
+    cursor.executemany(
+        """
+        INSERT INTO settlement_attempts
+            (event_id, attempts, last_checked_at, next_check_at, last_status)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(event_id) DO UPDATE SET
+            attempts = excluded.attempts,
+            last_checked_at = excluded.last_checked_at,
+            next_check_at = excluded.next_check_at,
+            last_status = excluded.last_status
+        """,
+        rows,
+    )
@@ -0,0 +1,298 @@
+"""Definição declarativa da estratégia (config/strategy.json).
+
+As regras que antes estavam repetidas em send_telegram.py, strategy_stats.py,
+estrategia.py e db_get_bets.py ficam num único arquivo. Cada filtro é
+compilado uma vez em:
+  - um predicado SQL (filter.sql()) para selecionar apostas em bets.db;
+  - uma máscara booleana NumPy (filter.mask(df)) para análises em pandas.
+
+Formato de um filtro:
+
+    {
+      "all":  {campo: condição, ...},      todas precisam valer
+      "any":  [{campo: condição}, ...],    pelo menos uma regra (se houver)
+      "none": [{campo: condição}, ...]     nenhuma regra pode valer
+    }
+
+Os campos são colunas de bets, inclusive os sinais de forma gravados por
+db_get_bets.py (home_/away_form_streak, _form_win_rate de 0 a 1 e
+_form_avg_games), ex.: {"home_form_streak": {"gte": 2}}.
+
+Condição é um valor (igualdade) ou um dict com eq, in, gt, gte, lt, lte,
+prefix, contains, not_contains (os três últimos sem diferenciar maiúsculas,
+como LIKE no SQLite). Campos nulos nunca satisfazem uma condição, exceto
+not_contains. O arquivo pode ser YAML (.yaml/.yml) se o PyYAML estiver
+instalado; o caminho pode ser trocado com a variável STRATEGY_FILE.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_STRATEGY_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "config", "strategy.json"
+)
+
+OPERATORS = ("eq", "in", "gt", "gte", "lt", "lte", "prefix", "contains", "not_contains")
+_SQL_COMPARISONS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def sql_literal(value):
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"Valor não suportado na estratégia: {value!r}")
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise ValueError(f"Valor não suportado na estratégia: {value!r}")
+
+
+def _like_literal(text, prefix_only=False):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"{escaped}%" if prefix_only else f"%{escaped}%"
+    return f"{sql_literal(pattern)} ESCAPE '\\'"
+
+
+def _parse_rule(rule):
+    """{campo: condição} -> [(campo, operador, valor)]"""
+    conditions = []
+    for field, spec in rule.items():
+        if not _IDENTIFIER.match(field):
+            raise ValueError(f"Campo inválido na estratégia: {field!r}")
+        if not isinstance(spec, dict):
+            spec = {"eq": spec}
+        for op, value in spec.items():
+            if op not in OPERATORS:
+                raise ValueError(f"Operador desconhecido em {field}: {op!r}")
+            if op == "in":
+                value = list(value)
+                for item in value:
+                    sql_literal(item)
+            else:
+                sql_literal(value)
+            if op in ("prefix", "contains", "not_contains") and not isinstance(value, str):
+                raise ValueError(f"{op} em {field} precisa de texto")
+            conditions.append((field, op, value))
+    return conditions
+
+
+def _condition_sql(column, op, value):
+    if op in _SQL_COMPARISONS:
+        return f"{column} {_SQL_COMPARISONS[op]} {sql_literal(value)}"
+    if op == "in":
+        return f"{column} IN ({', '.join(sql_literal(v) for v in value)})"
+    # lower() dos dois lados: LIKE não diferencia maiúsculas no SQLite, mas
+    # diferencia no DuckDB (analytics.py)
+    if op == "prefix":
+        return f"lower({column}) LIKE {_like_literal(value.lower(), prefix_only=True)}"
+    if op == "contains":
+        return f"lower({column}) LIKE {_like_literal(value.lower())}"
+    return f"NOT COALESCE(lower({column}) LIKE {_like_literal(value.lower())}, 0)"
+
+
+def _condition_mask(frame, field, op, value):
+    import numpy as np
+    import pandas as pd
+
+    values = frame[field]
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values)
+
+    if op in ("prefix", "contains", "not_contains"):
+        text = values.astype(object)
+        if op == "prefix":
+            hit = text.str.lower().str.startswith(value.lower(), na=False)
+        else:
+            hit = text.str.contains(value, case=False, regex=False, na=False)
+        hit = hit.to_numpy(dtype=bool)
+        return ~hit if op == "not_contains" else hit
+
+    targets = value if op == "in" else [value]
+    if all(isinstance(v, str) for v in targets):
+        if op == "in":
+            return values.isin(targets).to_numpy(dtype=bool)
+        if op != "eq":
+            raise ValueError(f"{op} em {field} precisa de número")
+        return (values.astype(object) == value).to_numpy(dtype=bool)
+
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        if op == "in":
+            return np.isin(numbers, np.asarray(targets, dtype=float))
+        if op == "eq":
+            return numbers == value
+        if op == "gt":
+            return numbers > value
+        if op == "gte":
+            return numbers >= value
+        if op == "lt":
+            return numbers < value
+        return numbers <= value
+
+
+class StrategyFilter:
+    """Filtro compilado: predicado SQL (por alias de tabela) e máscara NumPy"""
+
+    def __init__(self, name, all_=None, any_=None, none=None, description=""):
+        self.name = name
+        self.description = description
+        self.all = _parse_rule(all_ or {})
+        self.any = [_parse_rule(rule) for rule in any_ or []]
+        self.none = [_parse_rule(rule) for rule in none or []]
+        self._sql = {}
+
+    @classmethod
+    def from_dict(cls, name, definition):
+        unknown = set(definition) - {"all", "any", "none", "description"}
+        if unknown:
+            raise ValueError(f"Chaves desconhecidas no filtro {name}: {sorted(unknown)}")
+        return cls(
+            name,
+            definition.get("all"),
+            definition.get("any"),
+            definition.get("none"),
+            definition.get("description", ""),
+        )
+
+    def narrow(self, name, all_):
+        """Novo filtro com as condições extras somadas a `all`"""
+        narrowed = StrategyFilter(name, description=self.description)
+        narrowed.all = self.all + _parse_rule(all_ or {})
+        narrowed.any = self.any
+        narrowed.none = self.none
+        return narrowed
+
+    def sql(self, alias=None):
+        """Predicado SQL para WHERE; alias prefixa as colunas (ex.: "b")"""
+        if alias not in self._sql:
+            self._sql[alias] = self._compile_sql(alias)
+        return self._sql[alias]
+
+    def _compile_sql(self, alias):
+        prefix = f"{alias}." if alias else ""
+
+        def rule_sql(conditions):
+            parts = [_condition_sql(prefix + f, op, v) for f, op, v in conditions]
+            return "(" + " AND ".join(parts or ["1 = 1"]) + ")"
+
+        parts = [rule_sql([c]) for c in self.all]
+        if self.any:
+            parts.append("(" + " OR ".join(rule_sql(r) for r in self.any) + ")")
+        if self.none:
+            # COALESCE: uma regra com campo nulo não exclui (como no pandas)
+            excluded = " OR ".join(rule_sql(r) for r in self.none)
+            parts.append(f"NOT COALESCE(({excluded}), 0)")
+        return " AND ".join(parts) if parts else "1 = 1"
+
+    def mask(self, frame):
+        """Máscara booleana (np.ndarray) das linhas de um DataFrame que passam"""
+        import numpy as np
+
+        n = len(frame)
+        cache = {}
+
+        def condition(c):
+            key = (c[0], c[1], json.dumps(c[2]))
+            if key not in cache:
+                cache[key] = _condition_mask(frame, *c)
+            return cache[key]
+
+        def rule_mask(conditions):
+            result = np.ones(n, dtype=bool)
+            for c in conditions:
+                result &= condition(c)
+            return result
+
+        result = rule_mask(self.all)
+        if self.any:
+            matched = np.zeros(n, dtype=bool)
+            for rule in self.any:
+                matched |= rule_mask(rule)
+            result &= matched
+        for rule in self.none:
+            result &= ~rule_mask(rule)
+        return result
+
+    def columns(self):
+        """Campos usados pelo filtro, na ordem em que aparecem"""
+        fields = []
+        for rule in [self.all, *self.any, *self.none]:
+            for field, _, _ in rule:
+                if field not in fields:
+                    fields.append(field)
+        return fields
+
+    def index_columns(self):
+        """Colunas com igualdade em todas as regras de `any` (para o índice)"""
+        if not self.any:
+            return []
+        columns = [f for f, op, _ in self.any[0] if op == "eq"]
+        for rule in self.any[1:]:
+            equal = {f for f, op, _ in rule if op == "eq"}
+            columns = [c for c in columns if c in equal]
+        return columns
+
+    def ensure_index(self, cursor, table="bets"):
+        """Cria o índice que atende o OR das regras (idx_<tabela>_<filtro>)"""
+        columns = self.index_columns()
+        if columns and _IDENTIFIER.match(self.name):
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_{self.name} "
+                f"ON {table}({', '.join(columns)})"
+            )
+
+
+class Strategy:
+    """Estratégia carregada: filtros nomeados, segmentos do resumo e blacklist O/U"""
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.ou_league_blacklist = list(definition.get("ou_league_blacklist", []))
+        self.filters = {
+            name: StrategyFilter.from_dict(name, spec)
+            for name, spec in definition.get("filters", {}).items()
+        }
+
+        summary = definition.get("summary", {})
+        self.summary_filter = self.filter(summary["filter"]) if summary else None
+        # Segmento -> (rótulo, filtro do resumo + condições do segmento)
+        self.segments = {}
+        for segment in summary.get("segments", []):
+            key = segment["key"]
+            self.segments[key] = (
+                segment.get("label", key),
+                self.summary_filter.narrow(key, segment.get("all")),
+            )
+
+    def filter(self, name):
+        try:
+            return self.filters[name]
+        except KeyError:
+            raise ValueError(f"Filtro '{name}' não definido na estratégia") from None
+
+
+def read_strategy_file(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("PyYAML é necessário para estratégias em YAML")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def _load_strategy(path):
+    return Strategy(read_strategy_file(path))
+
+
+def load_strategy(path=None):
+    """Estratégia de STRATEGY_FILE (ou config/strategy.json), compilada uma vez"""
+    path = path or os.getenv("STRATEGY_FILE") or DEFAULT_STRATEGY_FILE
+    return _load_strategy(os.path.abspath(path))
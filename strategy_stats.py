@@ -0,0 +1,174 @@
+"""Resumo de lucro por segmento da estratégia, materializado em bets.db.
+
+strategy_stats guarda, para cada segmento do resumo enviado ao Telegram,
+apostas, vitórias, derrotas e lucro das apostas liquidadas que passam no
+filtro da estratégia (segmentos em config/strategy.json). A liquidação
+(db_get_bets_results.py, update_csv.py) grava os resultados com
+settle_bets(), que na mesma transação desconta a contribuição anterior de
+cada aposta (se já estava liquidada) e soma a nova; o resumo vira a leitura
+de poucas linhas. Se o filtro ou os segmentos mudarem (assinatura
+diferente), a tabela é recalculada a partir de bets.
+
+Resultados gravados por fora de settle_bets() (SQL manual, dados
+sintéticos) pedem um recálculo:
+
+    python strategy_stats.py --rebuild
+"""
+
+import argparse
+import logging
+import sqlite3
+import zlib
+
+from strategy import load_strategy
+
+logger = logging.getLogger("strategy_stats")
+
+# Segmento -> predicado completo sobre bets (filtro do resumo + segmento)
+SEGMENTS = {
+    segment: segment_filter.sql()
+    for segment, (_, segment_filter) in load_strategy().segments.items()
+}
+
+
+def segments_signature():
+    text = "".join(f"{k}:{v};" for k, v in SEGMENTS.items())
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def init_strategy_stats(cursor):
+    """Cria as tabelas e recalcula tudo se os segmentos mudaram (ou na primeira vez)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS strategy_stats (
+        segment TEXT PRIMARY KEY,
+        bets INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        profit REAL NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS strategy_stats_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER
+    )
+    """)
+    cursor.execute("SELECT value FROM strategy_stats_state WHERE key = 'signature'")
+    row = cursor.fetchone()
+    signature = segments_signature()
+    if row is None or row[0] != signature:
+        rebuild_strategy_stats(cursor)
+        cursor.execute(
+            """
+            INSERT INTO strategy_stats_state (key, value) VALUES ('signature', ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """,
+            (signature,),
+        )
+
+
+def rebuild_strategy_stats(cursor):
+    """Recalcula todos os segmentos a partir das apostas liquidadas"""
+    cursor.execute("DELETE FROM strategy_stats")
+    for segment, predicate in SEGMENTS.items():
+        cursor.execute(
+            f"""
+            INSERT INTO strategy_stats (segment, bets, wins, losses, profit)
+            SELECT ?, COUNT(*), COALESCE(SUM(result = 1), 0),
+                COALESCE(SUM(result = 0), 0), COALESCE(SUM(profit), 0)
+            FROM bets
+            WHERE result IS NOT NULL AND {predicate}
+            """,
+            (segment,),
+        )
+    logger.info(f"📊 strategy_stats recalculada ({len(SEGMENTS)} segmentos)")
+
+
+def _apply_bets(cursor, bet_ids, sign):
+    """Soma (sign=1) ou desconta (sign=-1) as apostas liquidadas dos segmentos"""
+    for segment, predicate in SEGMENTS.items():
+        cursor.executemany(
+            f"""
+            INSERT INTO strategy_stats (segment, bets, wins, losses, profit)
+            SELECT ?, ?, ? * (result = 1), ? * (result = 0), ? * COALESCE(profit, 0)
+            FROM bets
+            WHERE id = ? AND result IS NOT NULL AND {predicate}
+            ON CONFLICT(segment) DO UPDATE SET
+                bets = bets + excluded.bets,
+                wins = wins + excluded.wins,
+                losses = losses + excluded.losses,
+                profit = profit + excluded.profit,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            [(segment, sign, sign, sign, sign, bet_id) for bet_id in bet_ids],
+        )
+
+
+def settle_bets(cursor, settlements):
+    """Grava resultados e atualiza strategy_stats na transação de quem chama.
+
+    settlements: [(result, profit, actual_result, bet_id)]. Retorna o número
+    de apostas atualizadas.
+    """
+    init_strategy_stats(cursor)
+    # Uma aposta repetida no lote vale pela última liquidação
+    settlements = list({s[3]: s for s in settlements}.values())
+    bet_ids = [s[3] for s in settlements]
+
+    _apply_bets(cursor, bet_ids, -1)
+    cursor.executemany(
+        """
+        UPDATE bets
+        SET result = ?, profit = ?, actual_result = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        settlements,
+    )
+    updated = cursor.rowcount
+    _apply_bets(cursor, bet_ids, 1)
+    return updated
+
+
+def load_strategy_stats(cursor):
+    """{segmento: {"bets", "wins", "losses", "profit"}} para todos os segmentos"""
+    cursor.execute("SELECT segment, bets, wins, losses, profit FROM strategy_stats")
+    stats = {
+        segment: {"bets": 0, "wins": 0, "losses": 0, "profit": 0.0}
+        for segment in SEGMENTS
+    }
+    for segment, bets, wins, losses, profit in cursor.fetchall():
+        if segment in stats:
+            stats[segment] = {
+                "bets": bets,
+                "wins": wins,
+                "losses": losses,
+                "profit": profit,
+            }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo materializado da estratégia")
+    parser.add_argument("--bets-db", default="bets.db")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Recalcula a partir de bets"
+    )
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.bets_db)
+    cursor = conn.cursor()
+    init_strategy_stats(cursor)
+    if args.rebuild:
+        rebuild_strategy_stats(cursor)
+    conn.commit()
+    for segment, stats in load_strategy_stats(cursor).items():
+        print(
+            f"{segment:10} {stats['bets']:5d} apostas | {stats['wins']}W-{stats['losses']}L"
+            f" | {stats['profit']:+.2f}u"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
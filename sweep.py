@@ -0,0 +1,293 @@
+"""Varredura de limiares da estratégia Over/Under (grade de parâmetros).
+
+A grade (DEFAULT_GRID ou um JSON) combina lookback, limiar de ELO e um ROI
+mínimo por segmento liga|handicap. As apostas vêm do backtest (backtest.py)
+ou de bets.db já liquidadas; para cada segmento ficam arrays ordenados por
+ROI com somas acumuladas, então cada célula da grade é avaliada com buscas
+binárias, sem reler os dados. As células são divididas em blocos entre
+processos e o resultado é uma tabela ordenada por ROI.
+
+    python sweep.py --source bets --min-volume 30 --output sweep.csv
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("sweep")
+
+# Grade padrão: mesma combinação testada manualmente em test.py
+DEFAULT_GRID = {
+    "selection": "Under",
+    "lookback": [20],
+    "elo_diff_threshold": [100],
+    "roi_floor": {
+        "Setka Cup|76.5": [0, 15, 20, 25, 30],
+        "Czech Liga Pro|76.5": [0, 10, 15, 20, 25],
+        "Czech Liga Pro|78.5": [0, 10, 20],
+    },
+}
+
+_WORKER_INDEX = None
+
+
+def parse_segment(key):
+    """'Setka Cup|76.5' -> ('Setka Cup', 76.5)"""
+    league, handicap = key.rsplit("|", 1)
+    return league, float(handicap)
+
+
+def segment_arrays(roi, profit, won):
+    """Arrays ordenados por ROI com somas acumuladas de lucro e vitórias"""
+    order = np.argsort(roi, kind="stable")
+    return (
+        roi[order],
+        np.concatenate([[0.0], np.cumsum(profit[order])]),
+        np.concatenate([[0], np.cumsum(won[order])]),
+    )
+
+
+def segment_totals(arrays, floor):
+    """(volume, lucro, vitórias) das apostas com ROI >= floor, em O(log n)"""
+    roi_sorted, cum_profit, cum_wins = arrays
+    idx = np.searchsorted(roi_sorted, floor, side="left")
+    return (
+        len(roi_sorted) - idx,
+        cum_profit[-1] - cum_profit[idx],
+        cum_wins[-1] - cum_wins[idx],
+    )
+
+
+class SweepIndex:
+    """Índice pré-calculado para avaliar células da grade sem reler os dados.
+
+    arrays[(lookback, elo_threshold, segmento, balanced)] guarda os arrays de
+    segment_arrays; min_roi[balanced] é o ROI mínimo da própria estratégia
+    (None quando a fonte são apostas já registradas).
+    """
+
+    def __init__(self, segments, arrays, min_roi):
+        self.segments = segments
+        self.arrays = arrays
+        self.min_roi = min_roi
+
+    @classmethod
+    def from_backtest(cls, engine, grid):
+        from backtest import DEFAULT_PARAMS
+
+        side = grid.get("selection", "Under")
+        segments = [parse_segment(key) for key in grid["roi_floor"]]
+        if side == "Over":
+            min_roi = {
+                True: DEFAULT_PARAMS["min_roi_balanced_over"],
+                False: DEFAULT_PARAMS["min_roi_unbalanced_over"],
+            }
+        else:
+            min_roi = {
+                True: DEFAULT_PARAMS["min_roi_balanced_under"],
+                False: DEFAULT_PARAMS["min_roi_unbalanced_under"],
+            }
+
+        arrays = {}
+        for lookback in grid["lookback"]:
+            c = engine.build_candidates(lookback)
+            base = (
+                c[f"is_{side.lower()}"].to_numpy()
+                & (c["home_games_count"].to_numpy() > 0)
+                & (c["away_games_count"].to_numpy() > 0)
+                & ~c["league_name"].isin(DEFAULT_PARAMS["blacklist"]).to_numpy()
+                & c["result"].notna().to_numpy()
+            )
+            ml_ok = (c["ml_odds_home"].to_numpy() > DEFAULT_PARAMS["ml_balanced_min_odds"]) & (
+                c["ml_odds_away"].to_numpy() > DEFAULT_PARAMS["ml_balanced_min_odds"]
+            )
+            roi = c["estimated_roi"].to_numpy(dtype=np.float64)
+            profit = c["profit"].to_numpy(dtype=np.float64)
+            won = c["result"].to_numpy(dtype=np.float64)
+            league = c["league_name"].to_numpy(dtype=object)
+            handicap = c["handicap"].to_numpy(dtype=np.float64)
+            elo_diff = c["elo_diff"].to_numpy()
+
+            segment_masks = {
+                seg: base & (league == seg[0]) & (handicap == seg[1]) for seg in segments
+            }
+            for elo_threshold in grid["elo_diff_threshold"]:
+                balanced = (elo_diff < elo_threshold) & ml_ok
+                for seg, seg_mask in segment_masks.items():
+                    for flag in (True, False):
+                        mask = seg_mask & (balanced == flag)
+                        arrays[(lookback, elo_threshold, seg, flag)] = segment_arrays(
+                            roi[mask], profit[mask], won[mask]
+                        )
+        return cls(segments, arrays, min_roi)
+
+    @classmethod
+    def from_bets(cls, bets, grid):
+        """Índice sobre apostas já liquidadas (DataFrame no formato da tabela bets)"""
+        side = grid.get("selection", "Under")
+        segments = [parse_segment(key) for key in grid["roi_floor"]]
+        settled = bets[
+            bets["result"].notna()
+            & bets["selection"].str.contains(side, na=False)
+        ]
+        arrays = {}
+        for seg in segments:
+            rows = settled[
+                (settled["league_name"] == seg[0]) & (settled["handicap"] == seg[1])
+            ]
+            arrays[(None, None, seg, None)] = segment_arrays(
+                rows["estimated_roi"].to_numpy(dtype=np.float64),
+                rows["profit"].to_numpy(dtype=np.float64),
+                rows["result"].to_numpy(dtype=np.float64),
+            )
+        return cls(segments, arrays, None)
+
+    def evaluate(self, cell):
+        """cell = (lookback, elo_threshold, floors alinhados com self.segments)"""
+        lookback, elo_threshold, floors = cell
+        volume = 0
+        profit = 0.0
+        wins = 0.0
+        for seg, floor in zip(self.segments, floors):
+            if self.min_roi is None:
+                parts = [(None, floor)]
+            else:
+                parts = [(flag, max(floor, self.min_roi[flag])) for flag in (True, False)]
+            for flag, effective_floor in parts:
+                n, p, w = segment_totals(
+                    self.arrays[(lookback, elo_threshold, seg, flag)], effective_floor
+                )
+                volume += n
+                profit += p
+                wins += w
+        return volume, profit, wins
+
+
+def _init_worker(index):
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+
+
+def _evaluate_chunk(cells):
+    return [(cell, *_WORKER_INDEX.evaluate(cell)) for cell in cells]
+
+
+def iter_cells(grid, index):
+    floor_options = [grid["roi_floor"][key] for key in grid["roi_floor"]]
+    lookbacks = grid.get("lookback", [None]) if index.min_roi is not None else [None]
+    elos = grid.get("elo_diff_threshold", [None]) if index.min_roi is not None else [None]
+    for lookback, elo in itertools.product(lookbacks, elos):
+        for floors in itertools.product(*floor_options):
+            yield (lookback, elo, floors)
+
+
+def run_sweep(index, grid, workers=None, chunk_size=512, min_volume=0):
+    """Avalia todas as células da grade em paralelo e devolve a tabela ordenada por ROI"""
+    cells = list(iter_cells(grid, index))
+    chunks = [cells[i : i + chunk_size] for i in range(0, len(cells), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    rows = []
+    if workers == 1 or len(chunks) == 1:
+        _init_worker(index)
+        for chunk in chunks:
+            rows.extend(_evaluate_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(index,)
+        ) as executor:
+            for result in executor.map(_evaluate_chunk, chunks):
+                rows.extend(result)
+
+    segment_names = list(grid["roi_floor"])
+    records = []
+    for (lookback, elo, floors), volume, profit, wins in rows:
+        if volume < max(min_volume, 1):
+            continue
+        record = {"lookback": lookback, "elo_diff_threshold": elo}
+        for name, floor in zip(segment_names, floors):
+            record[f"roi_floor[{name}]"] = floor
+        record.update(
+            {
+                "volume": int(volume),
+                "win_rate": wins / volume * 100,
+                "profit": round(profit, 2),
+                "roi": profit / volume * 100,
+            }
+        )
+        records.append(record)
+
+    logger.info(f"Grade avaliada: {len(cells)} células, {len(records)} com volume suficiente")
+    table = pd.DataFrame(records)
+    if table.empty:
+        return table
+    return table.sort_values(["roi", "volume"], ascending=[False, False]).reset_index(
+        drop=True
+    )
+
+
+def load_bets(bets_db_path="bets.db"):
+    conn = sqlite3.connect(bets_db_path)
+    bets = pd.read_sql_query(
+        """SELECT league_name, selection, handicap, estimated_roi, result, profit
+        FROM bets WHERE result IS NOT NULL""",
+        conn,
+    )
+    conn.close()
+    return bets
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(
+        description="Varredura paralela de limiares da estratégia O/U"
+    )
+    parser.add_argument("--grid", help="Arquivo JSON com a grade (padrão: DEFAULT_GRID)")
+    parser.add_argument(
+        "--source",
+        choices=["backtest", "bets"],
+        default="backtest",
+        help="backtest: reaplica a estratégia no histórico; bets: apostas já registradas",
+    )
+    parser.add_argument("--tm-db", default="tm_data.db")
+    parser.add_argument("--results-db", default="table_tennis_results.db")
+    parser.add_argument("--bets-db", default="bets.db")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-volume", type=int, default=50)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="CSV com a tabela completa")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    if args.source == "bets":
+        index = SweepIndex.from_bets(load_bets(args.bets_db), grid)
+    else:
+        from backtest import BacktestEngine
+
+        engine = BacktestEngine(args.tm_db, args.results_db).load()
+        index = SweepIndex.from_backtest(engine, grid)
+
+    table = run_sweep(index, grid, workers=args.workers, min_volume=args.min_volume)
+    if table.empty:
+        print("Nenhuma combinação com volume suficiente")
+        return
+    print(table.head(args.top).to_string(index=False))
+    if args.output:
+        table.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
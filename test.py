@@ -1,38 +1,39 @@
-import sqlite3
-
 import pandas as pd
 
-conn = sqlite3.connect("bets.db")
-df = pd.read_sql_query("SELECT * FROM bets", conn)
-conn.close()
-
-# Filtrar apenas apostas com selection contendo "Under"
-df = df[df["selection"].str.contains("Under", na=False)]
-
-# Excluir liga "TT Cup"
-df = df[~df["league_name"].str.contains("TT Cup", na=False)]
+from analytics import BetAnalytics, summarize
 
-# Filtrar para as ligas Czech Liga Pro e Setka Cup
-df = df[df["league_name"].isin(["Czech Liga Pro", "Setka Cup"])]
+# Apostas Under nas ligas Czech Liga Pro e Setka Cup (sem TT Cup),
+# excluindo handicap <= 75.5
+BASE = (
+    "instr(b.selection, 'Under') > 0"
+    " AND b.league_name IN ('Czech Liga Pro', 'Setka Cup')"
+    " AND b.handicap > 75.5"
+)
 
-# Excluir jogos com handicap menor ou igual a 75.5
-df = df[df["handicap"] > 75.5]
+# Duas consultas agrupadas por liga e handicap: df sem filtro de ROI e
+# df_roi_min acumulado por ROI mínimo (roi_min); as análises abaixo só
+# somam essas linhas
+analytics = BetAnalytics()
+df = analytics.report(by=("league_name", "handicap"), where=BASE)
+df_roi_min = analytics.threshold_report(
+    by=("league_name", "handicap"),
+    thresholds=[0, 10, 15, 20, 25, 30, 40, 50],
+    where=BASE,
+)
+analytics.close()
 
 
-def analisar(df_filtrado, nome):
-    if len(df_filtrado) == 0:
+def analisar(linhas, nome):
+    r = summarize(linhas)
+    if r is None:
         return None
 
-    win_rate = (df_filtrado["result"] == 1).sum() / len(df_filtrado) * 100
-    lucro = df_filtrado["profit"].sum()
-    roi = (lucro / len(df_filtrado)) * 100
-
     return {
         "filtro": nome,
-        "volume": len(df_filtrado),
-        "win_rate": win_rate,
-        "lucro": lucro,
-        "roi": roi,
+        "volume": r["volume"],
+        "win_rate": r["win_rate"],
+        "lucro": r["profit"],
+        "roi": r["roi"],
     }
 
 
@@ -116,10 +117,10 @@ print("=" * 130)
 print("ANÁLISE COM FILTROS DE ROI - SETKA CUP H == 76.5")
 print("=" * 130)
 for roi_min in [0, 10, 20, 30, 40, 50]:
-    df_filtrado = df[
-        (df["league_name"] == "Setka Cup")
-        & (df["handicap"] == 76.5)
-        & (df["estimated_roi"] >= roi_min)
+    df_filtrado = df_roi_min[
+        (df_roi_min["league_name"] == "Setka Cup")
+        & (df_roi_min["handicap"] == 76.5)
+        & (df_roi_min["roi_min"] == roi_min)
     ]
     r = analisar(df_filtrado, f"Setka H76.5 ROI>={roi_min}%")
     if r:
@@ -132,10 +133,10 @@ print("=" * 130)
 print("ANÁLISE COM FILTROS DE ROI - CZECH LIGA PRO H == 76.5")
 print("=" * 130)
 for roi_min in [0, 10, 20, 30, 40, 50]:
-    df_filtrado = df[
-        (df["league_name"] == "Czech Liga Pro")
-        & (df["handicap"] == 76.5)
-        & (df["estimated_roi"] >= roi_min)
+    df_filtrado = df_roi_min[
+        (df_roi_min["league_name"] == "Czech Liga Pro")
+        & (df_roi_min["handicap"] == 76.5)
+        & (df_roi_min["roi_min"] == roi_min)
     ]
     r = analisar(df_filtrado, f"Czech H76.5 ROI>={roi_min}%")
     if r:
@@ -148,10 +149,10 @@ print("=" * 130)
 print("ANÁLISE COM FILTROS DE ROI - CZECH LIGA PRO H == 78.5")
 print("=" * 130)
 for roi_min in [0, 10, 20, 30, 40, 50]:
-    df_filtrado = df[
-        (df["league_name"] == "Czech Liga Pro")
-        & (df["handicap"] == 78.5)
-        & (df["estimated_roi"] >= roi_min)
+    df_filtrado = df_roi_min[
+        (df_roi_min["league_name"] == "Czech Liga Pro")
+        & (df_roi_min["handicap"] == 78.5)
+        & (df_roi_min["roi_min"] == roi_min)
     ]
     r = analisar(df_filtrado, f"Czech H78.5 ROI>={roi_min}%")
     if r:
@@ -176,20 +177,20 @@ for setka_roi in [0, 15, 20, 25, 30]:
         for czech_78_roi in [0, 10, 20]:
             df_estrategia_otimizada = pd.concat(
                 [
-                    df[
-                        (df["league_name"] == "Setka Cup")
-                        & (df["handicap"] == 76.5)
-                        & (df["estimated_roi"] >= setka_roi)
+                    df_roi_min[
+                        (df_roi_min["league_name"] == "Setka Cup")
+                        & (df_roi_min["handicap"] == 76.5)
+                        & (df_roi_min["roi_min"] == setka_roi)
                     ],
-                    df[
-                        (df["league_name"] == "Czech Liga Pro")
-                        & (df["handicap"] == 76.5)
-                        & (df["estimated_roi"] >= czech_76_roi)
+                    df_roi_min[
+                        (df_roi_min["league_name"] == "Czech Liga Pro")
+                        & (df_roi_min["handicap"] == 76.5)
+                        & (df_roi_min["roi_min"] == czech_76_roi)
                     ],
-                    df[
-                        (df["league_name"] == "Czech Liga Pro")
-                        & (df["handicap"] == 78.5)
-                        & (df["estimated_roi"] >= czech_78_roi)
+                    df_roi_min[
+                        (df_roi_min["league_name"] == "Czech Liga Pro")
+                        & (df_roi_min["handicap"] == 78.5)
+                        & (df_roi_min["roi_min"] == czech_78_roi)
                     ],
                 ]
             )
@@ -0,0 +1,59 @@
+"""Probabilidade empírica de over/under a partir dos totais recentes de games.
+
+Os totais de cada jogador ficam num array NumPy ordenado, então P(total > x)
+para qualquer linha x é uma busca binária, e várias linhas de um mesmo evento
+são avaliadas numa única chamada vetorizada.
+"""
+
+import numpy as np
+
+
+class TotalsDistribution:
+    """Distribuição empírica dos totais de games das partidas recentes"""
+
+    __slots__ = ("totals",)
+
+    def __init__(self, games):
+        self.totals = np.sort(np.asarray(games, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.totals)
+
+    def prob_over(self, lines):
+        """Fração das partidas com total > linha (aceita escalar ou array)"""
+        n = len(self.totals)
+        lines = np.asarray(lines, dtype=np.float64)
+        if n == 0:
+            return np.zeros(lines.shape)
+        return (n - np.searchsorted(self.totals, lines, side="right")) / n
+
+    def prob_under(self, lines):
+        """Fração das partidas com total < linha (aceita escalar ou array)"""
+        n = len(self.totals)
+        lines = np.asarray(lines, dtype=np.float64)
+        if n == 0:
+            return np.zeros(lines.shape)
+        return np.searchsorted(self.totals, lines, side="left") / n
+
+
+def line_probs(dist, lines, is_over):
+    """Probabilidade de cada seleção (Over/Under alinhado com lines) para uma distribuição"""
+    lines = np.asarray(lines, dtype=np.float64)
+    return np.where(
+        np.asarray(is_over, dtype=bool), dist.prob_over(lines), dist.prob_under(lines)
+    )
+
+
+def score_total_lines(home_dist, away_dist, lines, is_over):
+    """Probabilidade estimada (média dos dois jogadores) para cada linha.
+
+    lines e is_over são arrays alinhados: uma posição por seleção Over/Under.
+    """
+    return (line_probs(home_dist, lines, is_over) + line_probs(away_dist, lines, is_over)) / 2
+
+
+def as_distribution(games):
+    """Aceita uma lista de totais ou uma TotalsDistribution já pronta"""
+    if isinstance(games, TotalsDistribution):
+        return games
+    return TotalsDistribution(games)
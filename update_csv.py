@@ -1,12 +1,32 @@
+"""Liquidação em massa de um CSV de apostas (ex.: export de bets.db).
+
+O CSV é lido em blocos (--chunk-size linhas): para cada bloco, os eventos
+pendentes são consultados em lotes de 10 ids por requisição, com até
+--workers requisições simultâneas sob um limite global de
+--requests-per-minute. Os resultados são aplicados por merge em `id` e cada
+bloco é gravado num arquivo temporário que substitui o CSV no fim
+(os.replace), com o original preservado em *_backup.csv.
+
+    python update_csv.py apostas.csv --db-path bets.db --workers 3
+"""
+
+import argparse
 import pandas as pd
-import requests
+import numpy as np
 import sqlite3
 import os
+import shutil
+import tempfile
+import threading
 import time
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+
+from http_fixtures import create_requests_session
+from settlement_scheduler import VOID_RESULT
+from strategy_stats import settle_bets
 
 load_dotenv()
 
@@ -15,34 +35,78 @@ logging.basicConfig(
 )
 logger = logging.getLogger("bulk_results")
 
+API_BATCH_SIZE = 10  # máximo de event_ids por requisição em bet365/result
+REQUESTS_PER_MINUTE = 50
+DEFAULT_WORKERS = 3
+DEFAULT_CHUNK_SIZE = 5000
+
+# Tipos fixos: cada bloco é lido separadamente e precisa sair igual no CSV
+CSV_DTYPES = {
+    "handicap": "float64",
+    "result": "float64",
+    "profit": "float64",
+    "actual_result": "object",
+    "updated_at": "object",
+}
+UPDATE_COLUMNS = ["result", "profit", "actual_result", "updated_at"]
+
+
+class RateLimiter:
+    """Espaça as requisições de todas as threads em 60/per_minute segundos.
+
+    A vaga é reservada sob o lock e a espera acontece fora dele, então
+    várias requisições podem estar em andamento ao mesmo tempo.
+    """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            slot = max(self.next_slot, time.monotonic())
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
 
 class BulkResultsProcessor:
-    def __init__(self, csv_path, db_path="bets.db"):
+    def __init__(
+        self,
+        csv_path,
+        db_path="bets.db",
+        workers=DEFAULT_WORKERS,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        requests_per_minute=REQUESTS_PER_MINUTE,
+    ):
         self.csv_path = csv_path
         self.db_path = db_path
+        self.workers = workers
+        self.chunk_size = chunk_size
         self.api_key = os.getenv("BETSAPI_API_KEY")
         self.request_count = 0
         self.start_time = time.time()
+        self.session = create_requests_session()
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self._count_lock = threading.Lock()
 
         if not self.api_key:
             raise ValueError("BETSAPI_API_KEY não encontrada!")
 
-    def load_pending_bets(self):
-        """Carrega apostas sem resultado do CSV"""
-        df = pd.read_csv(self.csv_path)
-
-        # Filtrar apenas apostas sem resultado
-        pending = df[df["result"].isna() | (df["result"] == "")]
-
-        logger.info(f"Total de apostas no CSV: {len(df)}")
-        logger.info(f"Apostas pendentes: {len(pending)}")
-
-        return pending
+    def iter_chunks(self):
+        """Blocos do CSV com a máscara das apostas sem resultado (exceto as
+        de eventos anulados, actual_result = 'void')"""
+        for chunk in pd.read_csv(
+            self.csv_path, chunksize=self.chunk_size, dtype=CSV_DTYPES
+        ):
+            yield chunk, chunk["result"].isna() & (chunk["actual_result"] != VOID_RESULT)
 
     def get_results_batch(self, event_ids):
         """Busca resultados para um lote de event_ids (máximo 10)"""
-        if len(event_ids) > 10:
-            event_ids = event_ids[:10]
+        if len(event_ids) > API_BATCH_SIZE:
+            event_ids = event_ids[:API_BATCH_SIZE]
 
         event_ids_str = ",".join([str(eid) for eid in event_ids])
 
@@ -50,18 +114,17 @@ class BulkResultsProcessor:
         params = {"token": self.api_key, "event_id": event_ids_str}
 
         try:
-            # Rate limiting: máximo 50 req/min
-            time.sleep(1.2)  # 50 req/min = 1 req por 1.2s
+            self.rate_limiter.wait()
 
-            response = requests.get(url, params=params, timeout=10)
-            self.request_count += 1
+            response = self.session.get(url, params=params, timeout=10)
+            with self._count_lock:
+                self.request_count += 1
+                count = self.request_count
 
-            if self.request_count % 10 == 0:
+            if count % 10 == 0:
                 elapsed = time.time() - self.start_time
-                rate = self.request_count / elapsed * 60
-                logger.info(
-                    f"Progresso: {self.request_count} requests - {rate:.1f} req/min"
-                )
+                rate = count / elapsed * 60
+                logger.info(f"Progresso: {count} requests - {rate:.1f} req/min")
 
             if response.status_code == 200:
                 data = response.json()
@@ -79,6 +142,21 @@ class BulkResultsProcessor:
             logger.error(f"Erro ao buscar lote {event_ids_str}: {e}")
             return []
 
+    def fetch_results(self, event_ids):
+        """Resultados finalizados dos eventos, em lotes concorrentes"""
+        batches = [
+            event_ids[i : i + API_BATCH_SIZE]
+            for i in range(0, len(event_ids), API_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            batch_results = list(executor.map(self.get_results_batch, batches))
+        return [
+            result
+            for results in batch_results
+            for result in results
+            if str(result.get("time_status")) == "3"  # Finalizado
+        ]
+
     def calculate_total_games(self, scores):
         """Calcula total de games a partir dos scores"""
         if not scores:
@@ -95,203 +173,203 @@ class BulkResultsProcessor:
 
         return total_games
 
-    def check_bet_result(self, bet, api_result):
-        """Verifica resultado da aposta usando dados da API"""
-        ss_score = api_result.get("ss")
-        if not ss_score or "-" not in ss_score:
-            return None, None, None
-
-        try:
-            home_sets, away_sets = map(int, ss_score.split("-"))
-        except ValueError:
-            return None, None, None
-
-        bet_type = bet["bet_type"]
-        selection = bet["selection"]
-        odds = bet["odds"]
-
-        if bet_type == "To Win":
-            if selection == "Home":
-                won = home_sets > away_sets
-                actual_result = bet["home_team"] if won else bet["away_team"]
-            elif selection == "Away":
-                won = away_sets > home_sets
-                actual_result = bet["away_team"] if won else bet["home_team"]
-            else:
-                return None, None, None
-
-            result = 1 if won else 0
-            profit = (odds - 1) if won else -1
-            return result, profit, actual_result
-
-        elif bet_type == "Total":
+    def results_frame(self, api_results):
+        """event_id, sets de cada lado e total de games (NaN sem scores) por
+        evento com placar válido"""
+        rows = []
+        for api_result in api_results:
+            ss_score = api_result.get("ss")
+            if not ss_score or "-" not in ss_score:
+                continue
+            try:
+                event_id = int(api_result.get("id"))
+                home_sets, away_sets = map(int, ss_score.split("-"))
+            except (TypeError, ValueError):
+                continue
             total_games = self.calculate_total_games(api_result.get("scores", {}))
-            if total_games is None:
-                return None, None, None
-
-            handicap = bet["handicap"]
+            rows.append(
+                (
+                    event_id,
+                    home_sets,
+                    away_sets,
+                    np.nan if total_games is None else total_games,
+                )
+            )
+        frame = pd.DataFrame(
+            rows, columns=["event_id", "home_sets", "away_sets", "total_games"]
+        )
+        return frame.drop_duplicates("event_id", keep="last")
+
+    def settle_bets_frame(self, pending, results):
+        """Liquida de forma vetorizada as apostas pendentes cujos eventos têm
+        resultado: DataFrame com id e UPDATE_COLUMNS (mesmas regras de
+        db_get_bets_results.check_bet_result_from_api)"""
+        bets = pending.merge(results, on="event_id", how="inner")
+        bet_type = bets["bet_type"].to_numpy()
+        selection = bets["selection"].astype(str)
+        home_sets = bets["home_sets"].to_numpy()
+        away_sets = bets["away_sets"].to_numpy()
+        total_games = bets["total_games"].to_numpy(dtype=float)
+        handicap = bets["handicap"].to_numpy(dtype=float)
+
+        home_pick = (bet_type == "To Win") & (selection == "Home").to_numpy()
+        away_pick = (bet_type == "To Win") & (selection == "Away").to_numpy()
+        is_total = (bet_type == "Total") & ~np.isnan(total_games)
+        over_pick = is_total & selection.str.contains("Over", regex=False).to_numpy()
+        under_pick = (
+            is_total
+            & ~over_pick
+            & selection.str.contains("Under", regex=False).to_numpy()
+        )
+        settled = home_pick | away_pick | over_pick | under_pick
+
+        with np.errstate(invalid="ignore"):
+            won = np.select(
+                [home_pick, away_pick, over_pick, under_pick],
+                [
+                    home_sets > away_sets,
+                    away_sets > home_sets,
+                    total_games > handicap,
+                    total_games < handicap,
+                ],
+                default=False,
+            )
 
-            if "Over" in selection:
-                won = total_games > handicap
-            elif "Under" in selection:
-                won = total_games < handicap
+        # To Win: o lado escolhido se ganhou, senão o outro; Total: "N games"
+        picked = np.where(home_pick, bets["home_team"], bets["away_team"])
+        other = np.where(home_pick, bets["away_team"], bets["home_team"])
+        games = np.nan_to_num(total_games).astype(np.int64).astype(str)
+        actual_result = np.where(
+            is_total, np.char.add(games, " games"), np.where(won, picked, other)
+        )
+
+        updates = pd.DataFrame(
+            {
+                "id": bets["id"].to_numpy(),
+                "result": won.astype(float),
+                "profit": np.where(won, bets["odds"].to_numpy(dtype=float) - 1, -1.0),
+                "actual_result": actual_result.astype(object),
+                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+        return updates[settled].reset_index(drop=True)
+
+    def apply_updates(self, chunk, updates):
+        """Merge vetorizado dos resultados no bloco, por id"""
+        if updates.empty:
+            return chunk
+        updates = updates.drop_duplicates("id", keep="last")
+        merged = chunk.merge(
+            updates, on="id", how="left", suffixes=("", "_new"), indicator=True
+        )
+        settled = (merged.pop("_merge") == "both").to_numpy()
+        for column in UPDATE_COLUMNS:
+            new_values = merged.pop(f"{column}_new")
+            if column in merged:
+                merged[column] = merged[column].astype(new_values.dtype).where(
+                    ~settled, new_values
+                )
             else:
-                return None, None, None
-
-            result = 1 if won else 0
-            profit = (odds - 1) if won else -1
-            actual_result = f"{total_games} games"
-            return result, profit, actual_result
-
-        return None, None, None
-
-    def process_batch(self, batch_df):
-        """Processa um lote de apostas"""
-        event_ids = batch_df["event_id"].unique().tolist()
-        api_results = self.get_results_batch(event_ids)
-
-        # Criar dicionário de resultados por event_id
-        results_dict = {}
-        for result in api_results:
-            if str(result.get("time_status")) == "3":  # Finalizado
-                results_dict[str(result.get("id"))] = result
-
-        processed_rows = []
-
-        for _, bet in batch_df.iterrows():
-            event_id = str(bet["event_id"])
-
-            if event_id in results_dict:
-                api_result = results_dict[event_id]
-                result, profit, actual_result = self.check_bet_result(bet, api_result)
-
-                if result is not None:
-                    bet_updated = bet.copy()
-                    bet_updated["result"] = result
-                    bet_updated["profit"] = profit
-                    bet_updated["actual_result"] = actual_result
-                    bet_updated["updated_at"] = datetime.now().strftime(
-                        "%Y-%m-%d %H:%M:%S"
-                    )
-                    processed_rows.append(bet_updated)
-
-                    status = "GANHOU" if result == 1 else "PERDEU"
-                    logger.info(
-                        f"{status}: {bet['home_team']} vs {bet['away_team']} - {profit:+.2f}u"
-                    )
-
-        return processed_rows
-
-    def process_all_bets(self, batch_size=10, max_workers=3):
-        """Processa todas as apostas pendentes"""
-        pending_bets = self.load_pending_bets()
-
-        if pending_bets.empty:
-            logger.info("Nenhuma aposta pendente para processar")
-            return
-
-        # Dividir em lotes
-        batches = []
-        for i in range(0, len(pending_bets), batch_size):
-            batch = pending_bets.iloc[i : i + batch_size]
-            batches.append(batch)
-
-        logger.info(f"Processando {len(pending_bets)} apostas em {len(batches)} lotes")
+                merged[column] = new_values
+        merged.index = chunk.index
+        return merged[list(chunk.columns) + [c for c in UPDATE_COLUMNS if c not in chunk]]
+
+    def process_chunk(self, chunk, pending_mask):
+        """Consulta os eventos pendentes do bloco e devolve (bloco, liquidadas)"""
+        pending = chunk[pending_mask]
+        if pending.empty:
+            return chunk, pending.iloc[:0]
+
+        event_ids = pending["event_id"].drop_duplicates().tolist()
+        results = self.results_frame(self.fetch_results(event_ids))
+        updates = self.settle_bets_frame(pending, results)
+        return self.apply_updates(chunk, updates), updates
+
+    def run(self, update_db=True):
+        """Processa o CSV em blocos e grava o resultado de forma atômica"""
+        logger.info("Iniciando processamento em lote...")
 
-        all_processed = []
-        processed_count = 0
+        directory = os.path.dirname(os.path.abspath(self.csv_path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".csv.tmp", dir=directory)
+        os.close(fd)
 
-        # Processar sequencialmente para respeitar rate limits
-        for i, batch in enumerate(batches):
-            logger.info(f"Processando lote {i + 1}/{len(batches)}")
+        all_updates = []
+        total_rows = 0
+        pending_rows = 0
+        try:
+            for i, (chunk, pending_mask) in enumerate(self.iter_chunks()):
+                total_rows += len(chunk)
+                pending_rows += int(pending_mask.sum())
 
-            processed_batch = self.process_batch(batch)
-            all_processed.extend(processed_batch)
-            processed_count += len(processed_batch)
+                chunk, updates = self.process_chunk(chunk, pending_mask)
+                chunk.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
 
-            # Progress update
-            if (i + 1) % 10 == 0:
+                if not updates.empty:
+                    all_updates.append(updates)
                 logger.info(
-                    f"Progresso: {i + 1}/{len(batches)} lotes - {processed_count} apostas processadas"
+                    f"Bloco {i + 1}: {len(chunk)} linhas, {int(pending_mask.sum())} "
+                    f"pendentes, {len(updates)} liquidadas"
                 )
 
-        return all_processed
-
-    def update_csv(self, processed_bets):
-        """Atualiza o CSV com os resultados"""
-        if not processed_bets:
-            logger.info("Nenhuma aposta para atualizar")
-            return
+            logger.info(f"Total de apostas no CSV: {total_rows}")
+            logger.info(f"Apostas pendentes: {pending_rows}")
 
-        # Carregar CSV original
-        original_df = pd.read_csv(self.csv_path)
-
-        # Criar dicionário de updates por ID
-        updates = {}
-        for bet in processed_bets:
-            bet_id = bet["id"]
-            updates[bet_id] = {
-                "result": bet["result"],
-                "profit": bet["profit"],
-                "actual_result": bet["actual_result"],
-                "updated_at": bet["updated_at"],
-            }
+            if not all_updates:
+                logger.info("Nenhuma aposta foi processada")
+                os.remove(tmp_path)
+                return pd.DataFrame(columns=["id"] + UPDATE_COLUMNS)
 
-        # Aplicar updates
-        updated_count = 0
-        for idx, row in original_df.iterrows():
-            bet_id = row["id"]
-            if bet_id in updates:
-                for col, value in updates[bet_id].items():
-                    original_df.at[idx, col] = value
-                updated_count += 1
+            backup_path = self.csv_path.replace(".csv", "_backup.csv")
+            shutil.copy2(self.csv_path, backup_path)
+            os.replace(tmp_path, self.csv_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-        # Salvar CSV atualizado
-        backup_path = self.csv_path.replace(".csv", "_backup.csv")
-        original_df.to_csv(backup_path, index=False)
-        original_df.to_csv(self.csv_path, index=False)
+        processed = pd.concat(all_updates, ignore_index=True)
+        logger.info(f"CSV atualizado: {len(processed)} apostas")
+        logger.info(f"Backup do original salvo em: {backup_path}")
 
-        logger.info(f"CSV atualizado: {updated_count} apostas")
-        logger.info(f"Backup salvo em: {backup_path}")
+        if update_db:
+            self.update_database(processed)
+        self.show_summary(processed)
+        return processed
 
-    def update_database(self, processed_bets):
+    def update_database(self, processed):
         """Atualiza o banco SQLite se existir"""
-        if not processed_bets or not os.path.exists(self.db_path):
+        if processed.empty or not os.path.exists(self.db_path):
             return
 
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        updated_count = 0
-        for bet in processed_bets:
-            cursor.execute(
-                """
-            UPDATE bets 
-            SET result = ?, profit = ?, actual_result = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-            """,
-                (bet["result"], bet["profit"], bet["actual_result"], bet["id"]),
-            )
-
-            if cursor.rowcount > 0:
-                updated_count += 1
+        updated_count = settle_bets(
+            cursor,
+            list(
+                zip(
+                    processed["result"].astype(int).tolist(),
+                    processed["profit"].tolist(),
+                    processed["actual_result"].tolist(),
+                    processed["id"].tolist(),
+                )
+            ),
+        )
 
         conn.commit()
         conn.close()
 
         logger.info(f"Banco atualizado: {updated_count} apostas")
 
-    def show_summary(self, processed_bets):
+    def show_summary(self, processed):
         """Mostra resumo dos resultados"""
-        if not processed_bets:
+        if processed.empty:
             return
 
-        df = pd.DataFrame(processed_bets)
-
-        total_processed = len(df)
-        wins = len(df[df["result"] == 1])
-        losses = len(df[df["result"] == 0])
-        total_profit = df["profit"].sum()
+        total_processed = len(processed)
+        wins = int((processed["result"] == 1).sum())
+        losses = int((processed["result"] == 0).sum())
+        total_profit = processed["profit"].sum()
         win_rate = wins / total_processed * 100 if total_processed > 0 else 0
         roi = total_profit / total_processed * 100 if total_processed > 0 else 0
 
@@ -305,29 +383,37 @@ class BulkResultsProcessor:
         logger.info(f"ROI: {roi:+.1f}%")
         logger.info(f"Total de requests: {self.request_count}")
 
-    def run(self):
-        """Executa o processamento completo"""
-        logger.info("Iniciando processamento em lote...")
-
-        processed_bets = self.process_all_bets(batch_size=10, max_workers=1)
-
-        if processed_bets:
-            self.update_csv(processed_bets)
-            self.update_database(processed_bets)
-            self.show_summary(processed_bets)
-        else:
-            logger.info("Nenhuma aposta foi processada")
-
 
 def main():
-    csv_path = input("Digite o caminho do arquivo CSV: ").strip()
-
-    if not os.path.exists(csv_path):
-        print(f"Arquivo não encontrado: {csv_path}")
-        return
-
-    processor = BulkResultsProcessor(csv_path)
-    processor.run()
+    parser = argparse.ArgumentParser(
+        description="Liquida as apostas pendentes de um CSV via BetsAPI"
+    )
+    parser.add_argument("csv_path", help="CSV de apostas (colunas de bets.db)")
+    parser.add_argument("--db-path", default="bets.db", help="bets.db a atualizar junto")
+    parser.add_argument(
+        "--skip-db", action="store_true", help="Atualiza só o CSV, sem tocar no banco"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Linhas por bloco"
+    )
+    parser.add_argument(
+        "--requests-per-minute", type=float, default=REQUESTS_PER_MINUTE
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_path):
+        print(f"Arquivo não encontrado: {args.csv_path}")
+        raise SystemExit(1)
+
+    processor = BulkResultsProcessor(
+        args.csv_path,
+        db_path=args.db_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        requests_per_minute=args.requests_per_minute,
+    )
+    processor.run(update_db=not args.skip_db)
 
 
 if __name__ == "__main__":